@@ -0,0 +1,664 @@
+"""성능 측정 스크립트
+
+임시 디렉토리에 별도 DB를 만들어 측정하므로 fishing.db에는 영향이 없다.
+
+사용법:
+    python benchmark.py csv-load [--rows 100000]
+    python benchmark.py csv-upsert [--rows 100000] [--change-ratio 0.03]
+    python benchmark.py csv-cancel [--rows 20000]
+    python benchmark.py track-ingest [--points 1000000] [--no-compact]
+    python benchmark.py fishing-activity [--voyages 2000] [--points-per-voyage 1000]
+    python benchmark.py html-extract [--files 1000] [--points-per-file 1000] [--workers N]
+    python benchmark.py sales-plans [--rows 1000000] [--repeat 5]
+    python benchmark.py id-alloc [--processes 8] [--threads 4] [--creates 50]
+    python benchmark.py analytics [--rows 1000000] [--repeat 5]
+
+sales-plans는 위판/사매/경비 목록 API가 실행하는 쿼리의 EXPLAIN QUERY PLAN이 의도한
+인덱스를 쓰는지 검사하고, 하나라도 어긋나면 종료 코드 1을 돌려준다.
+csv-cancel은 대량 로딩을 중간에 취소/실패시킨 뒤 데이터와 인덱스, FTS 트리거가 그대로인지 검사한다.
+analytics는 판매 분석을 월별 큐브와 원본 테이블로 각각 계산해 결과가 같은지 비교한다.
+"""
+import argparse
+import csv
+import multiprocessing
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import database
+import fishing_activity
+import sales_analytics
+import track_html_extract
+import track_ingest
+import track_store
+
+
+def _use_temp_db(tmp_dir):
+    """측정용 임시 DB로 전환 후 스키마 생성"""
+    database.DB_PATH = Path(tmp_dir) / "bench.db"
+    database.init_db()
+
+
+def write_synthetic_vessel_csv(path, rows, seed=42):
+    """전국어선정보.csv와 같은 헤더의 합성 CSV 생성"""
+    rng = random.Random(seed)
+    ports = ["속초", "동해", "강릉", "포항", "부산", "통영", "여수", "목포", "군산", "제주"]
+    types = ["연안자망", "근해채낚기", "연안통발", "근해안강망", "정치망", "연안복합"]
+    header = [csv_name for _, csv_name, _ in database.VESSEL_CSV_COLUMNS]
+
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(rows):
+            writer.writerow([
+                f"{rng.choice(['해양', '수복', '동산', '대성', '금강'])}{i % 100}호",
+                f"{rng.uniform(1, 200):.2f}",
+                f"{rng.uniform(5, 60):.2f}",
+                "디젤",
+                str(rng.randint(1, 2)),
+                f"{rng.uniform(50, 2000):,.1f}",
+                f"{rng.uniform(30, 1500):.1f}",
+                "FRP",
+                f"{9000000 + i:07d}",
+                f"{rng.randint(1980, 2024)}-01-01",
+                rng.choice(ports),
+                rng.choice(types),
+                "-",
+                "-",
+                f"440{i:06d}",
+                rng.choice(types),
+                "2024-01-01",
+                "2028-12-31",
+                "-",
+                "-",
+                "-",
+            ])
+
+
+def bench_csv_load(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "vessels.csv"
+        write_synthetic_vessel_csv(csv_path, args.rows)
+        print(f"합성 CSV {args.rows:,}행 생성: {csv_path.stat().st_size / 1e6:.1f} MB")
+
+        _use_temp_db(tmp_dir)
+        failures = 0
+        for label, kwargs in [
+            ("기본 (executemany)", {}),
+            ("대량 로딩 (bulk, 인덱스 재생성)", {'bulk': True}),
+        ]:
+            result = database.load_csv_to_db(csv_path, force=True, batch_size=args.batch_size, **kwargs)
+            print(f"{label}: {result['count']:,}행 {result['elapsed']:.2f}초 "
+                  f"({result['rows_per_sec']:,.0f}행/초)")
+            # 보고한 등록/제외 건수가 실제 테이블과 맞는지 (트리거가 쓴 행이 섞이면 어긋남)
+            with database.get_db(readonly=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM vessel_registry")
+                stored = cursor.fetchone()[0]
+            if result['count'] != stored or result['rejected'] < 0:
+                print(f"    [FAIL] 보고 {result['count']:,}행 / 제외 {result['rejected']:,}, 실제 {stored:,}행")
+                failures += 1
+
+    if failures:
+        sys.exit(1)
+
+
+def bench_csv_cancel(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "vessels.csv"
+        write_synthetic_vessel_csv(csv_path, args.rows)
+        _use_temp_db(tmp_dir)
+        database.load_csv_to_db(csv_path, force=True, bulk=True)
+
+        def schema():
+            with database.get_db(readonly=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'vessel_registry' "
+                               "AND type IN ('index', 'trigger')")
+                names = {row[0] for row in cursor.fetchall()}
+                cursor.execute("SELECT COUNT(*) FROM vessel_registry")
+                return names, cursor.fetchone()[0]
+
+        expected, rows = schema()
+        required = set(database.VESSEL_REGISTRY_INDEXES) | set(database.VESSEL_FTS_TRIGGERS)
+        failures = 0
+        if not required <= expected:
+            print(f"[FAIL] 초기 적재 후 누락: {sorted(required - expected)}")
+            failures += 1
+
+        def cancel_after_first_batch(event):
+            def progress(parsed, inserted, rejected):
+                event.set()
+            return progress
+
+        def fail_after_first_batch(parsed, inserted, rejected):
+            raise RuntimeError("측정용 실패")
+
+        event = threading.Event()
+        for label, kwargs, error in [
+            ("취소", {"progress": cancel_after_first_batch(event), "cancel_event": event},
+             database.ImportCancelled),
+            ("실패", {"progress": fail_after_first_batch}, RuntimeError),
+        ]:
+            try:
+                database.load_csv_to_db(csv_path, force=True, bulk=True, batch_size=1000, **kwargs)
+                print(f"[FAIL] {label}: 예외가 발생하지 않음")
+                failures += 1
+                continue
+            except error:
+                pass
+            names, count = schema()
+            missing = sorted(expected - names)
+            ok = not missing and count == rows
+            failures += not ok
+            print(f"[{'OK' if ok else 'FAIL'}] 대량 로딩 {label} 후: 행 {count:,}/{rows:,}, "
+                  f"인덱스/트리거 {len(names & expected)}/{len(expected)}")
+            for name in missing:
+                print(f"    누락: {name}")
+
+    if failures:
+        sys.exit(1)
+
+
+def bench_csv_upsert(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_csv = Path(tmp_dir) / "base.csv"
+        changed_csv = Path(tmp_dir) / "changed.csv"
+        write_synthetic_vessel_csv(base_csv, args.rows)
+        # 다른 seed로 만든 뒤 일부 행만 섞어 월간 갱신을 흉내낸다
+        write_synthetic_vessel_csv(changed_csv, args.rows, seed=7)
+        rng = random.Random(1)
+        with open(base_csv, encoding='utf-8-sig', newline='') as f:
+            base_rows = list(csv.reader(f))
+        with open(changed_csv, encoding='utf-8-sig', newline='') as f:
+            new_rows = list(csv.reader(f))
+        for i in range(1, len(base_rows)):
+            if rng.random() < args.change_ratio:
+                base_rows[i] = new_rows[i]
+        with open(changed_csv, 'w', encoding='utf-8-sig', newline='') as f:
+            csv.writer(f).writerows(base_rows)
+
+        _use_temp_db(tmp_dir)
+        database.load_csv_to_db(base_csv, force=True, bulk=True)
+
+        result = database.load_csv_to_db(changed_csv, force=True)
+        print(f"전체 재적재 (force): {result['elapsed']:.2f}초")
+        database.load_csv_to_db(base_csv, force=True, bulk=True)
+        result = database.upsert_csv_to_db(changed_csv, flag_missing=True)
+        print(f"증분 반영 (incremental): {result['elapsed']:.2f}초 - {result['message']}")
+
+
+def write_synthetic_track_csv(path, points, vessels=50, seed=42):
+    """1분 간격 AIS 항적 합성 CSV 생성 (mmsi,timestamp,lat,lon,speed,course)"""
+    rng = np.random.default_rng(seed)
+    per_vessel = points // vessels
+    start = np.datetime64("2025-01-01T00:00:00").astype(np.int64)
+    timestamps = track_store.format_timestamps(start + np.arange(per_vessel) * 60)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("mmsi,timestamp,lat,lon,speed,course\n")
+        for v in range(vessels):
+            lat = 35 + np.cumsum(rng.normal(0, 1e-3, per_vessel))
+            lon = 129 + np.cumsum(rng.normal(0, 1e-3, per_vessel))
+            speed = np.abs(rng.normal(6, 3, per_vessel))
+            course = rng.uniform(0, 360, per_vessel)
+            mmsi = f"440{v:06d}"
+            f.writelines(
+                f"{mmsi},{t},{a:.6f},{b:.6f},{s:.1f},{c:.1f}\n"
+                for t, a, b, s, c in zip(timestamps, lat.tolist(), lon.tolist(), speed.tolist(), course.tolist())
+            )
+
+
+def bench_track_ingest(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "tracks.csv"
+        write_synthetic_track_csv(csv_path, args.points)
+        print(f"합성 항적 CSV {args.points:,}포인트 생성: {csv_path.stat().st_size / 1e6:.1f} MB")
+
+        _use_temp_db(tmp_dir)
+        for label in ("최초 적재", "재적재 (전부 중복)"):
+            with open(csv_path, encoding="utf-8", newline="") as f:
+                result = track_ingest.ingest_track_lines(f, "csv", compact=not args.no_compact)
+            print(f"{label}: 등록 {result['inserted']:,} / 중복 {result['duplicates']:,} "
+                  f"{result['elapsed']:.2f}초 ({result['points_per_sec']:,.0f}포인트/초)")
+            print("    단계별: " + ", ".join(f"{k} {v:.2f}초" for k, v in result["stages"].items()))
+
+
+def bench_fishing_activity(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "tracks.csv"
+        write_synthetic_track_csv(csv_path, args.voyages * args.points_per_voyage, vessels=args.voyages)
+        _use_temp_db(tmp_dir)
+        with open(csv_path, encoding="utf-8", newline="") as f:
+            track_ingest.ingest_track_lines(f, "csv", compact=not args.no_compact)
+
+        result = fishing_activity.analyze_voyages()
+        print(f"조업 활동 분석: 항차 {result['voyages']:,} / 포인트 {result['points']:,} "
+              f"{result['elapsed']:.2f}초 ({result['points'] / result['elapsed']:,.0f}포인트/초)")
+
+
+def write_synthetic_track_html(root, files, points_per_file, seed=42):
+    """folium 마커 형식의 합성 항적 HTML 생성 ({mmsi}/{mmsi}_{year}_{month}_{count}.html)"""
+    rng = np.random.default_rng(seed)
+    for i in range(files):
+        mmsi = f"440{i // 12:06d}"
+        year, month = 2024, i % 12 + 1
+        start = np.datetime64(f"{year}-{month:02d}-01T00:00:00").astype(np.int64)
+        timestamps = track_store.format_timestamps(start + np.arange(points_per_file) * 300)
+        lat = 35 + np.cumsum(rng.normal(0, 1e-3, points_per_file))
+        lon = 129 + np.cumsum(rng.normal(0, 1e-3, points_per_file))
+        speed = np.abs(rng.normal(6, 3, points_per_file))
+        course = rng.uniform(0, 360, points_per_file)
+        body = "".join(
+            f"var marker_{k} = L.circleMarker([{a:.6f}, {b:.6f}], {{radius: 2}}).addTo(map);\n"
+            f"marker_{k}.bindPopup('<b>시각</b>: {t}<br><b>속력</b>: {sp:.1f}kn<br><b>침로</b>: {co:.0f}');\n"
+            for k, (t, a, b, sp, co) in enumerate(zip(timestamps, lat.tolist(), lon.tolist(), speed.tolist(), course.tolist()))
+        )
+        path = Path(root) / mmsi / f"{mmsi}_{year}_{month}_{points_per_file}.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"<html><body><script>\nvar map = L.map('map');\n{body}</script></body></html>", encoding="utf-8")
+
+
+def bench_html_extract(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir) / "tracks"
+        write_synthetic_track_html(root, args.files, args.points_per_file)
+        size = sum(p.stat().st_size for p in root.rglob("*.html"))
+        print(f"합성 항적 HTML {args.files:,}개 ({size / 1e6:.1f} MB) 생성")
+
+        _use_temp_db(tmp_dir)
+        for label in ("최초 추출", "재실행 (완료 파일 건너뜀)"):
+            result = track_html_extract.extract_all(root, workers=args.workers, compact=not args.no_compact)
+            print(f"{label}: 파일 {result['files']:,} / 포인트 {result['points']:,} {result['elapsed']:.2f}초 "
+                  f"({result['files_per_sec']:,.1f}파일/초, {result['points_per_sec']:,.0f}포인트/초, "
+                  f"{result['mb_per_sec']:.1f}MB/초)")
+
+
+def seed_sales(rows, voyages=2000, seed=42):
+    """위판 60% / 사매 25% / 경비 15% 비율로 3년치 합성 판매·경비 행 생성"""
+    rng = random.Random(seed)
+    species = ["고등어", "갈치", "오징어", "명태", "참조기", "삼치", "전갱이", "방어"]
+    ports = ["부산공동어시장", "속초공동어시장", "동해어시장", "목포수협", "제주수협"]
+    categories = ["유류비", "인건비", "수리비", "어구비", "식비", "기타"]
+    start = 1672531200  # 2023-01-01
+
+    def when():
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + rng.randrange(3 * 365 * 86400)))
+
+    voyage_ids = []
+    with database.get_db() as conn:
+        cursor = conn.cursor()
+        for i in range(voyages):
+            mmsi = f"440{i // 10:06d}"
+            voyage_id = f"{mmsi}-2024-{i % 10 + 1:03d}"
+            voyage_ids.append(voyage_id)
+            cursor.execute(
+                "INSERT INTO voyages (id, mmsi, year, voyage_no, vessel_name) VALUES (?, ?, 2024, ?, ?)",
+                (voyage_id, mmsi, i % 10 + 1, f"{rng.choice(['해양', '수복', '동산', '대성'])}{i // 10}호")
+            )
+
+        n_auction, n_private = int(rows * 0.6), int(rows * 0.25)
+        n_expense = rows - n_auction - n_private
+
+        def auctions():
+            for i in range(n_auction):
+                quantity, price = rng.randint(10, 2000), rng.choice([3000, 5000, 8000, 12000])
+                yield (f"AUC-B-{i:07d}", rng.choice(voyage_ids), when(), rng.choice(ports),
+                       rng.choice(species), quantity, price, quantity * price)
+
+        def private_sales():
+            for i in range(n_private):
+                quantity, price = rng.randint(1, 200), rng.choice([4000, 6000, 9000])
+                yield (f"PVS-B-{i:07d}", rng.choice(voyage_ids), when(), rng.choice(species),
+                       quantity, price, quantity * price)
+
+        def expenses():
+            for i in range(n_expense):
+                yield (f"EXP-B-{i:07d}", rng.choice(voyage_ids), when(), rng.choice(categories),
+                       rng.randint(10, 500) * 1000)
+
+        cursor.executemany("""
+            INSERT INTO auctions (id, voyage_id, auction_date, auction_port, fish_species, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, auctions())
+        cursor.executemany("""
+            INSERT INTO private_sales (id, voyage_id, sale_date, fish_species, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, private_sales())
+        cursor.executemany("""
+            INSERT INTO expenses (id, voyage_id, expense_date, category, amount) VALUES (?, ?, ?, ?, ?)
+        """, expenses())
+        conn.commit()
+    return voyage_ids
+
+
+# (이름, main의 엔드포인트 함수명, 인자, 계획에 있어야 할 문구, 있으면 안 되는 패턴)
+_FULL_SCAN = r"^SCAN (a|ps|e|auctions|private_sales|expenses)$"
+_SORT = r"^USE TEMP B-TREE FOR ORDER BY$"
+_LEDGER_DEFAULTS = {
+    "kinds": "auction,private_sale,expense", "start_date": None, "end_date": None, "fish_species": None,
+    "auction_port": None, "category": None, "vessel_name": None, "mmsi": None, "group_name": None,
+    "organization": None, "business_type": None, "sort": "date", "order": "desc", "page_size": 100,
+    "page_cursor": None, "with_totals": True,
+}
+
+
+def sales_plan_checks(voyage_id):
+    checks = []
+    for table, alias, date_col, list_fn, all_fn, text_filter in [
+        ("auctions", "a", "auction_date", "get_auctions", "get_all_auctions", "fish_species"),
+        ("private_sales", "ps", "sale_date", "get_private_sales", "get_all_private_sales", "fish_species"),
+        ("expenses", "e", "expense_date", "get_expenses", "get_all_expenses", "category"),
+    ]:
+        checks += [
+            (f"{table}: 항차별", list_fn, {"voyage_id": voyage_id},
+             [f"idx_{table}_voyage_date"], [_SORT]),
+            (f"{table}/all: 전체", all_fn, {"start_date": None, "end_date": None, text_filter: None, "vessel_name": None},
+             [f"SCAN {alias} USING INDEX idx_{table}_date"], [_SORT]),
+            (f"{table}/all: 기간", all_fn,
+             {"start_date": "2024-03-01", "end_date": "2024-03-31", text_filter: None, "vessel_name": None},
+             [f"SEARCH {alias} USING INDEX idx_{table}_date ({date_col}>? AND {date_col}<?)"], [_SORT, _FULL_SCAN]),
+            (f"{table}/all: 기간+선박명", all_fn,
+             {"start_date": "2024-03-01", "end_date": "2024-03-31", text_filter: None, "vessel_name": "해양"},
+             [f"idx_{table}_date"], [_SORT, _FULL_SCAN]),
+        ]
+    checks += [
+        ("ledger: 첫 페이지", "get_ledger", dict(_LEDGER_DEFAULTS),
+         ["SCAN a USING INDEX idx_auctions_date", "SCAN ps USING INDEX idx_private_sales_date",
+          "SCAN e USING INDEX idx_expenses_date"], [_FULL_SCAN]),
+        ("ledger: 기간 + 합계", "get_ledger", dict(_LEDGER_DEFAULTS, start_date="2024-01-01", end_date="2024-06-30"),
+         ["USING COVERING INDEX idx_auctions_date", "USING COVERING INDEX idx_private_sales_date",
+          "USING COVERING INDEX idx_expenses_date"], [_FULL_SCAN]),
+        ("ledger: 금액 정렬", "get_ledger", dict(_LEDGER_DEFAULTS, sort="amount", with_totals=False,
+                                              start_date="2024-03-01", end_date="2024-03-31"),
+         ["idx_auctions_date"], [_FULL_SCAN]),
+    ]
+    return checks
+
+
+def bench_sales_plans(args):
+    # 엔드포인트가 실행한 SQL을 잡기 위해 연결 생성 시 trace 콜백 등록
+    captured = []
+    connect = database._connect
+
+    def traced_connect(readonly):
+        conn = connect(readonly)
+        conn.set_trace_callback(captured.append)
+        return conn
+
+    database._connect = traced_connect
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _use_temp_db(tmp_dir)
+        started = time.perf_counter()
+        voyage_ids = seed_sales(args.rows)
+        print(f"합성 판매/경비 {args.rows:,}행 생성: {time.perf_counter() - started:.1f}초")
+
+        import main
+
+        checks = sales_plan_checks(voyage_ids[0])
+        # 커서 페이지 (첫 페이지 응답의 next_cursor로 이어서 조회)
+        first = main.get_ledger(**dict(_LEDGER_DEFAULTS, with_totals=False))
+        checks.append(("ledger: 커서 페이지", "get_ledger",
+                       dict(_LEDGER_DEFAULTS, page_cursor=first["next_cursor"], with_totals=False),
+                       ["SEARCH a USING INDEX idx_auctions_date", "SEARCH ps USING INDEX idx_private_sales_date",
+                        "SEARCH e USING INDEX idx_expenses_date"], [_FULL_SCAN]))
+
+        failures = 0
+        with database.get_db(readonly=True) as conn:
+            explain = conn.cursor()
+            for name, fn_name, kwargs, required, forbidden in checks:
+                fn = getattr(main, fn_name)
+                timings = []
+                for _ in range(args.repeat):
+                    captured.clear()
+                    t0 = time.perf_counter()
+                    fn(**kwargs)
+                    timings.append(time.perf_counter() - t0)
+                queries = [q for q in captured if q.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+                plan = []
+                for sql in queries:
+                    explain.execute("EXPLAIN QUERY PLAN " + sql)
+                    plan += [row["detail"] for row in explain.fetchall()]
+                missing = [r for r in required if not any(r in line for line in plan)]
+                bad = [line for line in plan if any(re.search(p, line) for p in forbidden)]
+
+                ok = not missing and not bad
+                failures += not ok
+                print(f"[{'OK' if ok else 'FAIL'}] {name}: {statistics.median(timings) * 1000:,.1f}ms")
+                for r in missing:
+                    print(f"    인덱스 미사용: {r}")
+                for line in bad:
+                    print(f"    허용되지 않는 계획: {line}")
+                if not ok or args.verbose:
+                    for line in plan:
+                        print(f"      {line}")
+
+    database._connect = connect
+    print(f"쿼리 계획 검사 {len(checks)}건 중 실패 {failures}건")
+    if failures:
+        sys.exit(1)
+
+
+# (이름, group_by, bucket, 조건)
+_ANALYTICS_CASES = [
+    ("전체 선단 연도별 비교", [], "year", {}),
+    ("어종 x 연도", ["species"], "year", {}),
+    ("어종 x 월 (2년)", ["species"], "month", {"start": "2023-07", "end": "2025-06"}),
+    ("위판장 x 월", ["port"], "month", {}),
+    ("선단 x 연도", ["group"], "year", {}),
+    ("어선 x 월", ["vessel"], "month", {}),
+    ("어선 1척 어종 x 월", ["species"], "month", {"filters": {"mmsi": "440000001"}}),
+]
+
+
+def _same_analytics(a, b):
+    """큐브/원본 결과 비교 (금액·수량은 부동소수 합산 순서 차이만 허용)"""
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        for key, value in x.items():
+            if isinstance(value, float):
+                if abs(value - y[key]) > 1e-6 * max(1.0, abs(value)):
+                    return False
+            elif value != y[key]:
+                return False
+    return True
+
+
+def bench_analytics(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _use_temp_db(tmp_dir)
+        started = time.perf_counter()
+        voyage_ids = seed_sales(args.rows)
+        print(f"합성 판매/경비 {args.rows:,}행 생성 (큐브 트리거 포함): {time.perf_counter() - started:.1f}초")
+
+        # 어선 10척씩 선단 하나 (일부 어선은 두 선단에 속함)
+        with database.get_db() as conn:
+            cursor = conn.cursor()
+            for mmsi in sorted({v.split("-")[0] for v in voyage_ids}):
+                cursor.execute(
+                    "INSERT INTO vessel_registry (vessel_name, mmsi, registration_no) VALUES (?, ?, ?)",
+                    (f"선박{mmsi}", mmsi, mmsi)
+                )
+                vessel_id, n = cursor.lastrowid, int(mmsi[3:])
+                cursor.execute("INSERT INTO vessel_groups (vessel_id, group_name) VALUES (?, ?)",
+                               (vessel_id, f"선단{n // 10}"))
+                if n % 7 == 0:
+                    cursor.execute("INSERT INTO vessel_groups (vessel_id, group_name) VALUES (?, ?)",
+                                   (vessel_id, "공동선단"))
+            cursor.execute("SELECT COUNT(*) FROM sales_cube")
+            cube_rows = cursor.fetchone()[0]
+            conn.commit()
+        print(f"sales_cube {cube_rows:,}행")
+
+        failures = 0
+        with database.get_db(readonly=True) as conn:
+            cursor = conn.cursor()
+            for name, group_by, bucket, options in _ANALYTICS_CASES:
+                kwargs = dict(options, group_by=group_by, bucket=bucket, kinds=["auction", "private_sale"])
+                timings = []
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    cube = sales_analytics.run_analytics(cursor, use_cube=True, **kwargs)
+                    timings.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                raw = sales_analytics.run_analytics(cursor, use_cube=False, **kwargs)
+                raw_time = time.perf_counter() - t0
+
+                ok = _same_analytics(cube["data"], raw["data"])
+                failures += not ok
+                print(f"[{'OK' if ok else 'FAIL'}] {name}: 큐브 {statistics.median(timings) * 1000:,.1f}ms, "
+                      f"원본 {raw_time * 1000:,.1f}ms, {len(cube['data']):,}행")
+
+    print(f"큐브/원본 비교 {len(_ANALYTICS_CASES)}건 중 불일치 {failures}건")
+    if failures:
+        sys.exit(1)
+
+
+def _id_alloc_worker(db_path, voyage_id, threads, creates):
+    """프로세스 하나: 스레드 여러 개로 위판/사매/경비 등록 API를 동시에 호출
+
+    Returns:
+        tuple: (발급된 ID 목록, 실패 메시지 목록)
+    """
+    database.DB_PATH = Path(db_path)
+    import main
+
+    when = datetime(2025, 6, 1, 5, 0)
+    makers = [
+        lambda: main.create_auction(main.AuctionCreate(
+            voyage_id=voyage_id, auction_date=when, auction_port="부산공동어시장",
+            fish_species="고등어", quantity=10, unit_price=5000)),
+        lambda: main.create_private_sale(main.PrivateSaleCreate(
+            voyage_id=voyage_id, sale_date=when, fish_species="고등어", quantity=5, unit_price=6000)),
+        lambda: main.create_expense(main.ExpenseCreate(
+            voyage_id=voyage_id, expense_date=when, category="유류비", amount=100000)),
+    ]
+
+    def run(thread_no):
+        ids, errors = [], []
+        for i in range(creates):
+            try:
+                ids.append(makers[(thread_no + i) % 3]()["data"]["id"])
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+        return ids, errors
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(run, range(threads)))
+    return [i for ids, _ in results for i in ids], [e for _, errors in results for e in errors]
+
+
+def bench_id_alloc(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _use_temp_db(tmp_dir)
+        database.insert_sample_voyages()
+        voyage_id = "440004950-2025-001"
+        # 삭제된 번호를 다시 쓰지 않는지 확인하기 위해 기존 위판 하나를 지우고 시작
+        with database.get_db() as conn:
+            conn.execute("DELETE FROM auctions WHERE id = (SELECT MAX(id) FROM auctions)")
+            conn.commit()
+
+        total = args.processes * args.threads * args.creates
+        started = time.perf_counter()
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(args.processes) as pool:
+            results = pool.starmap(
+                _id_alloc_worker,
+                [(str(database.DB_PATH), voyage_id, args.threads, args.creates)] * args.processes
+            )
+        elapsed = time.perf_counter() - started
+
+        ids = [i for worker_ids, _ in results for i in worker_ids]
+        errors = [e for _, worker_errors in results for e in worker_errors]
+        duplicates = len(ids) - len(set(ids))
+        print(f"동시 등록 {args.processes}프로세스 x {args.threads}스레드: {len(ids):,}/{total:,}건 "
+              f"{elapsed:.2f}초 ({len(ids) / elapsed:,.0f}건/초), 실패 {len(errors)}건, 중복 ID {duplicates}건")
+        for e in errors[:5]:
+            print(f"    {e}")
+
+        # 테이블·연도별 번호가 빈틈 없이 이어지는지 (실패가 없으면 1..N 또는 기존 최대 번호 다음부터)
+        gaps = 0
+        with database.get_db(readonly=True) as conn:
+            for table, prefix in database.RECORD_ID_PREFIXES.items():
+                year = datetime.now().year
+                numbers = sorted(int(i.rsplit("-", 1)[1]) for i in ids if i.startswith(f"{prefix}-{year}-"))
+                if numbers and numbers != list(range(numbers[0], numbers[0] + len(numbers))):
+                    gaps += 1
+                    print(f"    {table}: 번호가 연속되지 않음")
+                count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE id GLOB ?", (f"{prefix}-{year}-*",)).fetchone()[0]
+                print(f"  {table}: {count:,}행, 번호 {numbers[0] if numbers else '-'}~{numbers[-1] if numbers else '-'}")
+
+    if errors or duplicates or gaps:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="어선조업분석 플랫폼 성능 측정")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("csv-load", help="전국어선정보 CSV 로딩 속도")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--batch-size", type=int, default=database.CSV_BATCH_SIZE)
+    p.set_defaults(func=bench_csv_load)
+
+    p = sub.add_parser("csv-upsert", help="전국어선정보 CSV 증분 반영 vs 전체 재적재")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--change-ratio", type=float, default=0.03)
+    p.set_defaults(func=bench_csv_upsert)
+
+    p = sub.add_parser("csv-cancel", help="전국어선정보 대량 로딩 취소/실패 후 인덱스·트리거 보존 검사")
+    p.add_argument("--rows", type=int, default=20_000)
+    p.set_defaults(func=bench_csv_cancel)
+
+    p = sub.add_parser("track-ingest", help="AIS 항적 대량 수집 속도")
+    p.add_argument("--points", type=int, default=1_000_000)
+    p.add_argument("--no-compact", action="store_true")
+    p.set_defaults(func=bench_track_ingest)
+
+    p = sub.add_parser("fishing-activity", help="항적 조업 활동 일괄 분석 속도")
+    p.add_argument("--voyages", type=int, default=2000)
+    p.add_argument("--points-per-voyage", type=int, default=1000)
+    p.add_argument("--no-compact", action="store_true", help="track_points에서 직접 읽기")
+    p.set_defaults(func=bench_fishing_activity)
+
+    p = sub.add_parser("html-extract", help="항적 HTML 좌표 병렬 추출 속도")
+    p.add_argument("--files", type=int, default=1000)
+    p.add_argument("--points-per-file", type=int, default=1000)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--no-compact", action="store_true")
+    p.set_defaults(func=bench_html_extract)
+
+    p = sub.add_parser("sales-plans", help="위판/사매/경비 목록 쿼리 계획 검사 및 응답 시간")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--verbose", action="store_true", help="통과한 쿼리의 계획도 출력")
+    p.set_defaults(func=bench_sales_plans)
+
+    p = sub.add_parser("id-alloc", help="위판/사매/경비 ID 발급 동시성 검사")
+    p.add_argument("--processes", type=int, default=8)
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--creates", type=int, default=50, help="스레드당 등록 건수")
+    p.set_defaults(func=bench_id_alloc)
+
+    p = sub.add_parser("analytics", help="판매 분석 월별 큐브 vs 원본 집계 비교 및 응답 시간")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_analytics)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import sqlite3
 import csv
+import hashlib
 import os
+import queue
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 from contextlib import contextmanager
 
@@ -8,15 +13,208 @@ DB_PATH = Path(__file__).parent / "fishing.db"
 CSV_PATH = Path(__file__).parent.parent / "전국어선정보.csv"
 
 
-@contextmanager
-def get_db():
-    """데이터베이스 연결 컨텍스트 매니저"""
-    conn = sqlite3.connect(str(DB_PATH))
+class QueryCache:
+    """쓰기 시 무효화되는 조회 결과 캐시 (TTL 포함)
+
+    쓰기는 이 프로세스의 단일 쓰기 연결로만 일어나므로, 쓰기 경로에서
+    invalidate()를 호출하면 캐시가 DB와 어긋나지 않는다.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and now - entry[0] < self.ttl:
+                return entry[1]
+            generation = self._generation
+
+        value = compute()
+        with self._lock:
+            # 계산 중 무효화되었으면 저장하지 않음
+            if generation == self._generation:
+                self._data[key] = (now, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+
+# vessel_registry / vessel_groups 기반 조회 결과 캐시 (목록 건수 등)
+registry_cache = QueryCache(ttl=300)
+
+
+# 연결 풀 설정 (환경변수로 조정 가능)
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "32768"))
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_SYNCHRONOUS = "NORMAL"
+
+
+class PoolTimeout(Exception):
+    """연결 풀에서 제한 시간 내에 연결을 얻지 못함"""
+
+
+def _connect(readonly):
+    """튜닝된 SQLite 연결 생성 (WAL, mmap, 페이지 캐시, busy_timeout)"""
+    conn = sqlite3.connect(str(DB_PATH), timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class ConnectionPool:
+    """고정 크기 SQLite 연결 풀 (연결은 필요할 때 생성)"""
+
+    def __init__(self, name, size, readonly):
+        self.name = name
+        self.size = size
+        self.readonly = readonly
+        self.path = str(DB_PATH)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        # 대기 시간 지표
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self, timeout=DB_POOL_TIMEOUT):
+        started = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = _connect(self.readonly)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(f"{self.name} 연결 대기 시간 초과 ({timeout}초)")
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._in_use += 1
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def release(self, conn):
+        with self._lock:
+            self._in_use -= 1
+        try:
+            # 커밋하지 않은 변경은 버림 (기존 close() 동작과 동일)
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "wait_avg_ms": round(self._wait_total / self._acquired * 1000, 3) if self._acquired else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(kind):
+    """읽기('reader') 또는 단일 쓰기('writer') 풀 반환 (DB_PATH가 바뀌면 새로 생성)"""
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None or pool.path != str(DB_PATH):
+            if pool is not None:
+                pool.close()
+            if kind == 'reader':
+                pool = ConnectionPool('reader', DB_READ_POOL_SIZE, readonly=True)
+            else:
+                pool = ConnectionPool('writer', 1, readonly=False)
+            _pools[kind] = pool
+        return pool
+
+
+@contextmanager
+def get_db(readonly=False, timeout=DB_POOL_TIMEOUT):
+    """데이터베이스 연결 컨텍스트 매니저
+
+    풀에서 연결을 빌려오고 반납한다. readonly=True이면 읽기 전용 풀을,
+    아니면 단일 쓰기 연결을 사용하므로 쓰기 요청은 순서대로 처리된다.
+    timeout초 안에 연결을 얻지 못하면 PoolTimeout.
+    """
+    pool = _get_pool('reader' if readonly else 'writer')
+    conn = pool.acquire(timeout)
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+
+def get_pool_stats():
+    """연결 풀 지표 (대기 시간 등)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
 
 
 def init_db():
@@ -69,6 +267,20 @@ def init_db():
             cursor.execute("ALTER TABLE vessel_registry ADD COLUMN organization TEXT")
         if 'owner_name' not in columns:
             cursor.execute("ALTER TABLE vessel_registry ADD COLUMN owner_name TEXT")
+        if 'row_hash' not in columns:
+            cursor.execute("ALTER TABLE vessel_registry ADD COLUMN row_hash TEXT")
+        if 'deregistered_at' not in columns:
+            cursor.execute("ALTER TABLE vessel_registry ADD COLUMN deregistered_at TIMESTAMP")
+        if 'fishing_polygon' not in columns:
+            cursor.execute("ALTER TABLE vessel_registry ADD COLUMN fishing_polygon TEXT")
+        # 사진/파일 수와 대표 사진 (vessel_photos/vessel_files 트리거로 유지)
+        repair_counters = 'photo_count' not in columns
+        if 'photo_count' not in columns:
+            cursor.execute("ALTER TABLE vessel_registry ADD COLUMN photo_count INTEGER NOT NULL DEFAULT 0")
+        if 'file_count' not in columns:
+            cursor.execute("ALTER TABLE vessel_registry ADD COLUMN file_count INTEGER NOT NULL DEFAULT 0")
+        if 'primary_photo_id' not in columns:
+            cursor.execute("ALTER TABLE vessel_registry ADD COLUMN primary_photo_id INTEGER")
 
         # 항차 테이블
         cursor.execute("""
@@ -91,6 +303,19 @@ def init_db():
             )
         """)
 
+        # 항적 분석 결과 컬럼 (fishing_activity.py에서 기록)
+        cursor.execute("PRAGMA table_info(voyages)")
+        voyage_columns = [col[1] for col in cursor.fetchall()]
+        for name, col_type in [
+            ('fishing_hours', 'REAL'),
+            ('steaming_hours', 'REAL'),
+            ('port_hours', 'REAL'),
+            ('fishing_polygon', 'TEXT'),
+            ('activity_analyzed_at', 'TIMESTAMP'),
+        ]:
+            if name not in voyage_columns:
+                cursor.execute(f"ALTER TABLE voyages ADD COLUMN {name} {col_type}")
+
         # 항적 포인트 테이블
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS track_points (
@@ -105,6 +330,112 @@ def init_db():
             )
         """)
 
+        # 항차별 (voyage_id, timestamp) 중복 제거 후 유니크 인덱스
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_track_points_voyage_time'")
+        if cursor.fetchone() is None:
+            cursor.execute("""
+                DELETE FROM track_points WHERE id NOT IN (
+                    SELECT MIN(id) FROM track_points GROUP BY voyage_id, timestamp
+                )
+            """)
+            cursor.execute("CREATE UNIQUE INDEX idx_track_points_voyage_time ON track_points(voyage_id, timestamp)")
+
+        # 항적 컬럼형 블록 테이블 (track_store.py 참고)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS track_blocks (
+                voyage_id TEXT NOT NULL,
+                block_no INTEGER NOT NULL,
+                start_time INTEGER NOT NULL,
+                end_time INTEGER NOT NULL,
+                point_count INTEGER NOT NULL,
+                min_lat REAL,
+                max_lat REAL,
+                min_lon REAL,
+                max_lon REAL,
+                lat BLOB NOT NULL,
+                lon BLOB NOT NULL,
+                epoch BLOB NOT NULL,
+                speed BLOB NOT NULL,
+                course BLOB NOT NULL,
+                PRIMARY KEY (voyage_id, block_no)
+            ) WITHOUT ROWID
+        """)
+
+        # 항적 HTML 파일 색인 (track_html_index.py 스캐너가 유지)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS track_html_files (
+                mmsi TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER,
+                count INTEGER,
+                size INTEGER,
+                mtime REAL,
+                PRIMARY KEY (mmsi, filename)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_track_html_files_year ON track_html_files(mmsi, year, month)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS track_html_dirs (
+                mmsi TEXT PRIMARY KEY,
+                mtime REAL,
+                file_count INTEGER NOT NULL DEFAULT 0,
+                checked_at REAL NOT NULL
+            )
+        """)
+
+        # 항적 HTML 좌표 추출 상태 (track_html_extract.py, 파일 단위 재개용)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS track_html_imports (
+                mmsi TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                voyage_id TEXT,
+                size INTEGER,
+                mtime REAL,
+                status TEXT NOT NULL,
+                points INTEGER NOT NULL DEFAULT 0,
+                inserted INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                imported_at TIMESTAMP,
+                PRIMARY KEY (mmsi, filename)
+            ) WITHOUT ROWID
+        """)
+
+        # 항적 공간 색인: 블록을 SPATIAL_CHUNK 포인트 단위로 나눈 (경도, 위도, 시간) 범위 R-tree
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'track_rtree'")
+        backfill_spatial_index = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS track_rtree USING rtree(
+                id, min_lon, max_lon, min_lat, max_lat, start_time, end_time
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS track_chunks (
+                id INTEGER PRIMARY KEY,
+                voyage_id TEXT NOT NULL,
+                block_no INTEGER NOT NULL,
+                start_index INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_track_chunks_voyage ON track_chunks(voyage_id)")
+
+        # 항적 LOD 테이블 (단계별 Douglas-Peucker 단순화 결과, 블록과 같은 인코딩)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS track_lod (
+                voyage_id TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                tolerance REAL NOT NULL,
+                point_count INTEGER NOT NULL,
+                start_time INTEGER NOT NULL,
+                lat BLOB NOT NULL,
+                lon BLOB NOT NULL,
+                epoch BLOB NOT NULL,
+                speed BLOB NOT NULL,
+                course BLOB NOT NULL,
+                PRIMARY KEY (voyage_id, level)
+            ) WITHOUT ROWID
+        """)
+
         # 위판 테이블
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS auctions (
@@ -177,6 +508,16 @@ def init_db():
         if 'updated_at' not in exp_columns:
             cursor.execute("ALTER TABLE expenses ADD COLUMN updated_at TIMESTAMP")
 
+        # 위판/사매/경비 ID 순번 (테이블·연도별 마지막 번호)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS id_sequences (
+                name TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                last_value INTEGER NOT NULL,
+                PRIMARY KEY (name, year)
+            )
+        """)
+
         # 수정이력 테이블 (위판/사매/경비 공용)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS modification_history (
@@ -189,7 +530,24 @@ def init_db():
                 modified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_record ON modification_history(record_type, record_id)")
+        # 변경 묶음 ID, 항차 ID 컬럼 추가 (기존 DB 마이그레이션, 기존 이력의 항차는 원본 행에서 채움)
+        cursor.execute("PRAGMA table_info(modification_history)")
+        history_columns = [col[1] for col in cursor.fetchall()]
+        if 'change_set_id' not in history_columns:
+            cursor.execute("ALTER TABLE modification_history ADD COLUMN change_set_id TEXT")
+        if 'voyage_id' not in history_columns:
+            cursor.execute("ALTER TABLE modification_history ADD COLUMN voyage_id TEXT")
+            cursor.execute("""
+                UPDATE modification_history SET voyage_id = CASE record_type
+                    WHEN 'auction' THEN (SELECT voyage_id FROM auctions WHERE id = record_id)
+                    WHEN 'private_sale' THEN (SELECT voyage_id FROM private_sales WHERE id = record_id)
+                    WHEN 'expense' THEN (SELECT voyage_id FROM expenses WHERE id = record_id)
+                END
+            """)
+        # 이력 조회: 레코드별 / 항차·기간별 / 기간별 / 변경 묶음별
+        cursor.execute("DROP INDEX IF EXISTS idx_history_record")
+        for sql in MODIFICATION_HISTORY_INDEXES.values():
+            cursor.execute(sql)
 
         # 어선 메모 테이블
         cursor.execute("""
@@ -235,15 +593,62 @@ def init_db():
             )
         """)
 
+        # 어선 그룹 소속 테이블 (어선:그룹 = N:M, rowid 순서 = 그룹 추가 순서)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vessel_groups'")
+        migrate_groups = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS vessel_groups (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                vessel_id INTEGER NOT NULL,
+                group_name TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (vessel_id, group_name),
+                FOREIGN KEY (vessel_id) REFERENCES vessel_registry(id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_groups_group ON vessel_groups(group_name, vessel_id)")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_vessel_groups_delete AFTER DELETE ON vessel_registry BEGIN
+                DELETE FROM vessel_groups WHERE vessel_id = old.id;
+            END
+        """)
+        if migrate_groups:
+            # 기존 쉼표 구분 group_name 문자열을 소속 테이블로 이전
+            cursor.execute("""
+                SELECT id, group_name FROM vessel_registry
+                WHERE group_name IS NOT NULL AND group_name != ''
+                ORDER BY id
+            """)
+            memberships = [
+                (row[0], name)
+                for row in cursor.fetchall()
+                for name in split_group_names(row[1])
+            ]
+            cursor.executemany(
+                "INSERT OR IGNORE INTO vessel_groups (vessel_id, group_name) VALUES (?, ?)",
+                memberships
+            )
+
+        for sql in VESSEL_COUNTER_TRIGGERS:
+            cursor.execute(sql)
+        if repair_counters:
+            repair_vessel_counters(cursor)
+        if create_sales_rollup_tables(cursor):
+            rebuild_sales_rollups(cursor)
+        if backfill_spatial_index:
+            import track_store
+            track_store.rebuild_spatial_index(cursor)
+
         # 인덱스 생성
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_mmsi ON vessel_registry(mmsi)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_name ON vessel_registry(vessel_name)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_port ON vessel_registry(port)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_registration ON vessel_registry(registration_no)")
+        for sql in VESSEL_REGISTRY_INDEXES.values():
+            cursor.execute(sql)
+        create_vessel_fts(cursor)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_voyages_mmsi ON voyages(mmsi)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_auctions_voyage ON auctions(voyage_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_private_sales_voyage ON private_sales(voyage_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_voyage ON expenses(voyage_id)")
+        # 위판/사매/경비: (항차, 일자) 인덱스가 기존 항차 단일 인덱스를 대신함
+        for name in ('idx_auctions_voyage', 'idx_private_sales_voyage', 'idx_expenses_voyage'):
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        for sql in SALES_INDEXES.values():
+            cursor.execute(sql)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_memos_vessel ON vessel_memos(vessel_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_photos_vessel ON vessel_photos(vessel_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_vessel_files_vessel ON vessel_files(vessel_id)")
@@ -251,21 +656,576 @@ def init_db():
         conn.commit()
 
 
-def load_csv_to_db(csv_path=None, force=False):
+# vessel_registry.photo_count / file_count / primary_photo_id 유지 트리거
+_PRIMARY_PHOTO_SQL = """
+    UPDATE vessel_registry SET primary_photo_id = (
+        SELECT id FROM vessel_photos WHERE vessel_id = {ref}.vessel_id AND is_primary = 1
+        ORDER BY id DESC LIMIT 1
+    ) WHERE id = {ref}.vessel_id;
+"""
+
+VESSEL_COUNTER_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_vessel_photos_insert AFTER INSERT ON vessel_photos BEGIN
+        UPDATE vessel_registry SET photo_count = photo_count + 1 WHERE id = new.vessel_id;
+        {_PRIMARY_PHOTO_SQL.format(ref='new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_vessel_photos_delete AFTER DELETE ON vessel_photos BEGIN
+        UPDATE vessel_registry SET photo_count = photo_count - 1 WHERE id = old.vessel_id;
+        {_PRIMARY_PHOTO_SQL.format(ref='old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_vessel_photos_primary AFTER UPDATE OF is_primary ON vessel_photos
+    WHEN old.is_primary IS NOT new.is_primary BEGIN
+        {_PRIMARY_PHOTO_SQL.format(ref='new')}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_vessel_files_insert AFTER INSERT ON vessel_files BEGIN
+        UPDATE vessel_registry SET file_count = file_count + 1 WHERE id = new.vessel_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_vessel_files_delete AFTER DELETE ON vessel_files BEGIN
+        UPDATE vessel_registry SET file_count = file_count - 1 WHERE id = old.vessel_id;
+    END
+    """,
+]
+
+_COUNTER_EXPECTED_SQL = """
+    SELECT v.id,
+        v.photo_count, (SELECT COUNT(*) FROM vessel_photos WHERE vessel_id = v.id) AS actual_photo_count,
+        v.file_count, (SELECT COUNT(*) FROM vessel_files WHERE vessel_id = v.id) AS actual_file_count,
+        v.primary_photo_id, (
+            SELECT id FROM vessel_photos WHERE vessel_id = v.id AND is_primary = 1
+            ORDER BY id DESC LIMIT 1
+        ) AS actual_primary_photo_id
+    FROM vessel_registry v
+"""
+
+
+def check_vessel_counters(cursor):
+    """사진/파일 수, 대표 사진 컬럼이 실제와 다른 어선 목록 반환"""
+    cursor.execute(f"""
+        SELECT * FROM ({_COUNTER_EXPECTED_SQL})
+        WHERE photo_count != actual_photo_count
+           OR file_count != actual_file_count
+           OR primary_photo_id IS NOT actual_primary_photo_id
+    """)
+    return [dict(zip([d[0] for d in cursor.description], row)) for row in cursor.fetchall()]
+
+
+def repair_vessel_counters(cursor):
+    """사진/파일 수, 대표 사진 컬럼을 실제 데이터로 재계산
+
+    Returns:
+        int: 수정된 어선 수
+    """
+    mismatches = check_vessel_counters(cursor)
+    cursor.executemany("""
+        UPDATE vessel_registry SET photo_count = ?, file_count = ?, primary_photo_id = ? WHERE id = ?
+    """, [
+        (m['actual_photo_count'], m['actual_file_count'], m['actual_primary_photo_id'], m['id'])
+        for m in mismatches
+    ])
+    return len(mismatches)
+
+
+# ==================== 판매/경비 집계 (정산) 및 대시보드 통계 ====================
+
+# 집계 테이블: 이름 -> (키 컬럼 목록, 집계 컬럼 목록)
+SALES_ROLLUP_TABLES = {
+    'voyage_settlement': (
+        ['voyage_id'],
+        ['auction_revenue', 'auction_quantity', 'auction_count',
+         'private_revenue', 'private_quantity', 'private_count',
+         'expense_amount', 'expense_count'],
+    ),
+    'vessel_month_settlement': (
+        ['mmsi', 'month'],
+        ['auction_revenue', 'auction_quantity', 'auction_count',
+         'private_revenue', 'private_quantity', 'private_count',
+         'expense_amount', 'expense_count'],
+    ),
+    'species_sales_rollup': (
+        ['fish_species', 'month'],
+        ['auction_revenue', 'auction_quantity', 'auction_count',
+         'private_revenue', 'private_quantity', 'private_count'],
+    ),
+    'port_sales_rollup': (
+        ['auction_port', 'month'],
+        ['auction_revenue', 'auction_quantity', 'auction_count'],
+    ),
+    'month_settlement': (
+        ['month'],
+        ['auction_revenue', 'auction_quantity', 'auction_count',
+         'private_revenue', 'private_quantity', 'private_count',
+         'expense_amount', 'expense_count'],
+    ),
+    # 판매 분석 큐브 (월·어종·위판장·단가 구간, 사매는 auction_port = '') - 전체 선단 조회용
+    'sales_cube': (
+        ['month', 'fish_species', 'auction_port', 'price_bucket'],
+        ['auction_revenue', 'auction_quantity', 'auction_count',
+         'private_revenue', 'private_quantity', 'private_count'],
+    ),
+    # 위와 같고 어선(MMSI) 키 추가 - 어선/선단별 조회용
+    'vessel_sales_cube': (
+        ['month', 'mmsi', 'fish_species', 'auction_port', 'price_bucket'],
+        ['auction_revenue', 'auction_quantity', 'auction_count',
+         'private_revenue', 'private_quantity', 'private_count'],
+    ),
+    # 대시보드 통계 (출항 월 기준, 출항일이 없으면 month = '')
+    'voyage_month_stats': (
+        ['month'],
+        ['voyage_count', 'active_count', 'catch_amount'],
+    ),
+}
+
+# 원본 테이블 -> (날짜 컬럼, 집계 컬럼 -> 원본 식, 반영할 집계 테이블)
+SALES_ROLLUP_SOURCES = {
+    'auctions': (
+        'auction_date',
+        {'auction_revenue': '{r}.total_price', 'auction_quantity': '{r}.quantity', 'auction_count': '1'},
+        ['voyage_settlement', 'vessel_month_settlement', 'species_sales_rollup', 'port_sales_rollup',
+         'month_settlement', 'sales_cube', 'vessel_sales_cube'],
+    ),
+    'private_sales': (
+        'sale_date',
+        {'private_revenue': '{r}.total_price', 'private_quantity': '{r}.quantity', 'private_count': '1'},
+        ['voyage_settlement', 'vessel_month_settlement', 'species_sales_rollup', 'month_settlement',
+         'sales_cube', 'vessel_sales_cube'],
+    ),
+    'expenses': (
+        'expense_date',
+        {'expense_amount': '{r}.amount', 'expense_count': '1'},
+        ['voyage_settlement', 'vessel_month_settlement', 'month_settlement'],
+    ),
+    'voyages': (
+        'departure_date',
+        {'voyage_count': '1', 'active_count': "{r}.status = '조업중'",
+         'catch_amount': 'COALESCE({r}.catch_amount, 0)'},
+        ['voyage_month_stats'],
+    ),
+}
+
+# UPDATE 트리거를 일부 컬럼 변경에만 거는 원본 (항적 분석 결과 기록 등은 통계와 무관)
+_ROLLUP_UPDATE_COLUMNS = {
+    'voyages': ['departure_date', 'status', 'catch_amount'],
+}
+
+# 단가 구간 밑 (구간 b = floor(log_밑(단가)), 대표값 밑^(b+0.5)의 상대 오차는 최대 sqrt(밑)-1 ≈ 2.5%)
+# 바꾸면 rebuild-rollups로 판매 분석 큐브를 다시 만들어야 한다
+PRICE_BUCKET_BASE = 1.05
+PRICE_BUCKET_SQL = f"CAST(floor(ln(max(COALESCE({{r}}.unit_price, 0), 1)) / ln({PRICE_BUCKET_BASE})) AS INTEGER)"
+
+# 키 컬럼 -> 원본 행({r})에서 값을 구하는 식 ({date}: 원본 날짜 컬럼)
+_ROLLUP_KEY_SQL = {
+    'voyage_id': '{r}.voyage_id',
+    'mmsi': "COALESCE((SELECT mmsi FROM voyages WHERE id = {r}.voyage_id), '')",
+    'month': "COALESCE(substr({r}.{date}, 1, 7), '')",
+    'fish_species': '{r}.fish_species',
+    'auction_port': '{r}.auction_port',
+    'price_bucket': PRICE_BUCKET_SQL,
+}
+
+# 원본에 해당 컬럼이 없는 키의 대체 식 (원본, 키) -> 식
+_ROLLUP_SOURCE_KEY_SQL = {
+    ('private_sales', 'auction_port'): "''",
+}
+
+# TEXT가 아닌 키 컬럼 타입
+_ROLLUP_KEY_TYPES = {'price_bucket': 'INTEGER'}
+
+
+def _rollup_key_exprs(keys, source, ref):
+    date_col = SALES_ROLLUP_SOURCES[source][0]
+    return [
+        _ROLLUP_SOURCE_KEY_SQL.get((source, k), _ROLLUP_KEY_SQL[k]).format(r=ref, date=date_col) for k in keys
+    ]
+
+
+def _rollup_upsert_sql(table, source, ref, sign):
+    """원본 행 하나를 집계 테이블에 더하는(sign=-1이면 빼는) UPSERT 문"""
+    keys, _ = SALES_ROLLUP_TABLES[table]
+    _, metrics, _ = SALES_ROLLUP_SOURCES[source]
+    key_exprs = _rollup_key_exprs(keys, source, ref)
+    metric_exprs = [f"{sign} * ({expr.format(r=ref)})" for expr in metrics.values()]
+    return f"""
+        INSERT INTO {table} ({', '.join(keys + list(metrics))})
+        VALUES ({', '.join(key_exprs + metric_exprs)})
+        ON CONFLICT({', '.join(keys)}) DO UPDATE SET
+            {', '.join(f'{m} = {m} + excluded.{m}' for m in metrics)};"""
+
+
+def _rollup_trigger_sql():
+    """집계 유지 트리거 {이름: CREATE 문}"""
+    statements = {}
+    for source, (_, _, tables) in SALES_ROLLUP_SOURCES.items():
+        body = {
+            'insert': [_rollup_upsert_sql(t, source, 'new', 1) for t in tables],
+            'delete': [_rollup_upsert_sql(t, source, 'old', -1) for t in tables],
+        }
+        body['update'] = body['delete'] + body['insert']
+        for event, sqls in body.items():
+            timing = event.upper()
+            if event == 'update' and source in _ROLLUP_UPDATE_COLUMNS:
+                timing += f" OF {', '.join(_ROLLUP_UPDATE_COLUMNS[source])}"
+            name = f"trg_{source}_rollup_{event}"
+            statements[name] = f"""
+    CREATE TRIGGER {name} AFTER {timing} ON {source} BEGIN
+        {''.join(sqls)}
+    END
+    """
+    return statements
+
+
+def create_sales_rollup_tables(cursor):
+    """집계 테이블과 유지 트리거 생성
+
+    Returns:
+        bool: 집계 테이블을 하나라도 새로 만들었으면 True (기존 데이터로 채워야 함)
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing = {row[0] for row in cursor.fetchall()}
+    created = any(table not in existing for table in SALES_ROLLUP_TABLES)
+    for table, (keys, metrics) in SALES_ROLLUP_TABLES.items():
+        columns = [f"{k} {_ROLLUP_KEY_TYPES.get(k, 'TEXT')} NOT NULL" for k in keys] + [
+            f"{m} {'INTEGER' if m.endswith('_count') else 'REAL'} NOT NULL DEFAULT 0" for m in metrics
+        ]
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {', '.join(columns)},
+                PRIMARY KEY ({', '.join(keys)})
+            ) WITHOUT ROWID
+        """)
+    # 집계 대상이 바뀌었을 수 있으므로 트리거는 항상 다시 만든다
+    for name, sql in _rollup_trigger_sql().items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(sql)
+    return created
+
+
+def rebuild_sales_rollups(cursor):
+    """위판/사매/경비/항차 원본으로 집계 테이블 전체 재계산 (트리거 누락·부동소수 오차 정리용)
+
+    Returns:
+        dict: 테이블별 행 수
+    """
+    for table in SALES_ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+    for source, (_, metrics, tables) in SALES_ROLLUP_SOURCES.items():
+        for table in tables:
+            keys, _ = SALES_ROLLUP_TABLES[table]
+            key_exprs = _rollup_key_exprs(keys, source, 't')
+            sums = [f"SUM({expr.format(r='t')})" for expr in metrics.values()]
+            # SELECT 뒤 ON CONFLICT 구문 모호성을 피하려고 WHERE true 사용
+            cursor.execute(f"""
+                INSERT INTO {table} ({', '.join(keys + list(metrics))})
+                SELECT * FROM (
+                    SELECT {', '.join(key_exprs + sums)} FROM {source} t
+                    GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}
+                ) WHERE true
+                ON CONFLICT({', '.join(keys)}) DO UPDATE SET
+                    {', '.join(f'{m} = {m} + excluded.{m}' for m in metrics)}
+            """)
+    counts = {}
+    for table in SALES_ROLLUP_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+# ID 순번을 쓰는 테이블 -> ID 접두어 ({접두어}-{연도}-{순번:03d})
+RECORD_ID_PREFIXES = {'auctions': 'AUC', 'private_sales': 'PVS', 'expenses': 'EXP'}
+
+
+def next_record_ids(cursor, table, count=1, year=None):
+    """위판/사매/경비 새 ID 여러 개 발급 (예: AUC-2025-001)
+
+    id_sequences의 테이블·연도별 번호를 UPDATE ... RETURNING으로 count만큼 올리므로 INSERT와
+    같은 쓰기 트랜잭션 안에서 호출하면 동시 등록에도 번호가 겹치지 않고, 삭제된 번호도
+    다시 쓰지 않는다. 그 연도의 첫 발급일 때만 기존 행의 최대 번호에서 이어간다.
+    """
+    prefix = RECORD_ID_PREFIXES[table]
+    year = year or datetime.now().year
+    cursor.execute(
+        "UPDATE id_sequences SET last_value = last_value + ? WHERE name = ? AND year = ? RETURNING last_value",
+        (count, table, year)
+    )
+    row = cursor.fetchone()
+    if row is not None:
+        last = row[0]
+    else:
+        # 순번 도입 전(COUNT 방식)에 만든 ID와 겹치지 않도록 기존 최대 번호 다음부터
+        cursor.execute(f"SELECT id FROM {table} WHERE id GLOB ?", (f"{prefix}-{year}-*",))
+        suffixes = (r[0].rsplit('-', 1)[1] for r in cursor.fetchall())
+        last = max((int(n) for n in suffixes if n.isdigit()), default=0) + count
+        cursor.execute("INSERT INTO id_sequences (name, year, last_value) VALUES (?, ?, ?)", (table, year, last))
+    return [f"{prefix}-{year}-{value:03d}" for value in range(last - count + 1, last + 1)]
+
+
+def next_record_id(cursor, table, year=None):
+    """위판/사매/경비 새 ID 한 개 발급 (next_record_ids 참고)"""
+    return next_record_ids(cursor, table, 1, year)[0]
+
+
+def split_group_names(group_name):
+    """쉼표로 구분된 그룹 문자열을 중복 없는 그룹 목록으로 분리 (순서 유지)"""
+    if not group_name:
+        return []
+    names = []
+    for name in group_name.split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+# ==================== 전국어선정보 CSV 로딩 ====================
+
+def _to_float(val):
+    if not val or val == '-' or val.strip() == '':
+        return None
+    try:
+        return float(val.replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _to_int(val):
+    if not val or val == '-' or val.strip() == '':
+        return None
+    try:
+        return int(float(val))
+    except ValueError:
+        return None
+
+
+def _to_str(val):
+    if not val or val == '-':
+        return None
+    return val.strip() or None
+
+
+# (DB 컬럼, CSV 헤더, 변환 함수) - 순서가 INSERT 컬럼 순서
+VESSEL_CSV_COLUMNS = [
+    ('vessel_name', '선명', _to_str),
+    ('tonnage', '톤수', _to_float),
+    ('length', '길이', _to_float),
+    ('engine_type', '엔진종류', _to_str),
+    ('engine_count', '엔진갯수', _to_int),
+    ('engine_power_ps', '엔진출력PS', _to_float),
+    ('engine_power_kw', '엔진출력KW', _to_float),
+    ('hull_material', '선질', _to_str),
+    ('registration_no', '등록번호', _to_str),
+    ('build_date', '건조일시', _to_str),
+    ('port', '선적지', _to_str),
+    ('business_type', '업종', _to_str),
+    ('equipment_name', '장비명', _to_str),
+    ('equipment_power', '출력', _to_str),
+    ('mmsi', 'MMSI', _to_str),
+    ('license_local', '어업인허가(시군구)', _to_str),
+    ('license_start_local', '허가시작일(시군구)', _to_str),
+    ('license_end_local', '허가종료일(시군구)', _to_str),
+    ('license_province', '어업인허가(시도)', _to_str),
+    ('license_start_province', '허가시작일(시도)', _to_str),
+    ('license_end_province', '허가종료일(시도)', _to_str),
+]
+
+# 대량 로딩 시 삭제 후 재생성하는 vessel_registry 인덱스
+VESSEL_REGISTRY_INDEXES = {
+    'idx_vessel_mmsi': "CREATE INDEX IF NOT EXISTS idx_vessel_mmsi ON vessel_registry(mmsi)",
+    'idx_vessel_name': "CREATE INDEX IF NOT EXISTS idx_vessel_name ON vessel_registry(vessel_name)",
+    'idx_vessel_port': "CREATE INDEX IF NOT EXISTS idx_vessel_port ON vessel_registry(port)",
+    'idx_vessel_registration': "CREATE INDEX IF NOT EXISTS idx_vessel_registration ON vessel_registry(registration_no)",
+}
+
+# 위판/사매/경비 목록 조회 인덱스
+#   - (voyage_id, 일자): 항차별 목록 (ORDER BY 일자 DESC를 정렬 없이)
+#   - (일자, id, ...): 기간 조회/전체 목록/통합 원장 커서 페이지네이션 순서 그대로 읽고,
+#     뒤쪽 컬럼까지 포함해 원장 합계(어종/위판장/카테고리/항차별 수량·금액)는 테이블 없이 인덱스만 읽음
+SALES_INDEXES = {
+    'idx_auctions_voyage_date': "CREATE INDEX IF NOT EXISTS idx_auctions_voyage_date ON auctions(voyage_id, auction_date)",
+    'idx_auctions_date': """CREATE INDEX IF NOT EXISTS idx_auctions_date
+        ON auctions(auction_date, id, fish_species, auction_port, voyage_id, quantity, total_price)""",
+    'idx_private_sales_voyage_date': "CREATE INDEX IF NOT EXISTS idx_private_sales_voyage_date ON private_sales(voyage_id, sale_date)",
+    'idx_private_sales_date': """CREATE INDEX IF NOT EXISTS idx_private_sales_date
+        ON private_sales(sale_date, id, fish_species, voyage_id, quantity, total_price)""",
+    'idx_expenses_voyage_date': "CREATE INDEX IF NOT EXISTS idx_expenses_voyage_date ON expenses(voyage_id, expense_date)",
+    'idx_expenses_date': """CREATE INDEX IF NOT EXISTS idx_expenses_date
+        ON expenses(expense_date, id, category, voyage_id, amount)""",
+}
+
+# modification_history 조회 인덱스 (ID 접두어가 종류별로 달라 record_id만으로 구분됨)
+MODIFICATION_HISTORY_INDEXES = {
+    'idx_history_record_time': "CREATE INDEX IF NOT EXISTS idx_history_record_time ON modification_history(record_id, modified_at)",
+    'idx_history_voyage_time': "CREATE INDEX IF NOT EXISTS idx_history_voyage_time ON modification_history(voyage_id, modified_at)",
+    'idx_history_time': "CREATE INDEX IF NOT EXISTS idx_history_time ON modification_history(modified_at)",
+    'idx_history_change_set': "CREATE INDEX IF NOT EXISTS idx_history_change_set ON modification_history(change_set_id)",
+}
+
+# 어선 검색용 FTS5 trigram 인덱스 (vessel_registry를 외부 content로 사용)
+VESSEL_FTS_COLUMNS = ['vessel_name', 'mmsi', 'registration_no', 'owner_name', 'port']
+
+VESSEL_FTS_TRIGGERS = {
+    'trg_vessel_fts_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vessel_fts_insert AFTER INSERT ON vessel_registry BEGIN
+            INSERT INTO vessel_registry_fts(rowid, {', '.join(VESSEL_FTS_COLUMNS)})
+            VALUES (new.id, {', '.join('new.' + c for c in VESSEL_FTS_COLUMNS)});
+        END
+    """,
+    'trg_vessel_fts_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vessel_fts_delete AFTER DELETE ON vessel_registry BEGIN
+            INSERT INTO vessel_registry_fts(vessel_registry_fts, rowid, {', '.join(VESSEL_FTS_COLUMNS)})
+            VALUES ('delete', old.id, {', '.join('old.' + c for c in VESSEL_FTS_COLUMNS)});
+        END
+    """,
+    'trg_vessel_fts_update': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vessel_fts_update
+        AFTER UPDATE OF {', '.join(VESSEL_FTS_COLUMNS)} ON vessel_registry BEGIN
+            INSERT INTO vessel_registry_fts(vessel_registry_fts, rowid, {', '.join(VESSEL_FTS_COLUMNS)})
+            VALUES ('delete', old.id, {', '.join('old.' + c for c in VESSEL_FTS_COLUMNS)});
+            INSERT INTO vessel_registry_fts(rowid, {', '.join(VESSEL_FTS_COLUMNS)})
+            VALUES (new.id, {', '.join('new.' + c for c in VESSEL_FTS_COLUMNS)});
+        END
+    """,
+}
+
+
+def create_vessel_fts(cursor):
+    """어선 검색 FTS 테이블과 동기화 트리거 생성
+
+    FTS 테이블을 새로 만들었거나 동기화 트리거가 하나라도 없었으면(그동안의 어선 변경이
+    색인에 반영되지 않았을 수 있음) 기존 데이터로 다시 색인한다.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'vessel_registry_fts'")
+    exists = cursor.fetchone() is not None
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'vessel_registry'")
+    triggers_missing = not set(VESSEL_FTS_TRIGGERS) <= {row[0] for row in cursor.fetchall()}
+    if not exists:
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE vessel_registry_fts USING fts5(
+                {', '.join(VESSEL_FTS_COLUMNS)},
+                content='vessel_registry', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    for sql in VESSEL_FTS_TRIGGERS.values():
+        cursor.execute(sql)
+    if not exists or triggers_missing:
+        rebuild_vessel_fts(cursor)
+
+
+def rebuild_vessel_fts(cursor):
+    """vessel_registry 전체로 FTS 색인 재생성"""
+    cursor.execute("INSERT INTO vessel_registry_fts(vessel_registry_fts) VALUES ('rebuild')")
+
+
+CSV_BATCH_SIZE = 5000
+
+# 결과에 포함하는 제외 행 최대 개수
+MAX_ERROR_ROWS = 1000
+
+
+class ImportCancelled(Exception):
+    """CSV 가져오기 작업이 취소됨"""
+
+
+def _row_hash(values):
+    """변환된 CSV 행의 해시 (증분 업로드 시 변경 여부 비교용)"""
+    return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _compile_row_converter(header):
+    """CSV 헤더로부터 행 변환 함수 생성 (헤더 위치는 한 번만 조회)
+
+    반환 튜플은 VESSEL_CSV_COLUMNS 순서의 값 뒤에 row_hash가 붙는다.
+    """
+    index = {name: i for i, name in enumerate(header)}
+    width = len(header)
+    converters = [(index.get(csv_name), fn) for _, csv_name, fn in VESSEL_CSV_COLUMNS]
+
+    def convert(row):
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        values = tuple(fn(row[i]) if i is not None else None for i, fn in converters)
+        return values + (_row_hash(values),)
+
+    return convert
+
+
+def iter_csv_batches(csv_path, batch_size=CSV_BATCH_SIZE):
+    """CSV 파일을 batch_size 행 단위로 변환하여 스트리밍"""
+    # CSV 파일 읽기 (UTF-8-BOM 처리)
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        convert = _compile_row_converter([h.strip() for h in header])
+
+        batch = []
+        for row in reader:
+            if not row:
+                continue
+            batch.append(convert(row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+_NAME_IDX = [col for col, _, _ in VESSEL_CSV_COLUMNS].index('vessel_name')
+_REG_IDX = [col for col, _, _ in VESSEL_CSV_COLUMNS].index('registration_no')
+
+
+def _reject_reason(values, seen):
+    """삽입할 수 없는 행이면 사유를, 정상 행이면 None을 반환"""
+    if not values[_NAME_IDX]:
+        return '선명 누락'
+    reg_no = values[_REG_IDX]
+    if reg_no and reg_no in seen:
+        return f'등록번호 중복: {reg_no}'
+    return None
+
+
+def load_csv_to_db(csv_path=None, force=False, bulk=False, batch_size=CSV_BATCH_SIZE, rebuild_indexes=None,
+                   progress=None, cancel_event=None):
     """CSV 파일에서 어선 정보를 DB로 로드
 
+    CSV를 batch_size 행 단위로 읽어 executemany로 삽입한다.
+
     Args:
         csv_path: CSV 파일 경로 (None이면 기본 경로 사용)
         force: True이면 기존 데이터 삭제 후 다시 로드
+        bulk: True이면 대량 로딩 모드 (동기화 끄기, 큰 페이지 캐시)
+        batch_size: executemany 1회당 행 수
+        rebuild_indexes: True이면 로딩 전 인덱스와 FTS 트리거를 삭제하고 로딩 후 재생성
+            (None이면 bulk 값을 따름)
+        progress: 배치마다 progress(parsed, inserted, rejected)로 호출되는 콜백
+        cancel_event: set()되면 배치 경계에서 롤백 후 ImportCancelled 발생
 
     Returns:
-        dict: {'success': bool, 'message': str, 'count': int}
+        dict: {'success': bool, 'message': str, 'count': int, 'rejected': int,
+               'errors': list, 'elapsed': float, 'rows_per_sec': float}
     """
     target_path = Path(csv_path) if csv_path else CSV_PATH
 
     if not target_path.exists():
         return {'success': False, 'message': f'CSV 파일을 찾을 수 없습니다: {target_path}', 'count': 0}
 
+    if rebuild_indexes is None:
+        rebuild_indexes = bulk
+
+    columns = [col for col, _, _ in VESSEL_CSV_COLUMNS] + ['row_hash']
+    insert_sql = (
+        f"INSERT OR IGNORE INTO vessel_registry ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -276,81 +1236,213 @@ def load_csv_to_db(csv_path=None, force=False):
         if count > 0 and not force:
             return {'success': True, 'message': f'이미 {count}개의 어선 정보가 등록되어 있습니다.', 'count': count}
 
-        if force and count > 0:
-            cursor.execute("DELETE FROM vessel_registry")
+        if bulk:
+            cursor.execute("PRAGMA synchronous = OFF")
+            cursor.execute("PRAGMA cache_size = -65536")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+
+        started = time.perf_counter()
+        parsed = 0
+        insert_count = 0
+        errors = []
+        seen = set()
+        try:
+            # sqlite3 기본 모드에서는 DDL이 자동 커밋되므로, 인덱스/트리거 삭제도 롤백되도록
+            # 트랜잭션을 직접 시작한다 (취소/실패 시 원래 인덱스와 FTS 트리거가 그대로 남음)
+            if not conn.in_transaction:
+                cursor.execute("BEGIN")
+            if rebuild_indexes:
+                for name in VESSEL_REGISTRY_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {name}")
+                for name in VESSEL_FTS_TRIGGERS:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+            if force and count > 0:
+                cursor.execute("DELETE FROM vessel_groups")
+                cursor.execute("DELETE FROM vessel_registry")
+                print(f"기존 {count}개 데이터 삭제됨")
+
+            for batch in iter_csv_batches(target_path, batch_size):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ImportCancelled()
+
+                rows = []
+                for i, values in enumerate(batch, start=parsed + 1):
+                    reason = _reject_reason(values, seen)
+                    if reason:
+                        if len(errors) < MAX_ERROR_ROWS:
+                            errors.append({'row': i, 'reason': reason, 'vessel_name': values[_NAME_IDX],
+                                           'registration_no': values[_REG_IDX]})
+                        continue
+                    if values[_REG_IDX]:
+                        seen.add(values[_REG_IDX])
+                    rows.append(values)
+
+                cursor.executemany(insert_sql, rows)
+                parsed += len(batch)
+                # total_changes는 FTS 동기화 트리거가 쓴 행까지 세므로 rowcount 사용
+                insert_count += max(cursor.rowcount, 0)
+                if progress:
+                    progress(parsed, insert_count, parsed - insert_count)
+
+            if rebuild_indexes:
+                for sql in VESSEL_REGISTRY_INDEXES.values():
+                    cursor.execute(sql)
+                for sql in VESSEL_FTS_TRIGGERS.values():
+                    cursor.execute(sql)
+                rebuild_vessel_fts(cursor)
+
             conn.commit()
-            print(f"기존 {count}개 데이터 삭제됨")
+            registry_cache.invalidate()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if bulk:
+                cursor.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+                cursor.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
 
-        # CSV 파일 읽기 (UTF-8-BOM 처리)
-        with open(target_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
+        elapsed = time.perf_counter() - started
+        rejected = parsed - insert_count
+        rows_per_sec = insert_count / elapsed if elapsed > 0 else 0.0
+        if rejected:
+            print(f"{rejected}개 행이 제외되었습니다 (선명 누락 또는 등록번호 중복)")
+        print(f"{insert_count}개의 어선 정보가 등록되었습니다. ({elapsed:.2f}초, {rows_per_sec:,.0f}행/초)")
+        return {
+            'success': True,
+            'message': f'{insert_count}개의 어선 정보가 등록되었습니다.',
+            'count': insert_count,
+            'rejected': rejected,
+            'errors': errors,
+            'elapsed': round(elapsed, 3),
+            'rows_per_sec': round(rows_per_sec, 1),
+        }
 
-            insert_count = 0
-            for row in reader:
-                try:
-                    # 숫자 변환 함수
-                    def to_float(val):
-                        if not val or val == '-' or val.strip() == '':
-                            return None
-                        try:
-                            return float(val.replace(',', ''))
-                        except:
-                            return None
-
-                    def to_int(val):
-                        if not val or val == '-' or val.strip() == '':
-                            return None
-                        try:
-                            return int(float(val))
-                        except:
-                            return None
-
-                    def to_str(val):
-                        if not val or val == '-':
-                            return None
-                        return val.strip() if val else None
-
-                    cursor.execute("""
-                        INSERT INTO vessel_registry (
-                            vessel_name, tonnage, length, engine_type, engine_count,
-                            engine_power_ps, engine_power_kw, hull_material, registration_no,
-                            build_date, port, business_type, equipment_name, equipment_power,
-                            mmsi, license_local, license_start_local, license_end_local,
-                            license_province, license_start_province, license_end_province
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        to_str(row.get('선명')),
-                        to_float(row.get('톤수')),
-                        to_float(row.get('길이')),
-                        to_str(row.get('엔진종류')),
-                        to_int(row.get('엔진갯수')),
-                        to_float(row.get('엔진출력PS')),
-                        to_float(row.get('엔진출력KW')),
-                        to_str(row.get('선질')),
-                        to_str(row.get('등록번호')),
-                        to_str(row.get('건조일시')),
-                        to_str(row.get('선적지')),
-                        to_str(row.get('업종')),
-                        to_str(row.get('장비명')),
-                        to_str(row.get('출력')),
-                        to_str(row.get('MMSI')),
-                        to_str(row.get('어업인허가(시군구)')),
-                        to_str(row.get('허가시작일(시군구)')),
-                        to_str(row.get('허가종료일(시군구)')),
-                        to_str(row.get('어업인허가(시도)')),
-                        to_str(row.get('허가시작일(시도)')),
-                        to_str(row.get('허가종료일(시도)'))
-                    ))
-                    insert_count += 1
-                except Exception as e:
-                    print(f"행 삽입 오류: {e}")
-                    continue
+
+def upsert_csv_to_db(csv_path=None, flag_missing=False, batch_size=CSV_BATCH_SIZE,
+                     progress=None, cancel_event=None):
+    """CSV 파일을 등록번호 기준으로 증분 반영
+
+    기존 행을 지우지 않으므로 id와 사용자 입력 컬럼(group_name, organization,
+    owner_name, fishing_hours) 및 메모/사진/파일 연결이 유지된다.
+    행 해시가 같은 행은 건너뛰고, 바뀐 행만 UPDATE, 새 등록번호는 INSERT 한다.
+
+    Args:
+        csv_path: CSV 파일 경로 (None이면 기본 경로 사용)
+        flag_missing: True이면 CSV에 없는 어선의 deregistered_at을 기록
+        batch_size: executemany 1회당 행 수
+        progress: 배치마다 progress(parsed, inserted + updated, rejected)로 호출되는 콜백
+        cancel_event: set()되면 배치 경계에서 롤백 후 ImportCancelled 발생
+
+    Returns:
+        dict: {'success': bool, 'message': str, 'count': int, 'inserted': int,
+               'updated': int, 'unchanged': int, 'deregistered': int, 'rejected': int,
+               'errors': list, 'elapsed': float, 'rows_per_sec': float}
+    """
+    target_path = Path(csv_path) if csv_path else CSV_PATH
+
+    if not target_path.exists():
+        return {'success': False, 'message': f'CSV 파일을 찾을 수 없습니다: {target_path}', 'count': 0}
+
+    columns = [col for col, _, _ in VESSEL_CSV_COLUMNS] + ['row_hash']
+    hash_idx = columns.index('row_hash')
+    insert_sql = (
+        f"INSERT INTO vessel_registry ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+    update_sql = (
+        f"UPDATE vessel_registry SET {', '.join(f'{c} = ?' for c in columns)}, "
+        f"deregistered_at = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+    )
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        started = time.perf_counter()
+
+        # 등록번호 -> (id, row_hash, deregistered_at)
+        cursor.execute("""
+            SELECT registration_no, id, row_hash, deregistered_at
+            FROM vessel_registry WHERE registration_no IS NOT NULL
+        """)
+        existing = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+        seen = set()
+        errors = []
+        parsed = inserted = updated = unchanged = rejected = deregistered = 0
+        try:
+            for batch in iter_csv_batches(target_path, batch_size):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ImportCancelled()
+
+                inserts = []
+                updates = []
+                for i, values in enumerate(batch, start=parsed + 1):
+                    reg_no = values[_REG_IDX]
+                    # 등록번호가 없는 행은 기준키가 없으므로 제외
+                    reason = _reject_reason(values, seen) or (None if reg_no else '등록번호 누락')
+                    if reason:
+                        rejected += 1
+                        if len(errors) < MAX_ERROR_ROWS:
+                            errors.append({'row': i, 'reason': reason, 'vessel_name': values[_NAME_IDX],
+                                           'registration_no': reg_no})
+                        continue
+                    seen.add(reg_no)
+
+                    current = existing.get(reg_no)
+                    if current is None:
+                        inserts.append(values)
+                    elif current[1] == values[hash_idx] and current[2] is None:
+                        unchanged += 1
+                    else:
+                        updates.append(values + (current[0],))
+
+                parsed += len(batch)
+                if inserts:
+                    cursor.executemany(insert_sql, inserts)
+                    inserted += len(inserts)
+                if updates:
+                    cursor.executemany(update_sql, updates)
+                    updated += len(updates)
+                if progress:
+                    progress(parsed, inserted + updated, rejected)
+
+            if flag_missing:
+                missing = [
+                    (vessel_id,) for reg_no, (vessel_id, _, dereg) in existing.items()
+                    if reg_no not in seen and dereg is None
+                ]
+                cursor.executemany("""
+                    UPDATE vessel_registry
+                    SET deregistered_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, missing)
+                deregistered = len(missing)
 
             conn.commit()
-            print(f"{insert_count}개의 어선 정보가 등록되었습니다.")
-            return {'success': True, 'message': f'{insert_count}개의 어선 정보가 등록되었습니다.', 'count': insert_count}
+            registry_cache.invalidate()
+        except Exception:
+            conn.rollback()
+            raise
 
-    return {'success': False, 'message': '알 수 없는 오류', 'count': 0}
+        elapsed = time.perf_counter() - started
+        rows_per_sec = parsed / elapsed if elapsed > 0 else 0.0
+        message = (f'신규 {inserted}개, 변경 {updated}개, 동일 {unchanged}개'
+                   + (f', 말소 {deregistered}개' if flag_missing else '')
+                   + (f', 제외 {rejected}개' if rejected else ''))
+        print(f"증분 반영 완료: {message} ({elapsed:.2f}초, {rows_per_sec:,.0f}행/초)")
+        return {
+            'success': True,
+            'message': message,
+            'count': inserted + updated,
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': unchanged,
+            'deregistered': deregistered,
+            'rejected': rejected,
+            'errors': errors,
+            'elapsed': round(elapsed, 3),
+            'rows_per_sec': round(rows_per_sec, 1),
+        }
 
 
 def insert_sample_voyages():
@@ -403,6 +1495,24 @@ def insert_sample_voyages():
 
 
 if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["repair-counters"]:
+        init_db()
+        with get_db() as conn:
+            fixed = repair_vessel_counters(conn.cursor())
+            conn.commit()
+        print(f"사진/파일 수 불일치 {fixed}건을 수정했습니다.")
+        sys.exit(0)
+
+    if sys.argv[1:] == ["rebuild-rollups"]:
+        init_db()
+        with get_db() as conn:
+            counts = rebuild_sales_rollups(conn.cursor())
+            conn.commit()
+        print("집계 테이블 재계산: " + ", ".join(f"{t} {n}행" for t, n in counts.items()))
+        sys.exit(0)
+
     print("데이터베이스 초기화 중...")
     init_db()
     print("CSV 데이터 로딩 중...")
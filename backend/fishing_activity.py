@@ -0,0 +1,367 @@
+"""항적 기반 조업 활동 분석
+
+track_points/track_blocks 항적을 구간(연속한 두 포인트) 단위로 항해/조업/정박으로 분류해
+항차별·어선별 조업 시간과 조업 구역(볼록 다각형, GeoJSON)을 계산하고
+voyages / vessel_registry에 기록한다.
+
+여러 항차의 배열을 이어 붙여 한 번에 분류하므로 수천 개 항차도 항차 수만큼
+파이썬 반복을 돌지 않는다 (조업 구역 다각형 계산만 항차별).
+
+분류 기준:
+    정박  : 구간 양 끝이 모두 항구 반경(PORT_RADIUS_KM) 안
+    조업  : 항구 밖에서 속력 FISHING_SPEED_MAX 이하
+            (자망·통발 등 투망 후 대기 포함), 또는 침로 변화가
+            TURN_ANGLE_MIN 이상이면서 속력 TURN_SPEED_MAX 이하
+    항해  : 그 외
+시간 간격이 MAX_SEGMENT_GAP를 넘는 구간은 수신 공백으로 보고 집계하지 않는다.
+
+사용법:
+    python fishing_activity.py [--mmsi MMSI] [--year YEAR]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+import track_store
+from database import get_db, init_db, registry_cache
+
+# 주요 항구 좌표 (위도, 경도)
+PORTS = {
+    "속초": (38.2070, 128.5970),
+    "주문진": (37.8920, 128.8310),
+    "강릉": (37.7720, 128.9500),
+    "동해": (37.4900, 129.1240),
+    "삼척": (37.4280, 129.1880),
+    "후포": (36.6780, 129.4540),
+    "구룡포": (35.9900, 129.5570),
+    "포항": (36.0320, 129.3810),
+    "감포": (35.8050, 129.5040),
+    "울산": (35.5010, 129.3870),
+    "부산": (35.0960, 129.0350),
+    "통영": (34.8410, 128.4260),
+    "삼천포": (34.9250, 128.0680),
+    "여수": (34.7380, 127.7450),
+    "완도": (34.3110, 126.7550),
+    "목포": (34.7840, 126.3800),
+    "군산": (35.9760, 126.6200),
+    "대천": (36.3130, 126.5140),
+    "인천": (37.4560, 126.5970),
+    "제주": (33.5200, 126.5430),
+    "서귀포": (33.2390, 126.5640),
+    "한림": (33.4140, 126.2670),
+}
+
+PORT_RADIUS_KM = 2.0
+FISHING_SPEED_MAX = 5.0   # knot
+TURN_ANGLE_MIN = 30.0     # 도 (구간당)
+TURN_SPEED_MAX = 7.0      # knot
+MAX_SEGMENT_GAP = 2 * 3600  # 초
+
+# 한 번에 이어 붙여 분류하는 항차 수
+ANALYZE_BATCH_SIZE = 500
+
+STEAMING, FISHING, IN_PORT = 0, 1, 2
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_NM = 1.852
+
+_PORT_COORDS = np.radians(np.array(list(PORTS.values())))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """대권 거리(km), 도 단위 배열 입력"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def near_port(lat, lon):
+    """각 포인트가 항구 반경 안인지 (포인트 x 항구 거리 행렬)"""
+    if not len(lat):
+        return np.zeros(0, dtype=bool)
+    lat_r = np.radians(lat)[:, None]
+    lon_r = np.radians(lon)[:, None]
+    a = (np.sin((_PORT_COORDS[:, 0] - lat_r) / 2) ** 2
+         + np.cos(lat_r) * np.cos(_PORT_COORDS[:, 0]) * np.sin((_PORT_COORDS[:, 1] - lon_r) / 2) ** 2)
+    dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return (dist <= PORT_RADIUS_KM).any(axis=1)
+
+
+def classify_segments(lat, lon, epoch, speed, course, voyage_index):
+    """연속 포인트 구간 분류
+
+    Args:
+        lat, lon: 도 단위 배열
+        epoch: epoch 초 배열
+        speed, course: knot / 도 배열 (없으면 NaN, 위치로 계산한 값 사용)
+        voyage_index: 포인트별 항차 번호 (항차가 바뀌는 구간은 제외)
+
+    Returns:
+        tuple: (state[n-1], dt[n-1], valid[n-1])
+    """
+    dt = np.diff(epoch).astype(np.float64)
+    dist_km = haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    valid = (voyage_index[1:] == voyage_index[:-1]) & (dt > 0) & (dt <= MAX_SEGMENT_GAP)
+
+    derived = np.divide(dist_km / KM_PER_NM * 3600, dt, out=np.zeros_like(dt), where=dt > 0)
+    a, b = speed[:-1], speed[1:]
+    reported = np.where(np.isnan(a), b, np.where(np.isnan(b), a, (a + b) / 2))
+    seg_speed = np.where(np.isnan(reported), derived, reported)
+
+    turn = np.abs((course[1:] - course[:-1] + 180) % 360 - 180)
+    turn = np.where(np.isnan(turn), 0, turn)
+
+    port = near_port(lat, lon)
+    in_port = port[:-1] & port[1:]
+
+    state = np.full(len(dt), STEAMING, dtype=np.int8)
+    fishing = (seg_speed <= FISHING_SPEED_MAX) | ((turn >= TURN_ANGLE_MIN) & (seg_speed <= TURN_SPEED_MAX))
+    state[fishing] = FISHING
+    state[in_port] = IN_PORT
+    return state, dt, valid
+
+
+def convex_hull(points):
+    """볼록 껍질 (Andrew monotone chain), 반시계 방향 꼭짓점 배열"""
+    points = np.unique(np.asarray(points, dtype=np.float64), axis=0)
+    if len(points) < 3:
+        return points
+
+    def half(pts):
+        hull = []
+        for p in pts:
+            while len(hull) >= 2 and (
+                (hull[-1][0] - hull[-2][0]) * (p[1] - hull[-2][1])
+                - (hull[-1][1] - hull[-2][1]) * (p[0] - hull[-2][0])
+            ) <= 0:
+                hull.pop()
+            hull.append(p)
+        return hull
+
+    pts = points.tolist()
+    lower = half(pts)
+    upper = half(reversed(pts))
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def hull_geojson(lon, lat):
+    """조업 포인트의 볼록 다각형 GeoJSON 문자열 (포인트가 3개 미만이면 None)
+
+    꼭짓점 수를 줄이기 위해 약 100m(0.001도) 격자로 반올림한 뒤 계산한다.
+    """
+    if len(lon) < 3:
+        return None
+    hull = convex_hull(np.round(np.column_stack([lon, lat]), 3))
+    if len(hull) < 3:
+        return None
+    ring = np.vstack([hull, hull[:1]]).round(4).tolist()
+    return json.dumps({"type": "Polygon", "coordinates": [ring]})
+
+
+def analyze_arrays(parts):
+    """여러 항차의 배열 dict 목록을 한 번에 분석
+
+    Returns:
+        list[dict]: 항차별 {'fishing_hours', 'steaming_hours', 'port_hours', 'fishing_polygon'}
+    """
+    sizes = np.array([len(p["epoch"]) for p in parts])
+    if not sizes.sum():
+        return [{"fishing_hours": 0.0, "steaming_hours": 0.0, "port_hours": 0.0, "fishing_polygon": None}
+                for _ in parts]
+
+    merged = {key: np.concatenate([p[key] for p in parts]) for key in ("lat_e6", "lon_e6", "epoch", "speed", "course")}
+    lat = merged["lat_e6"] / track_store.COORD_SCALE
+    lon = merged["lon_e6"] / track_store.COORD_SCALE
+    voyage_index = np.repeat(np.arange(len(parts)), sizes)
+
+    state, dt, valid = classify_segments(lat, lon, merged["epoch"], merged["speed"], merged["course"], voyage_index)
+    seg_voyage = voyage_index[:-1]
+
+    hours = {}
+    for name, code in (("fishing_hours", FISHING), ("steaming_hours", STEAMING), ("port_hours", IN_PORT)):
+        mask = valid & (state == code)
+        hours[name] = np.bincount(seg_voyage[mask], weights=dt[mask], minlength=len(parts)) / 3600
+
+    # 조업 구간 시작점을 항차별로 나누어 다각형 계산
+    fishing_idx = np.flatnonzero(valid & (state == FISHING))
+    bounds = np.searchsorted(seg_voyage[fishing_idx], np.arange(len(parts) + 1))
+
+    results = []
+    for i in range(len(parts)):
+        idx = fishing_idx[bounds[i]:bounds[i + 1]]
+        results.append({
+            "fishing_hours": round(float(hours["fishing_hours"][i]), 2),
+            "steaming_hours": round(float(hours["steaming_hours"][i]), 2),
+            "port_hours": round(float(hours["port_hours"][i]), 2),
+            "fishing_polygon": hull_geojson(lon[idx], lat[idx]),
+        })
+    return results
+
+
+STATE_NAMES = {STEAMING: "steaming", FISHING: "fishing", IN_PORT: "port"}
+
+
+def activity_runs(arrays):
+    """한 항차의 구간 분류를 같은 상태가 이어지는 구간(run) 목록으로 변환
+
+    Returns:
+        list[dict]: {'state', 'start', 'end', 'hours', 'start_index', 'end_index'}
+    """
+    n = len(arrays["epoch"])
+    if n < 2:
+        return []
+    lat = arrays["lat_e6"] / track_store.COORD_SCALE
+    lon = arrays["lon_e6"] / track_store.COORD_SCALE
+    state, dt, valid = classify_segments(lat, lon, arrays["epoch"], arrays["speed"], arrays["course"],
+                                         np.zeros(n, dtype=np.int64))
+    # 수신 공백 구간은 -1로 표시해 run을 끊는다
+    state = np.where(valid, state, -1)
+    change = np.flatnonzero(np.diff(state)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(state)]))
+    hours = np.add.reduceat(np.where(valid, dt, 0), starts) / 3600
+    timestamps = track_store.format_timestamps(arrays["epoch"][np.concatenate((starts, ends))])
+
+    runs = []
+    for i, (s, e) in enumerate(zip(starts.tolist(), ends.tolist())):
+        if state[s] < 0:
+            continue
+        runs.append({
+            "state": STATE_NAMES[int(state[s])],
+            "start": timestamps[i],
+            "end": timestamps[len(starts) + i],
+            "hours": round(float(hours[i]), 2),
+            "start_index": s,
+            "end_index": e,
+        })
+    return runs
+
+
+def _merge_polygons(polygons):
+    """항차별 조업 구역 다각형들을 감싸는 어선 단위 다각형"""
+    vertices = [ring for p in polygons if p for ring in json.loads(p)["coordinates"][0]]
+    if len(vertices) < 3:
+        return None
+    vertices = np.array(vertices)
+    return hull_geojson(vertices[:, 0], vertices[:, 1])
+
+
+def analyze_voyages(voyage_ids=None, mmsi=None, year=None, batch_size=ANALYZE_BATCH_SIZE, progress=None):
+    """항차 조업 활동 일괄 분석 후 voyages / vessel_registry 갱신
+
+    Args:
+        voyage_ids: 분석할 항차 id 목록 (없으면 mmsi/year 조건의 전체 항차)
+        mmsi, year: 항차 필터
+        batch_size: 한 번에 분류하는 항차 수
+        progress: 배치마다 progress(done, total)로 호출되는 콜백
+
+    Returns:
+        dict: {'voyages', 'skipped'(항적 없음), 'vessels', 'points', 'fishing_hours', 'elapsed'}
+    """
+    started = time.perf_counter()
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        query = "SELECT id, mmsi FROM voyages WHERE 1=1"
+        params = []
+        if voyage_ids:
+            query += " AND id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(voyage_ids)))
+        if mmsi:
+            query += " AND mmsi = ?"
+            params.append(mmsi)
+        if year:
+            query += " AND year = ?"
+            params.append(year)
+        cursor.execute(query + " ORDER BY id", params)
+        targets = [(row["id"], row["mmsi"]) for row in cursor.fetchall()]
+
+    points = analyzed = 0
+    total_hours = 0.0
+    vessels = set()
+    for start in range(0, len(targets), batch_size):
+        chunk = targets[start:start + batch_size]
+        with get_db(readonly=True) as conn:
+            cursor = conn.cursor()
+            parts = [track_store.load_track_arrays(cursor, voyage_id) for voyage_id, _ in chunk]
+        # 항적이 없는 항차는 기존 값(수기 입력 포함)을 그대로 둔다
+        kept = [i for i, p in enumerate(parts) if len(p["epoch"])]
+        chunk = [chunk[i] for i in kept]
+        parts = [parts[i] for i in kept]
+        points += sum(len(p["epoch"]) for p in parts)
+        results = analyze_arrays(parts) if parts else []
+
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE voyages SET fishing_hours = ?, steaming_hours = ?, port_hours = ?,
+                    fishing_polygon = ?, activity_analyzed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [
+                (r["fishing_hours"], r["steaming_hours"], r["port_hours"], r["fishing_polygon"], voyage_id)
+                for (voyage_id, _), r in zip(chunk, results)
+            ])
+            conn.commit()
+        total_hours += sum(r["fishing_hours"] for r in results)
+        vessels.update(m for _, m in chunk if m)
+        analyzed += len(chunk)
+        if progress:
+            progress(min(start + batch_size, len(targets)), len(targets))
+
+    if vessels:
+        update_vessel_activity(vessels)
+
+    return {
+        "voyages": analyzed,
+        "skipped": len(targets) - analyzed,
+        "vessels": len(vessels),
+        "points": points,
+        "fishing_hours": round(total_hours, 2),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def update_vessel_activity(mmsis):
+    """분석된 항차 합계로 vessel_registry.fishing_hours / fishing_polygon 갱신"""
+    mmsi_json = json.dumps(sorted(mmsis))
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT mmsi, SUM(fishing_hours) AS hours, json_group_array(fishing_polygon) AS polygons
+            FROM voyages
+            WHERE mmsi IN (SELECT value FROM json_each(?)) AND activity_analyzed_at IS NOT NULL
+            GROUP BY mmsi
+        """, (mmsi_json,))
+        rows = [
+            (round(row["hours"] or 0, 2), _merge_polygons(json.loads(row["polygons"])), row["mmsi"])
+            for row in cursor.fetchall()
+        ]
+        cursor.executemany("""
+            UPDATE vessel_registry SET fishing_hours = ?, fishing_polygon = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE mmsi = ?
+        """, rows)
+        conn.commit()
+    registry_cache.invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="항적 기반 조업 활동 분석")
+    parser.add_argument("--mmsi")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--batch-size", type=int, default=ANALYZE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    result = analyze_voyages(
+        mmsi=args.mmsi, year=args.year, batch_size=args.batch_size,
+        progress=lambda done, total: print(f"\r{done:,}/{total:,} 항차", end="", flush=True)
+    )
+    print()
+    print(f"항차 {result['voyages']:,} / 어선 {result['vessels']:,} / 포인트 {result['points']:,} "
+          f"/ 조업 {result['fishing_hours']:,.1f}시간 ({result['elapsed']:.2f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""CSV 가져오기 백그라운드 작업 관리
+
+업로드 요청은 작업을 등록하고 바로 job_id를 돌려준다. 실제 적재는 작업 스레드
+한 개에서 순서대로 실행되며(SQLite 쓰기는 어차피 직렬), 진행 상황은
+get_job()으로 조회한다.
+"""
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from database import ImportCancelled, load_csv_to_db, upsert_csv_to_db
+
+# 메모리에 보관하는 완료 작업 최대 개수
+MAX_FINISHED_JOBS = 50
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="csv-import")
+_jobs = {}
+_lock = threading.Lock()
+
+
+class ImportJob:
+    """CSV 가져오기 작업 상태"""
+
+    def __init__(self, filename, mode, options):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.mode = mode
+        self.options = options
+        self.status = "queued"
+        self.parsed = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    def update_progress(self, parsed, inserted, rejected):
+        self.parsed = parsed
+        self.inserted = inserted
+        self.rejected = rejected
+
+    @property
+    def finished(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self):
+        result = dict(self.result) if self.result else None
+        if result:
+            result.pop('errors', None)
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "mode": self.mode,
+            "status": self.status,
+            "parsed": self.parsed,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "result": result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def errors(self):
+        """제외된 행 목록 (완료 전에는 빈 목록)"""
+        if not self.result:
+            return []
+        return self.result.get('errors', [])
+
+
+def _run(job, csv_path):
+    if job.cancel_event.is_set():
+        job.status = "cancelled"
+        job.finished_at = datetime.now()
+        Path(csv_path).unlink(missing_ok=True)
+        return
+
+    job.status = "running"
+    job.started_at = datetime.now()
+    try:
+        loader = upsert_csv_to_db if job.mode == "incremental" else load_csv_to_db
+        job.result = loader(
+            csv_path=csv_path,
+            progress=job.update_progress,
+            cancel_event=job.cancel_event,
+            **job.options
+        )
+        job.status = "completed" if job.result.get('success') else "failed"
+        if not job.result.get('success'):
+            job.error = job.result.get('message')
+    except ImportCancelled:
+        job.status = "cancelled"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        print(f"CSV 가져오기 작업 실패 ({job.id}): {e}")
+    finally:
+        job.finished_at = datetime.now()
+        Path(csv_path).unlink(missing_ok=True)
+
+
+def _prune():
+    """오래된 완료 작업 정리"""
+    finished = sorted((j for j in _jobs.values() if j.finished), key=lambda j: j.created_at)
+    for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job.id]
+
+
+def submit_import(csv_path, filename, mode="full", **options):
+    """CSV 가져오기 작업 등록
+
+    Args:
+        csv_path: 임시 CSV 파일 경로 (작업 종료 후 삭제됨)
+        filename: 원본 파일명
+        mode: 'full'(load_csv_to_db) 또는 'incremental'(upsert_csv_to_db)
+        options: 적재 함수에 넘길 추가 인자 (force, flag_missing 등)
+    """
+    job = ImportJob(filename, mode, options)
+    with _lock:
+        _prune()
+        _jobs[job.id] = job
+    _executor.submit(_run, job, csv_path)
+    return job
+
+
+def get_job(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs():
+    with _lock:
+        return sorted(_jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+
+def cancel_job(job_id):
+    """작업 취소 요청 (대기 중이면 실행되지 않고, 실행 중이면 다음 배치에서 롤백)"""
+    job = get_job(job_id)
+    if job and not job.finished:
+        job.cancel_event.set()
+    return job
@@ -1,16 +1,32 @@
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Query, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from pathlib import Path
+import base64
+import calendar
+import io
+import json
 import shutil
 import tempfile
 import uuid
 import os
-from database import get_db, init_db, load_csv_to_db, insert_sample_voyages
+from database import (
+    get_db, get_pool_stats, close_pools, PoolTimeout, init_db, insert_sample_voyages,
+    VESSEL_FTS_COLUMNS, split_group_names, registry_cache, check_vessel_counters, repair_vessel_counters,
+    SALES_ROLLUP_TABLES, rebuild_sales_rollups, next_record_id, QueryCache
+)
+import import_jobs
+import track_store
+import track_ingest
+import fishing_activity
+import track_html_index
+import track_html_cache
+import sales_records
+import sales_analytics
 
 # 업로드 디렉토리 설정
 UPLOAD_DIR = Path(__file__).parent / "uploads"
@@ -140,6 +156,21 @@ class VoyageUpdate(BaseModel):
     status: Optional[str] = None
 
 
+class ActivityAnalysisRequest(BaseModel):
+    """조업 활동 분석 대상 (모두 비우면 전체 항차)"""
+    voyage_ids: Optional[List[str]] = None
+    mmsi: Optional[str] = None
+    year: Optional[int] = None
+
+
+class ZoneQuery(BaseModel):
+    """구역 체류 검색 조건 (bbox 또는 polygon 중 하나 이상)"""
+    bbox: Optional[List[float]] = None  # [min_lon, min_lat, max_lon, max_lat]
+    polygon: Optional[List[List[float]]] = None  # [[lon, lat], ...]
+    start: datetime
+    end: datetime
+
+
 class AuctionData(BaseModel):
     """위판 데이터"""
     id: str
@@ -216,6 +247,67 @@ class ExpenseUpdate(BaseModel):
     note: Optional[str] = None
 
 
+class AuctionBatchUpdate(AuctionUpdate):
+    """위판 일괄 수정 항목"""
+    id: str
+
+
+class PrivateSaleBatchUpdate(PrivateSaleUpdate):
+    """사매 일괄 수정 항목"""
+    id: str
+
+
+class ExpenseBatchUpdate(ExpenseUpdate):
+    """경비 일괄 수정 항목"""
+    id: str
+
+
+class AuctionBatch(BaseModel):
+    """위판 일괄 등록/수정/삭제"""
+    create: List[AuctionCreate] = []
+    update: List[AuctionBatchUpdate] = []
+    delete: List[str] = []
+
+
+class PrivateSaleBatch(BaseModel):
+    """사매 일괄 등록/수정/삭제"""
+    create: List[PrivateSaleCreate] = []
+    update: List[PrivateSaleBatchUpdate] = []
+    delete: List[str] = []
+
+
+class ExpenseBatch(BaseModel):
+    """경비 일괄 등록/수정/삭제"""
+    create: List[ExpenseCreate] = []
+    update: List[ExpenseBatchUpdate] = []
+    delete: List[str] = []
+
+
+class SalesChangeset(BaseModel):
+    """위판/사매/경비 혼합 변경 묶음"""
+    auctions: Optional[AuctionBatch] = None
+    private_sales: Optional[PrivateSaleBatch] = None
+    expenses: Optional[ExpenseBatch] = None
+
+
+class HistoryQuery(BaseModel):
+    """수정이력 일괄 조회 조건"""
+    record_ids: Optional[List[str]] = None
+    record_type: Optional[str] = None
+    voyage_id: Optional[str] = None
+    mmsi: Optional[str] = None
+    change_set_id: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    limit: int = 10000
+
+
+class VesselGroupBulkUpdate(BaseModel):
+    """어선 그룹 일괄 추가/제외용"""
+    vessel_ids: List[int]
+    group_name: str
+
+
 class MemoCreate(BaseModel):
     """메모 생성용"""
     content: str
@@ -233,6 +325,20 @@ async def startup_event():
     """앱 시작 시 DB 초기화 (테이블만 생성, CSV 자동 로드 안함)"""
     init_db()
     insert_sample_voyages()
+    track_html_index.start_scanner(TRACK_HTML_DIR)
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """앱 종료 시 항적 파일 스캐너 중지 및 DB 연결 풀 정리"""
+    track_html_index.stop_scanner()
+    close_pools()
+
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request, exc):
+    """DB 연결 대기 시간 초과 시 503 반환"""
+    return JSONResponse(status_code=503, content={"detail": "데이터베이스가 사용 중입니다. 잠시 후 다시 시도해주세요."})
 
 
 # ==================== API 엔드포인트 ====================
@@ -242,36 +348,118 @@ def read_root():
     return {"message": "어선조업분석 플랫폼 API", "version": "1.0.0"}
 
 
+@app.get("/api/system/db-pool")
+def get_db_pool_stats():
+    """DB 연결 풀 상태 및 대기 시간 지표"""
+    return {"data": get_pool_stats()}
+
+
+@app.get("/api/system/vessel-counters/check")
+def check_vessel_counter_consistency():
+    """어선별 사진/파일 수, 대표 사진 컬럼 정합성 검사"""
+    with get_db(readonly=True) as conn:
+        mismatches = check_vessel_counters(conn.cursor())
+        return {"data": mismatches, "total": len(mismatches)}
+
+
+@app.post("/api/system/vessel-counters/repair")
+def repair_vessel_counter_consistency():
+    """어선별 사진/파일 수, 대표 사진 컬럼 재계산"""
+    with get_db() as conn:
+        fixed = repair_vessel_counters(conn.cursor())
+        conn.commit()
+        return {"message": f"{fixed}건을 수정했습니다", "count": fixed}
+
+
+@app.post("/api/system/sales-rollups/rebuild")
+def rebuild_sales_rollup_tables():
+    """위판/사매/경비 집계 테이블 전체 재계산"""
+    with get_db() as conn:
+        counts = rebuild_sales_rollups(conn.cursor())
+        conn.commit()
+        statistics_cache.invalidate()
+        return {"message": "집계 테이블을 재계산했습니다", "data": counts}
+
+
 # ---------- CSV 업로드 API ----------
 
 @app.post("/api/vessel-registry/upload-csv")
-async def upload_vessel_csv(file: UploadFile = File(...), force: bool = False):
-    """CSV 파일 업로드하여 어선 정보 DB에 저장
+def upload_vessel_csv(
+    file: UploadFile = File(...),
+    force: bool = False,
+    incremental: bool = False,
+    flag_missing: bool = False
+):
+    """CSV 파일 업로드하여 어선 정보 DB에 저장 (백그라운드 작업)
+
+    적재는 작업 스레드에서 실행되며 즉시 job_id를 반환한다.
+    진행 상황은 /api/vessel-registry/import-jobs/{job_id} 로 조회한다.
 
     Args:
         file: CSV 파일
         force: True이면 기존 데이터 삭제 후 다시 로드
+        incremental: True이면 등록번호 기준 증분 반영 (기존 id, 그룹/소속 등 유지)
+        flag_missing: 증분 반영 시 CSV에 없는 어선을 말소(deregistered_at)로 표시
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="CSV 파일만 업로드 가능합니다")
 
-    # 임시 파일로 저장
+    # 임시 파일로 저장 (작업 종료 후 삭제됨). 동기 함수라 복사는 스레드풀에서 실행되어
+    # 큰 파일을 받는 동안에도 이벤트 루프가 막히지 않는다
     with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp:
         shutil.copyfileobj(file.file, tmp)
         tmp_path = tmp.name
 
-    try:
-        result = load_csv_to_db(csv_path=tmp_path, force=force)
-        return result
-    finally:
-        # 임시 파일 삭제
-        Path(tmp_path).unlink(missing_ok=True)
+    if incremental:
+        job = import_jobs.submit_import(tmp_path, file.filename, mode="incremental", flag_missing=flag_missing)
+    else:
+        job = import_jobs.submit_import(tmp_path, file.filename, mode="full", force=force)
+
+    return {"message": "CSV 가져오기 작업이 등록되었습니다", "job_id": job.id, "data": job.to_dict()}
+
+
+@app.get("/api/vessel-registry/import-jobs")
+def get_import_jobs():
+    """CSV 가져오기 작업 목록 조회"""
+    return {"data": [job.to_dict() for job in import_jobs.list_jobs()]}
+
+
+@app.get("/api/vessel-registry/import-jobs/{job_id}")
+def get_import_job(job_id: str):
+    """CSV 가져오기 작업 진행 상황 조회"""
+    job = import_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="가져오기 작업을 찾을 수 없습니다")
+    return {"data": job.to_dict()}
+
+
+@app.get("/api/vessel-registry/import-jobs/{job_id}/errors")
+def get_import_job_errors(job_id: str):
+    """CSV 가져오기 작업에서 제외된 행 조회"""
+    job = import_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="가져오기 작업을 찾을 수 없습니다")
+    errors = job.errors()
+    return {"data": errors, "total": len(errors), "rejected": job.rejected}
+
+
+@app.post("/api/vessel-registry/import-jobs/{job_id}/cancel")
+def cancel_import_job(job_id: str):
+    """CSV 가져오기 작업 취소"""
+    job = import_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="가져오기 작업을 찾을 수 없습니다")
+    if job.finished:
+        raise HTTPException(status_code=400, detail="이미 종료된 작업입니다")
+
+    import_jobs.cancel_job(job_id)
+    return {"message": "취소 요청되었습니다", "data": job.to_dict()}
 
 
 @app.get("/api/vessel-registry/status")
 def get_vessel_registry_status():
     """어선 정보 DB 상태 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM vessel_registry")
         count = cursor.fetchone()[0]
@@ -284,6 +472,84 @@ def get_vessel_registry_status():
 
 # ---------- 어선 등록 정보 관련 API (전국어선정보) ----------
 
+# FTS5 trigram 인덱스는 3글자 이상부터 사용 가능
+FTS_MIN_QUERY_LENGTH = 3
+
+
+def vessel_search_condition(search, alias="v", columns=None):
+    """어선 검색 조건 생성 (3글자 이상은 FTS trigram 인덱스, 미만은 LIKE)
+
+    Returns:
+        tuple: (조건 SQL, 파라미터 목록)
+    """
+    columns = columns or VESSEL_FTS_COLUMNS
+    term = search.strip()
+    if len(term) >= FTS_MIN_QUERY_LENGTH:
+        # trigram 구문 검색 = 부분 문자열 검색 (접두어 포함)
+        phrase = '"' + term.replace('"', '""') + '"'
+        match = f"{{{' '.join(columns)}}} : {phrase}"
+        return (
+            f"{alias}.id IN (SELECT rowid FROM vessel_registry_fts WHERE vessel_registry_fts MATCH ?)",
+            [match]
+        )
+
+    like = f"%{term}%"
+    return "(" + " OR ".join(f"{alias}.{c} LIKE ?" for c in columns) + ")", [like] * len(columns)
+
+
+def vessel_registry_filters(search=None, port=None, business_type=None, group_name=None, organization=None):
+    """어선 목록 필터 조건 생성 (vessel_registry 별칭 v 기준)
+
+    Returns:
+        tuple: (WHERE 절, 파라미터 목록)
+    """
+    conditions = ["1=1"]
+    params = []
+
+    if search and search.strip():
+        condition, search_params = vessel_search_condition(search)
+        conditions.append(condition)
+        params.extend(search_params)
+
+    if port and port != 'all':
+        conditions.append("v.port LIKE ?")
+        params.append(f"%{port}%")
+
+    if business_type and business_type != 'all':
+        conditions.append("v.business_type LIKE ?")
+        params.append(f"%{business_type}%")
+
+    if group_name and group_name != 'all':
+        conditions.append("v.id IN (SELECT vessel_id FROM vessel_groups WHERE group_name = ?)")
+        params.append(group_name)
+
+    if organization and organization != 'all':
+        conditions.append("v.organization = ?")
+        params.append(organization)
+
+    return " AND ".join(conditions), params
+
+
+# 커서 페이지네이션 정렬 키 (인덱스가 있는 NOT NULL 컬럼만, id로 동순위 정렬)
+VESSEL_REGISTRY_SORT_KEYS = {'id': 'v.id', 'vessel_name': 'v.vessel_name'}
+
+
+def encode_page_cursor(sort, order, key, last_id):
+    payload = json.dumps({"s": sort, "o": order, "k": key, "id": last_id}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(token, sort, order):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data["s"] != sort or data["o"] != order:
+            raise ValueError
+        return data["k"], int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="잘못된 페이지 커서입니다")
+
+
 @app.get("/api/vessel-registry")
 def get_vessel_registry(
     search: Optional[str] = None,
@@ -292,71 +558,156 @@ def get_vessel_registry(
     group_name: Optional[str] = None,
     organization: Optional[str] = None,
     page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100)
+    page_size: int = Query(20, ge=1, le=100),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    sort: str = Query('id', pattern="^(id|vessel_name)$"),
+    order: str = Query('asc', pattern="^(asc|desc)$"),
+    with_total: bool = True
 ):
-    """전국어선정보 목록 조회 (페이지네이션 지원)"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-
-        # 기본 쿼리
-        base_query = "FROM vessel_registry WHERE 1=1"
-        params = []
-
-        if search:
-            base_query += " AND (vessel_name LIKE ? OR mmsi LIKE ? OR registration_no LIKE ?)"
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
+    """전국어선정보 목록 조회 (페이지네이션 지원)
 
-        if port and port != 'all':
-            base_query += " AND port LIKE ?"
-            params.append(f"%{port}%")
-
-        if business_type and business_type != 'all':
-            base_query += " AND business_type LIKE ?"
-            params.append(f"%{business_type}%")
-
-        if group_name and group_name != 'all':
-            # 쉼표로 구분된 여러 그룹 중 하나라도 포함되면 조회
-            base_query += " AND (group_name = ? OR group_name LIKE ? OR group_name LIKE ? OR group_name LIKE ?)"
-            params.extend([group_name, f"{group_name}, %", f"%, {group_name}", f"%, {group_name}, %"])
-
-        if organization and organization != 'all':
-            base_query += " AND organization = ?"
-            params.append(organization)
-
-        # 전체 개수
-        cursor.execute(f"SELECT COUNT(*) {base_query}", params)
-        total = cursor.fetchone()[0]
+    cursor를 주면 page 대신 커서(keyset) 방식으로 다음 페이지를 조회하므로
+    깊은 페이지도 첫 페이지와 같은 비용이 든다. 응답의 next_cursor를 그대로
+    넘기면 된다. 전체 건수는 필터 조합별로 캐시되며 with_total=false면 생략한다.
+    """
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
 
-        # 페이지네이션
-        offset = (page - 1) * page_size
-        # 조건절에서 테이블명을 별칭으로 변환
-        where_clause = base_query.replace('FROM vessel_registry WHERE 1=1', '').replace('vessel_name', 'v.vessel_name').replace('mmsi', 'v.mmsi').replace('registration_no', 'v.registration_no').replace('port', 'v.port').replace('business_type', 'v.business_type').replace('group_name', 'v.group_name').replace('organization', 'v.organization')
+        where_clause, params = vessel_registry_filters(search, port, business_type, group_name, organization)
+
+        # 전체 개수 (레지스트리 쓰기 시 무효화되는 캐시 사용)
+        total = None
+        if with_total:
+            def count():
+                cursor.execute(f"SELECT COUNT(*) FROM vessel_registry v WHERE {where_clause}", params)
+                return cursor.fetchone()[0]
+            total = registry_cache.get_or_compute(("vessel_registry_count", where_clause, tuple(params)), count)
+
+        sort_col = VESSEL_REGISTRY_SORT_KEYS[sort]
+        direction = "DESC" if order == "desc" else "ASC"
+        order_by = f"{sort_col} {direction}" if sort == 'id' else f"{sort_col} {direction}, v.id {direction}"
+
+        page_params = list(params)
+        if page_cursor:
+            key, last_id = decode_page_cursor(page_cursor, sort, order)
+            op = "<" if order == "desc" else ">"
+            if sort == 'id':
+                where_clause += f" AND v.id {op} ?"
+                page_params.append(last_id)
+            else:
+                where_clause += f" AND ({sort_col}, v.id) {op} (?, ?)"
+                page_params.extend([key, last_id])
+            offset = 0
+        else:
+            offset = (page - 1) * page_size
+
+        # 다음 페이지 유무 확인을 위해 1건 더 조회
         cursor.execute(
-            f"""SELECT v.*,
-                (SELECT COUNT(*) FROM vessel_photos WHERE vessel_id = v.id) as photo_count,
-                (SELECT COUNT(*) FROM vessel_files WHERE vessel_id = v.id) as file_count
-            FROM vessel_registry v WHERE 1=1 {where_clause}
-            ORDER BY v.id LIMIT ? OFFSET ?""",
-            params + [page_size, offset]
+            f"""SELECT v.*
+            FROM vessel_registry v WHERE {where_clause}
+            ORDER BY {order_by} LIMIT ? OFFSET ?""",
+            page_params + [page_size + 1, offset]
         )
 
         rows = cursor.fetchall()
-        data = [dict(row) for row in rows]
+        has_more = len(rows) > page_size
+        data = [dict(row) for row in rows[:page_size]]
+
+        next_cursor = None
+        if has_more and data:
+            last = data[-1]
+            next_cursor = encode_page_cursor(sort, order, last[sort], last["id"])
 
         return {
             "data": data,
             "total": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": (total + page_size - 1) // page_size
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        }
+
+
+# 패싯별 정렬/개수 제한 (기존 목록 API와 동일)
+FACET_PORT_LIMIT = 50
+
+
+@app.get("/api/vessel-registry/facets")
+def get_vessel_registry_facets(
+    search: Optional[str] = None,
+    port: Optional[str] = None,
+    business_type: Optional[str] = None,
+    group_name: Optional[str] = None,
+    organization: Optional[str] = None
+):
+    """선적항/업종/그룹/소속별 어선 수 (한 번의 조회)
+
+    total은 모든 필터를 적용한 수이고, 각 패싯은 자기 필터만 뺀 나머지 필터 기준으로 센다
+    (다중 선택 패싯: 선적항을 고른 뒤에도 다른 선적항의 수가 보인다).
+    결과는 필터 조합별로 캐시되며 어선 정보가 수정되면 무효화된다.
+    """
+    filters = {"search": search, "port": port, "business_type": business_type,
+               "group_name": group_name, "organization": organization}
+    where_clause, params = vessel_registry_filters(**filters)
+
+    def facet_source(facet):
+        """패싯 집계 대상 (자기 필터가 없으면 전체 필터 결과를 재사용)"""
+        if not filters[facet] or filters[facet] == 'all':
+            return "filtered", []
+        facet_where, facet_params = vessel_registry_filters(**{**filters, facet: None})
+        return f"(SELECT v.id, v.port, v.business_type, v.organization FROM vessel_registry v WHERE {facet_where})", facet_params
+
+    def compute():
+        branches = ["SELECT 'total' AS facet, NULL AS value, COUNT(*) AS count FROM filtered"]
+        query_params = list(params)
+        for facet in ("port", "business_type", "organization"):
+            source, source_params = facet_source(facet)
+            branches.append(f"""SELECT '{facet}', {facet}, COUNT(*) FROM {source}
+                WHERE {facet} IS NOT NULL AND {facet} != '' GROUP BY {facet}""")
+            query_params.extend(source_params)
+        source, source_params = facet_source("group_name")
+        branches.append(f"""SELECT 'group_name', g.group_name, COUNT(*) FROM {source} f
+                JOIN vessel_groups g ON g.vessel_id = f.id GROUP BY g.group_name""")
+        query_params.extend(source_params)
+
+        with get_db(readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                WITH filtered AS MATERIALIZED (
+                    SELECT v.id, v.port, v.business_type, v.organization
+                    FROM vessel_registry v WHERE {where_clause}
+                )
+                {" UNION ALL ".join(branches)}
+            """, query_params)
+
+            facets = {"port": [], "business_type": [], "group_name": [], "organization": []}
+            total = 0
+            for row in cursor.fetchall():
+                if row["facet"] == "total":
+                    total = row["count"]
+                else:
+                    facets[row["facet"]].append({row["facet"]: row["value"], "count": row["count"]})
+
+        facets["port"] = sorted(facets["port"], key=lambda x: -x["count"])[:FACET_PORT_LIMIT]
+        facets["business_type"].sort(key=lambda x: -x["count"])
+        facets["group_name"].sort(key=lambda x: x["group_name"])
+        facets["organization"].sort(key=lambda x: x["organization"])
+        return {
+            "total": total,
+            "ports": facets["port"],
+            "business_types": facets["business_type"],
+            "groups": facets["group_name"],
+            "organizations": facets["organization"],
         }
 
+    return {"data": registry_cache.get_or_compute(("vessel_registry_facets", where_clause, tuple(params)), compute)}
+
 
 @app.get("/api/vessel-registry/ports/list")
 def get_ports():
     """선적항(포트) 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT DISTINCT port, COUNT(*) as count
@@ -373,7 +724,7 @@ def get_ports():
 @app.get("/api/vessel-registry/business-types/list")
 def get_business_types():
     """업종 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT DISTINCT business_type, COUNT(*) as count
@@ -388,32 +739,91 @@ def get_business_types():
 
 @app.get("/api/vessel-registry/groups/list")
 def get_groups():
-    """그룹 목록 조회 (쉼표로 구분된 그룹을 개별로 분리하여 카운트)"""
-    with get_db() as conn:
+    """그룹 목록 조회 (그룹별 어선 수)"""
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT group_name
-            FROM vessel_registry
-            WHERE group_name IS NOT NULL AND group_name != ''
+            SELECT group_name, COUNT(*) as count
+            FROM vessel_groups
+            GROUP BY group_name
+            ORDER BY group_name
         """)
         rows = cursor.fetchall()
+        return {"data": [{"group_name": row["group_name"], "count": row["count"]} for row in rows]}
 
-        # 모든 그룹을 분리하여 카운트
-        group_counts = {}
-        for row in rows:
-            groups = [g.strip() for g in row["group_name"].split(',') if g.strip()]
-            for group in groups:
-                group_counts[group] = group_counts.get(group, 0) + 1
 
-        # 그룹명으로 정렬하여 반환
-        sorted_groups = sorted(group_counts.items(), key=lambda x: x[0])
-        return {"data": [{"group_name": name, "count": count} for name, count in sorted_groups]}
+def sync_group_name_column(cursor, vessel_ids_json):
+    """vessel_groups 기준으로 vessel_registry.group_name 표시 문자열 갱신
+
+    Args:
+        vessel_ids_json: 갱신할 어선 id 목록 (JSON 배열 문자열)
+    """
+    cursor.execute("""
+        UPDATE vessel_registry
+        SET group_name = (
+                SELECT group_concat(group_name, ', ')
+                FROM (SELECT group_name FROM vessel_groups WHERE vessel_id = vessel_registry.id ORDER BY id)
+            ),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (vessel_ids_json,))
+
+
+def set_vessel_groups(cursor, vessel_id, group_name):
+    """어선 한 척의 그룹 소속을 쉼표 구분 문자열 기준으로 교체"""
+    cursor.execute("DELETE FROM vessel_groups WHERE vessel_id = ?", (vessel_id,))
+    cursor.executemany(
+        "INSERT INTO vessel_groups (vessel_id, group_name) VALUES (?, ?)",
+        [(vessel_id, name) for name in split_group_names(group_name)]
+    )
+    sync_group_name_column(cursor, json.dumps([vessel_id]))
+
+
+@app.post("/api/vessel-registry/groups/add")
+def add_vessels_to_group(update: VesselGroupBulkUpdate):
+    """여러 어선을 그룹에 일괄 추가 (단일 트랜잭션)"""
+    group_name = update.group_name.strip()
+    if not group_name or ',' in group_name:
+        raise HTTPException(status_code=400, detail="그룹명이 올바르지 않습니다")
+
+    ids_json = json.dumps(update.vessel_ids)
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR IGNORE INTO vessel_groups (vessel_id, group_name)
+            SELECT id, ? FROM vessel_registry WHERE id IN (SELECT value FROM json_each(?))
+        """, (group_name, ids_json))
+        added = cursor.rowcount
+        sync_group_name_column(cursor, ids_json)
+        conn.commit()
+        registry_cache.invalidate()
+
+        return {"message": f"{added}척이 '{group_name}' 그룹에 추가되었습니다", "count": added}
+
+
+@app.post("/api/vessel-registry/groups/remove")
+def remove_vessels_from_group(update: VesselGroupBulkUpdate):
+    """여러 어선을 그룹에서 일괄 제외 (단일 트랜잭션)"""
+    group_name = update.group_name.strip()
+    ids_json = json.dumps(update.vessel_ids)
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DELETE FROM vessel_groups
+            WHERE group_name = ? AND vessel_id IN (SELECT value FROM json_each(?))
+        """, (group_name, ids_json))
+        removed = cursor.rowcount
+        sync_group_name_column(cursor, ids_json)
+        conn.commit()
+        registry_cache.invalidate()
+
+        return {"message": f"{removed}척이 '{group_name}' 그룹에서 제외되었습니다", "count": removed}
 
 
 @app.get("/api/vessel-registry/organizations/list")
 def get_organizations():
     """소속 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT DISTINCT organization, COUNT(*) as count
@@ -429,7 +839,7 @@ def get_organizations():
 @app.get("/api/vessel-registry/{vessel_id}")
 def get_vessel_registry_detail(vessel_id: int):
     """전국어선정보 상세 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM vessel_registry WHERE id = ?", (vessel_id,))
         row = cursor.fetchone()
@@ -465,7 +875,10 @@ def update_vessel_registry(vessel_id: int, update: VesselRegistryUpdate):
             f"UPDATE vessel_registry SET {set_clause} WHERE id = ?",
             values
         )
+        if 'group_name' in update_data:
+            set_vessel_groups(cursor, vessel_id, update_data['group_name'])
         conn.commit()
+        registry_cache.invalidate()
 
         # 수정된 데이터 반환
         cursor.execute("SELECT * FROM vessel_registry WHERE id = ?", (vessel_id,))
@@ -477,22 +890,22 @@ def update_vessel_registry(vessel_id: int, update: VesselRegistryUpdate):
 @app.get("/api/vessels")
 def get_vessels(search: Optional[str] = None):
     """어선 목록 조회 (MMSI가 있는 어선만, 항차 연동용)"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = """
-            SELECT DISTINCT mmsi, vessel_name, tonnage, port, business_type
-            FROM vessel_registry
-            WHERE mmsi IS NOT NULL AND mmsi != ''
+            SELECT DISTINCT v.mmsi, v.vessel_name, v.tonnage, v.port, v.business_type
+            FROM vessel_registry v
+            WHERE v.mmsi IS NOT NULL AND v.mmsi != ''
         """
         params = []
 
-        if search:
-            query += " AND (vessel_name LIKE ? OR mmsi LIKE ?)"
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
+        if search and search.strip():
+            condition, search_params = vessel_search_condition(search, columns=['vessel_name', 'mmsi'])
+            query += f" AND {condition}"
+            params.extend(search_params)
 
-        query += " ORDER BY vessel_name LIMIT 50"
+        query += " ORDER BY v.vessel_name LIMIT 50"
 
         cursor.execute(query, params)
         rows = cursor.fetchall()
@@ -512,7 +925,7 @@ def get_vessels(search: Optional[str] = None):
 @app.get("/api/vessels/{mmsi}")
 def get_vessel(mmsi: str):
     """특정 어선 정보 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM vessel_registry WHERE mmsi = ? LIMIT 1
@@ -530,7 +943,7 @@ def get_vessel(mmsi: str):
 @app.get("/api/voyages")
 def get_voyages(mmsi: Optional[str] = None, year: Optional[int] = None, status: Optional[str] = None):
     """항차 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = "SELECT * FROM voyages WHERE 1=1"
@@ -560,10 +973,34 @@ def get_voyages(mmsi: Optional[str] = None, year: Optional[int] = None, status:
         return {"data": data, "total": len(data)}
 
 
+@app.post("/api/voyages/analyze-activity")
+def analyze_voyage_activity(request: ActivityAnalysisRequest):
+    """항적으로 항차별 조업/항해/정박 시간과 조업 구역 계산
+
+    결과는 voyages(fishing_hours, steaming_hours, port_hours, fishing_polygon)와
+    vessel_registry(fishing_hours, fishing_polygon)에 기록된다.
+    """
+    result = fishing_activity.analyze_voyages(
+        voyage_ids=request.voyage_ids, mmsi=request.mmsi, year=request.year
+    )
+    return {
+        "message": f"{result['voyages']}개 항차의 조업 활동을 분석했습니다",
+        "data": result
+    }
+
+
 @app.get("/api/voyages/{voyage_id}")
-def get_voyage(voyage_id: str):
-    """특정 항차 상세 조회"""
-    with get_db() as conn:
+def get_voyage(
+    voyage_id: str,
+    tolerance: Optional[float] = Query(None, gt=0, description="항적 단순화 허용 오차(m)"),
+    max_points: Optional[int] = Query(None, ge=2, description="항적 최대 포인트 수")
+):
+    """특정 항차 상세 조회
+
+    tolerance 또는 max_points를 주면 Douglas-Peucker로 단순화한 항적을 돌려준다.
+    (저장된 LOD 단계가 맞으면 그 단계를 그대로 사용)
+    """
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         cursor.execute("SELECT * FROM voyages WHERE id = ?", (voyage_id,))
@@ -574,6 +1011,13 @@ def get_voyage(voyage_id: str):
 
         data = dict(row)
 
+        if tolerance is not None or max_points is not None:
+            arrays, total, used = track_store.load_simplified_arrays(cursor, voyage_id, tolerance, max_points)
+            data['track_points'] = track_store.to_track_points(arrays)
+            data['track_point_total'] = total
+            data['track_tolerance'] = used
+            return {"data": data}
+
         # 항적 포인트 조회
         cursor.execute(
             "SELECT * FROM track_points WHERE voyage_id = ? ORDER BY timestamp",
@@ -584,6 +1028,78 @@ def get_voyage(voyage_id: str):
         return {"data": data}
 
 
+@app.get("/api/voyages/{voyage_id}/track")
+def get_voyage_track(
+    voyage_id: str,
+    format: str = Query("binary", pattern="^(binary|columnar)$"),
+    tolerance: Optional[float] = Query(None, gt=0, description="항적 단순화 허용 오차(m)"),
+    max_points: Optional[int] = Query(None, ge=2, description="항적 최대 포인트 수")
+):
+    """항차 항적 조회 (컬럼형)
+
+    format=binary: typed array로 바로 읽을 수 있는 바이너리 (레이아웃은 track_store.pack_track_binary)
+    format=columnar: 컬럼별 배열 JSON
+    tolerance/max_points: Douglas-Peucker 단순화 (get_voyage와 동일)
+    """
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id FROM voyages WHERE id = ?", (voyage_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="항차를 찾을 수 없습니다")
+
+        if tolerance is not None or max_points is not None:
+            arrays, total, _ = track_store.load_simplified_arrays(cursor, voyage_id, tolerance, max_points)
+        else:
+            arrays = track_store.load_track_arrays(cursor, voyage_id)
+            total = len(arrays["epoch"])
+
+    if format == "columnar":
+        return {"data": {**track_store.to_columnar(arrays), "total": total}}
+    return Response(
+        content=track_store.pack_track_binary(arrays),
+        media_type="application/octet-stream",
+        headers={"X-Track-Point-Count": str(len(arrays["epoch"])), "X-Track-Point-Total": str(total)}
+    )
+
+
+@app.get("/api/voyages/{voyage_id}/activity")
+def get_voyage_activity(voyage_id: str):
+    """항차 조업 활동 구간 조회 (항해/조업/정박 구간과 시간)"""
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT fishing_hours, steaming_hours, port_hours, fishing_polygon, activity_analyzed_at
+            FROM voyages WHERE id = ?
+        """, (voyage_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="항차를 찾을 수 없습니다")
+
+        arrays = track_store.load_track_arrays(cursor, voyage_id)
+
+    data = dict(row)
+    data['fishing_polygon'] = json.loads(row['fishing_polygon']) if row['fishing_polygon'] else None
+    data['runs'] = fishing_activity.activity_runs(arrays)
+    return {"data": data}
+
+
+@app.post("/api/voyages/{voyage_id}/track/compact")
+def compact_voyage_track(voyage_id: str):
+    """track_points로부터 항차의 컬럼형 블록과 LOD 단계 재생성"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id FROM voyages WHERE id = ?", (voyage_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="항차를 찾을 수 없습니다")
+
+        count = track_store.rebuild_track_blocks(cursor, voyage_id)
+        conn.commit()
+        return {"message": f"{count}개 포인트를 블록으로 저장했습니다", "count": count}
+
+
 @app.put("/api/voyages/{voyage_id}")
 def update_voyage(voyage_id: str, update: VoyageUpdate):
     """항차 정보 수정"""
@@ -617,7 +1133,7 @@ def get_or_create_monthly_voyage(
     vessel_name: str = Query(...)
 ):
     """월별 항차 조회 또는 생성 (항적 조회용)"""
-    voyage_id = f"{mmsi}-{year}-{month:02d}"
+    voyage_id = track_store.monthly_voyage_id(mmsi, year, month)
 
     with get_db() as conn:
         cursor = conn.cursor()
@@ -650,7 +1166,7 @@ def get_or_create_monthly_voyage(
 @app.get("/api/auctions")
 def get_auctions(voyage_id: Optional[str] = None):
     """위판 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = "SELECT * FROM auctions"
@@ -676,7 +1192,7 @@ def get_all_auctions(
     vessel_name: Optional[str] = None
 ):
     """전체 위판 목록 조회 (필터 포함)"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = """
@@ -719,10 +1235,8 @@ def create_auction(auction: AuctionCreate):
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail="해당 항차를 찾을 수 없습니다")
 
-        # 새 ID 생성
-        cursor.execute("SELECT COUNT(*) FROM auctions")
-        count = cursor.fetchone()[0] + 1
-        new_id = f"AUC-{datetime.now().year}-{count:03d}"
+        # 새 ID 생성 (연도별 순번, INSERT와 같은 트랜잭션)
+        new_id = next_record_id(cursor, 'auctions')
 
         total_price = auction.quantity * auction.unit_price
 
@@ -763,59 +1277,13 @@ def update_auction(auction_id: str, auction: AuctionUpdate):
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # 기존 데이터 조회
-        cursor.execute("SELECT * FROM auctions WHERE id = ?", (auction_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="위판 정보를 찾을 수 없습니다")
-
-        old_data = dict(row)
-
-        # 변경된 필드만 업데이트 및 이력 기록
-        update_fields = []
-        update_values = []
-
-        field_map = {
-            'auction_date': auction.auction_date.isoformat() if auction.auction_date else None,
-            'auction_port': auction.auction_port,
-            'fish_species': auction.fish_species,
-            'quantity': auction.quantity,
-            'unit_price': auction.unit_price,
-            'buyer': auction.buyer,
-            'note': auction.note
-        }
-
-        history_recorded = False
-        for field, new_val in field_map.items():
-            if new_val is not None:
-                old_val = str(old_data.get(field, '') or '')
-                new_val_str = str(new_val)
-                if old_val != new_val_str:
-                    # 이력 기록
-                    cursor.execute("""
-                        INSERT INTO modification_history (record_type, record_id, field_name, old_value, new_value)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, ('auction', auction_id, field, old_val, new_val_str))
-                    update_fields.append(f"{field} = ?")
-                    update_values.append(new_val)
-                    history_recorded = True
-
-        if update_fields:
-            # total_price 재계산
-            new_quantity = auction.quantity if auction.quantity is not None else old_data['quantity']
-            new_unit_price = auction.unit_price if auction.unit_price is not None else old_data['unit_price']
-            total_price = new_quantity * new_unit_price
-            update_fields.append("total_price = ?")
-            update_values.append(total_price)
-            update_fields.append("updated_at = CURRENT_TIMESTAMP")
-
-            update_values.append(auction_id)
-            cursor.execute(f"""
-                UPDATE auctions SET {', '.join(update_fields)} WHERE id = ?
-            """, update_values)
-
-        # 변경사항이 있으면 커밋
-        if update_fields or history_recorded:
+        # 바뀐 필드만 수정하고 수정이력은 한 번에 기록 (같은 변경 묶음 ID)
+        results, counts = sales_records.apply_changeset(cursor, {
+            "auction": {"update": [{"id": auction_id, **auction.model_dump()}]}
+        })
+        if counts["failed"]:
+            raise HTTPException(status_code=404, detail=results[0]["detail"])
+        if counts["updated"]:
             conn.commit()
 
         cursor.execute("SELECT * FROM auctions WHERE id = ?", (auction_id,))
@@ -825,7 +1293,7 @@ def update_auction(auction_id: str, auction: AuctionUpdate):
 @app.get("/api/auctions/{auction_id}/history")
 def get_auction_history(auction_id: str):
     """위판 수정이력 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM modification_history
@@ -841,7 +1309,7 @@ def get_auction_history(auction_id: str):
 @app.get("/api/private-sales")
 def get_private_sales(voyage_id: Optional[str] = None):
     """사매 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = "SELECT * FROM private_sales"
@@ -867,7 +1335,7 @@ def get_all_private_sales(
     vessel_name: Optional[str] = None
 ):
     """전체 사매 목록 조회 (필터 포함)"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = """
@@ -910,10 +1378,8 @@ def create_private_sale(sale: PrivateSaleCreate):
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail="해당 항차를 찾을 수 없습니다")
 
-        # 새 ID 생성
-        cursor.execute("SELECT COUNT(*) FROM private_sales")
-        count = cursor.fetchone()[0] + 1
-        new_id = f"PVS-{datetime.now().year}-{count:03d}"
+        # 새 ID 생성 (연도별 순번, INSERT와 같은 트랜잭션)
+        new_id = next_record_id(cursor, 'private_sales')
 
         total_price = sale.quantity * sale.unit_price
 
@@ -954,54 +1420,13 @@ def update_private_sale(sale_id: str, sale: PrivateSaleUpdate):
     with get_db() as conn:
         cursor = conn.cursor()
 
-        cursor.execute("SELECT * FROM private_sales WHERE id = ?", (sale_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="사매 정보를 찾을 수 없습니다")
-
-        old_data = dict(row)
-
-        update_fields = []
-        update_values = []
-
-        field_map = {
-            'sale_date': sale.sale_date.isoformat() if sale.sale_date else None,
-            'fish_species': sale.fish_species,
-            'quantity': sale.quantity,
-            'unit_price': sale.unit_price,
-            'buyer': sale.buyer,
-            'note': sale.note
-        }
-
-        history_recorded = False
-        for field, new_val in field_map.items():
-            if new_val is not None:
-                old_val = str(old_data.get(field, '') or '')
-                new_val_str = str(new_val)
-                if old_val != new_val_str:
-                    cursor.execute("""
-                        INSERT INTO modification_history (record_type, record_id, field_name, old_value, new_value)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, ('private_sale', sale_id, field, old_val, new_val_str))
-                    update_fields.append(f"{field} = ?")
-                    update_values.append(new_val)
-                    history_recorded = True
-
-        if update_fields:
-            new_quantity = sale.quantity if sale.quantity is not None else old_data['quantity']
-            new_unit_price = sale.unit_price if sale.unit_price is not None else old_data['unit_price']
-            total_price = new_quantity * new_unit_price
-            update_fields.append("total_price = ?")
-            update_values.append(total_price)
-            update_fields.append("updated_at = CURRENT_TIMESTAMP")
-
-            update_values.append(sale_id)
-            cursor.execute(f"""
-                UPDATE private_sales SET {', '.join(update_fields)} WHERE id = ?
-            """, update_values)
-
-        # 변경사항이 있으면 커밋
-        if update_fields or history_recorded:
+        # 바뀐 필드만 수정하고 수정이력은 한 번에 기록 (같은 변경 묶음 ID)
+        results, counts = sales_records.apply_changeset(cursor, {
+            "private_sale": {"update": [{"id": sale_id, **sale.model_dump()}]}
+        })
+        if counts["failed"]:
+            raise HTTPException(status_code=404, detail=results[0]["detail"])
+        if counts["updated"]:
             conn.commit()
 
         cursor.execute("SELECT * FROM private_sales WHERE id = ?", (sale_id,))
@@ -1011,7 +1436,7 @@ def update_private_sale(sale_id: str, sale: PrivateSaleUpdate):
 @app.get("/api/private-sales/{sale_id}/history")
 def get_private_sale_history(sale_id: str):
     """사매 수정이력 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM modification_history
@@ -1027,7 +1452,7 @@ def get_private_sale_history(sale_id: str):
 @app.get("/api/expenses")
 def get_expenses(voyage_id: Optional[str] = None):
     """경비 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = "SELECT * FROM expenses"
@@ -1053,7 +1478,7 @@ def get_all_expenses(
     vessel_name: Optional[str] = None
 ):
     """전체 경비 목록 조회 (필터 포함)"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
 
         query = """
@@ -1096,10 +1521,8 @@ def create_expense(expense: ExpenseCreate):
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail="해당 항차를 찾을 수 없습니다")
 
-        # 새 ID 생성
-        cursor.execute("SELECT COUNT(*) FROM expenses")
-        count = cursor.fetchone()[0] + 1
-        new_id = f"EXP-{datetime.now().year}-{count:03d}"
+        # 새 ID 생성 (연도별 순번, INSERT와 같은 트랜잭션)
+        new_id = next_record_id(cursor, 'expenses')
 
         cursor.execute("""
             INSERT INTO expenses (id, voyage_id, expense_date, category,
@@ -1137,47 +1560,13 @@ def update_expense(expense_id: str, expense: ExpenseUpdate):
     with get_db() as conn:
         cursor = conn.cursor()
 
-        cursor.execute("SELECT * FROM expenses WHERE id = ?", (expense_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="경비 정보를 찾을 수 없습니다")
-
-        old_data = dict(row)
-
-        update_fields = []
-        update_values = []
-
-        field_map = {
-            'expense_date': expense.expense_date.isoformat() if expense.expense_date else None,
-            'category': expense.category,
-            'description': expense.description,
-            'amount': expense.amount,
-            'note': expense.note
-        }
-
-        history_recorded = False
-        for field, new_val in field_map.items():
-            if new_val is not None:
-                old_val = str(old_data.get(field, '') or '')
-                new_val_str = str(new_val)
-                if old_val != new_val_str:
-                    cursor.execute("""
-                        INSERT INTO modification_history (record_type, record_id, field_name, old_value, new_value)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, ('expense', expense_id, field, old_val, new_val_str))
-                    update_fields.append(f"{field} = ?")
-                    update_values.append(new_val)
-                    history_recorded = True
-
-        if update_fields:
-            update_fields.append("updated_at = CURRENT_TIMESTAMP")
-            update_values.append(expense_id)
-            cursor.execute(f"""
-                UPDATE expenses SET {', '.join(update_fields)} WHERE id = ?
-            """, update_values)
-
-        # 변경사항이 있으면 커밋
-        if update_fields or history_recorded:
+        # 바뀐 필드만 수정하고 수정이력은 한 번에 기록 (같은 변경 묶음 ID)
+        results, counts = sales_records.apply_changeset(cursor, {
+            "expense": {"update": [{"id": expense_id, **expense.model_dump()}]}
+        })
+        if counts["failed"]:
+            raise HTTPException(status_code=404, detail=results[0]["detail"])
+        if counts["updated"]:
             conn.commit()
 
         cursor.execute("SELECT * FROM expenses WHERE id = ?", (expense_id,))
@@ -1187,7 +1576,7 @@ def update_expense(expense_id: str, expense: ExpenseUpdate):
 @app.get("/api/expenses/{expense_id}/history")
 def get_expense_history(expense_id: str):
     """경비 수정이력 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM modification_history
@@ -1198,44 +1587,621 @@ def get_expense_history(expense_id: str):
         return {"data": [dict(row) for row in rows]}
 
 
-# ---------- 통계 API ----------
+# ---------- 위판/사매/경비 일괄 처리 API ----------
+
+# 요청 하나에 담을 수 있는 최대 항목 수
+SALES_BATCH_LIMIT = 5000
+
+
+def run_sales_changeset(changes, atomic):
+    """변경 묶음을 한 트랜잭션으로 처리하고 항목별 결과 반환
+
+    changes: {종류: AuctionBatch/PrivateSaleBatch/ExpenseBatch}
+    """
+    changes = {kind: batch.model_dump() for kind, batch in changes.items() if batch is not None}
+    size = sum(len(items) for ops in changes.values() for items in ops.values())
+    if size > SALES_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {SALES_BATCH_LIMIT}건까지 처리할 수 있습니다")
 
-@app.get("/api/statistics")
-def get_statistics():
-    """통계 데이터"""
     with get_db() as conn:
-        cursor = conn.cursor()
+        results, counts = sales_records.apply_changeset(conn.cursor(), changes, atomic)
+        if counts["failed"] and atomic:
+            return JSONResponse(status_code=400, content={
+                "detail": f"{counts['failed']}건에 오류가 있어 저장하지 않았습니다",
+                "data": {"results": results, **counts}
+            })
+        conn.commit()
 
-        cursor.execute("SELECT COUNT(*) FROM vessel_registry")
-        total_vessels = cursor.fetchone()[0]
+    return {
+        "message": f"등록 {counts['created']}건, 수정 {counts['updated']}건, 삭제 {counts['deleted']}건을 처리했습니다",
+        "data": {"results": results, **counts}
+    }
 
-        cursor.execute("SELECT COUNT(*) FROM voyages")
-        total_voyages = cursor.fetchone()[0]
 
-        cursor.execute("SELECT COUNT(*) FROM voyages WHERE status = '조업중'")
-        active_voyages = cursor.fetchone()[0]
+@app.post("/api/auctions/batch")
+def batch_auctions(batch: AuctionBatch, atomic: bool = True):
+    """위판 일괄 등록/수정/삭제 (한 트랜잭션, 항목별 결과)
 
-        cursor.execute("SELECT COALESCE(SUM(catch_amount), 0) FROM voyages")
-        total_catch = cursor.fetchone()[0]
+    atomic=true(기본)이면 오류 항목이 하나라도 있으면 아무것도 저장하지 않고 400을 돌려준다.
+    atomic=false이면 오류 항목만 건너뛰고 나머지를 저장한다.
+    """
+    return run_sales_changeset({"auction": batch}, atomic)
 
-        cursor.execute("SELECT COALESCE(SUM(total_price), 0) FROM auctions")
-        total_auction = cursor.fetchone()[0]
 
-        return {
-            "total_vessels": total_vessels,
-            "total_voyages": total_voyages,
-            "active_voyages": active_voyages,
-            "total_catch_amount": total_catch,
-            "total_auction_amount": total_auction,
+@app.post("/api/private-sales/batch")
+def batch_private_sales(batch: PrivateSaleBatch, atomic: bool = True):
+    """사매 일괄 등록/수정/삭제 (batch_auctions와 동일)"""
+    return run_sales_changeset({"private_sale": batch}, atomic)
+
+
+@app.post("/api/expenses/batch")
+def batch_expenses(batch: ExpenseBatch, atomic: bool = True):
+    """경비 일괄 등록/수정/삭제 (batch_auctions와 동일)"""
+    return run_sales_changeset({"expense": batch}, atomic)
+
+
+@app.post("/api/sales/changeset")
+def apply_sales_changeset(changeset: SalesChangeset, atomic: bool = True):
+    """위판/사매/경비가 섞인 변경 묶음을 한 트랜잭션으로 처리 (batch_auctions와 동일)"""
+    return run_sales_changeset({
+        "auction": changeset.auctions,
+        "private_sale": changeset.private_sales,
+        "expense": changeset.expenses,
+    }, atomic)
+
+
+# ---------- 수정이력 API ----------
+
+HISTORY_QUERY_LIMIT = 100000
+
+
+@app.post("/api/history/query")
+def query_modification_history(query: HistoryQuery):
+    """위판/사매/경비 수정이력 일괄 조회 (감사 보고서용)
+
+    여러 레코드 ID(record_ids), 항차(voyage_id), 어선(mmsi), 변경 묶음(change_set_id),
+    기간(start_date ~ end_date, 수정 일자 기준) 조건을 조합해 한 번의 쿼리로 조회한다.
+    최신 수정 순으로 최대 limit건을 돌려주며, 더 있으면 has_more가 true다.
+    """
+    if not 1 <= query.limit <= HISTORY_QUERY_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit는 1~{HISTORY_QUERY_LIMIT} 사이여야 합니다")
+
+    conditions = ["1=1"]
+    params = []
+    if query.record_ids is not None:
+        conditions.append("h.record_id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(query.record_ids))
+    if query.record_type:
+        conditions.append("h.record_type = ?")
+        params.append(query.record_type)
+    if query.voyage_id:
+        conditions.append("h.voyage_id = ?")
+        params.append(query.voyage_id)
+    if query.mmsi:
+        conditions.append("h.voyage_id IN (SELECT id FROM voyages WHERE mmsi = ?)")
+        params.append(query.mmsi)
+    if query.change_set_id:
+        conditions.append("h.change_set_id = ?")
+        params.append(query.change_set_id)
+    if query.start_date:
+        conditions.append("h.modified_at >= ?")
+        params.append(query.start_date)
+    if query.end_date:
+        conditions.append("h.modified_at < date(?, '+1 day')")
+        params.append(query.end_date)
+
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT h.* FROM modification_history h
+            WHERE {' AND '.join(conditions)}
+            ORDER BY h.modified_at DESC, h.id DESC
+            LIMIT ?
+        """, params + [query.limit + 1])
+        rows = cursor.fetchall()
+
+    data = [dict(row) for row in rows[:query.limit]]
+    return {"data": data, "total": len(data), "has_more": len(rows) > query.limit}
+
+
+# ---------- 위판/사매/경비 통합 원장 API ----------
+
+# 원장 종류별 SELECT (컬럼 순서 동일, 경비는 signed_amount가 음수)
+LEDGER_SOURCES = {
+    "auction": {
+        "select": """
+            SELECT 'auction' AS kind, a.id, a.voyage_id, vo.mmsi, vo.vessel_name,
+                   a.auction_date AS entry_date, a.fish_species, a.auction_port,
+                   NULL AS category, NULL AS description, a.quantity, a.unit_price,
+                   a.total_price AS amount, a.total_price AS signed_amount, a.buyer, a.note,
+                   a.created_at, a.updated_at
+            FROM auctions a LEFT JOIN voyages vo ON a.voyage_id = vo.id""",
+        "alias": "a", "date": "a.auction_date", "amount": "a.total_price",
+        "columns": {"fish_species": "a.fish_species", "auction_port": "a.auction_port"},
+    },
+    "private_sale": {
+        "select": """
+            SELECT 'private_sale' AS kind, ps.id, ps.voyage_id, vo.mmsi, vo.vessel_name,
+                   ps.sale_date AS entry_date, ps.fish_species, NULL AS auction_port,
+                   NULL AS category, NULL AS description, ps.quantity, ps.unit_price,
+                   ps.total_price AS amount, ps.total_price AS signed_amount, ps.buyer, ps.note,
+                   ps.created_at, ps.updated_at
+            FROM private_sales ps LEFT JOIN voyages vo ON ps.voyage_id = vo.id""",
+        "alias": "ps", "date": "ps.sale_date", "amount": "ps.total_price",
+        "columns": {"fish_species": "ps.fish_species"},
+    },
+    "expense": {
+        "select": """
+            SELECT 'expense' AS kind, e.id, e.voyage_id, vo.mmsi, vo.vessel_name,
+                   e.expense_date AS entry_date, NULL AS fish_species, NULL AS auction_port,
+                   e.category, e.description, NULL AS quantity, NULL AS unit_price,
+                   e.amount, -e.amount AS signed_amount, NULL AS buyer, e.note,
+                   e.created_at, e.updated_at
+            FROM expenses e LEFT JOIN voyages vo ON e.voyage_id = vo.id""",
+        "alias": "e", "date": "e.expense_date", "amount": "e.amount",
+        "columns": {"category": "e.category"},
+    },
+}
+
+LEDGER_SORT_KEYS = {"date": "entry_date", "amount": "amount"}
+
+
+def encode_ledger_cursor(sort, order, row, running_amount, running_balance):
+    payload = json.dumps({
+        "s": sort, "o": order, "k": row[LEDGER_SORT_KEYS[sort]], "kind": row["kind"], "id": row["id"],
+        "ra": running_amount, "rb": running_balance
+    }, ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_ledger_cursor(token, sort, order):
+    """원장 커서 -> (정렬 키, 종류, id, 누적 금액, 누적 손익)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data["s"] != sort or data["o"] != order or data["kind"] not in LEDGER_SOURCES:
+            raise ValueError
+        return data["k"], data["kind"], str(data["id"]), float(data["ra"]), float(data["rb"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="잘못된 페이지 커서입니다")
+
+
+def ledger_branch_filters(kind, start_date, end_date, fish_species, auction_port, category,
+                          vessel_name, mmsi, registry_where, registry_params):
+    """원장 종류 하나의 WHERE 조건 (해당 종류에 없는 컬럼으로 거르면 None -> 제외)"""
+    source = LEDGER_SOURCES[kind]
+    conditions = ["1=1"]
+    params = []
+
+    for name, value in (("fish_species", fish_species), ("auction_port", auction_port), ("category", category)):
+        if not value or value == 'all':
+            continue
+        column = source["columns"].get(name)
+        if column is None:
+            return None
+        if name == "category":
+            conditions.append(f"{column} = ?")
+            params.append(value)
+        else:
+            conditions.append(f"{column} LIKE ?")
+            params.append(f"%{value}%")
+
+    if start_date:
+        conditions.append(f"{source['date']} >= ?")
+        params.append(start_date)
+    if end_date:
+        # 날짜만 주면 그날 전체 포함 ('T' 구분 시각도 포함되도록 다음 날 미만으로 비교)
+        conditions.append(f"{source['date']} < date(?, '+1 day')")
+        params.append(end_date)
+    if vessel_name:
+        conditions.append("vo.vessel_name LIKE ?")
+        params.append(f"%{vessel_name}%")
+    if mmsi:
+        conditions.append("vo.mmsi = ?")
+        params.append(mmsi)
+    if registry_where:
+        conditions.append(f"vo.mmsi IN (SELECT v.mmsi FROM vessel_registry v WHERE {registry_where})")
+        params.extend(registry_params)
+
+    return " AND ".join(conditions), params
+
+
+@app.get("/api/ledger")
+def get_ledger(
+    kinds: str = "auction,private_sale,expense",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    fish_species: Optional[str] = None,
+    auction_port: Optional[str] = None,
+    category: Optional[str] = None,
+    vessel_name: Optional[str] = None,
+    mmsi: Optional[str] = None,
+    group_name: Optional[str] = None,
+    organization: Optional[str] = None,
+    business_type: Optional[str] = None,
+    sort: str = Query('date', pattern="^(date|amount)$"),
+    order: str = Query('desc', pattern="^(asc|desc)$"),
+    page_size: int = Query(100, ge=1, le=1000),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    with_totals: bool = True
+):
+    """위판/사매/경비 통합 원장 (UNION ALL, 커서 페이지네이션, 누적 합계)
+
+    kinds로 포함할 종류(auction, private_sale, expense)를 고른다. 어종/위판장 조건은
+    해당 컬럼이 있는 종류에만 적용되고 나머지 종류는 제외되며, 경비 카테고리도 같다.
+    그룹/소속/업종 조건은 전국어선정보의 MMSI로 거른다.
+
+    각 행의 running_amount/running_balance는 정렬 순서상 첫 행부터의 누적 금액과
+    누적 손익(매출 - 경비)이며, 커서에 이어받을 값이 들어 있어 어느 페이지든 해당
+    페이지 행만 읽는다. summary(종류별 건수/수량/금액)는 with_totals=false면 생략한다.
+    """
+    selected = [k.strip() for k in kinds.split(",") if k.strip()]
+    if not selected or any(k not in LEDGER_SOURCES for k in selected):
+        raise HTTPException(status_code=400, detail="kinds는 auction, private_sale, expense 중에서 선택하세요")
+
+    registry_where, registry_params = None, []
+    if any(f and f != 'all' for f in (group_name, organization, business_type)):
+        registry_where, registry_params = vessel_registry_filters(
+            business_type=business_type, group_name=group_name, organization=organization
+        )
+
+    branches = {}
+    for kind in dict.fromkeys(selected):
+        built = ledger_branch_filters(kind, start_date, end_date, fish_species, auction_port, category,
+                                      vessel_name, mmsi, registry_where, registry_params)
+        if built is not None:
+            branches[kind] = built
+
+    direction = "DESC" if order == "desc" else "ASC"
+    sort_col = LEDGER_SORT_KEYS[sort]
+    running_amount = running_balance = 0.0
+    after = None
+    if page_cursor:
+        key, last_kind, last_id, running_amount, running_balance = decode_ledger_cursor(page_cursor, sort, order)
+        after = (key, last_kind, last_id)
+
+    data, summary = [], None
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+
+        if branches:
+            # 종류별로 정렬/LIMIT 후 합쳐서 다시 정렬 (각 테이블에서 한 페이지 분량만 읽음)
+            parts, params = [], []
+            for kind, (where, branch_params) in branches.items():
+                source = LEDGER_SOURCES[kind]
+                key_col = source["date"] if sort == "date" else source["amount"]
+                branch_where, branch_params = where, list(branch_params)
+                if after:
+                    # (키, 종류, id) 비교를 종류별로 풀어 (일자, id) 인덱스 범위 검색이 되게 함
+                    key, last_kind, last_id = after
+                    op = "<" if order == "desc" else ">"
+                    if kind == last_kind:
+                        branch_where += f" AND ({key_col}, {source['alias']}.id) {op} (?, ?)"
+                        branch_params.extend([key, last_id])
+                    else:
+                        before_last = (kind < last_kind) == (order == "desc")
+                        branch_where += f" AND {key_col} {op}{'=' if before_last else ''} ?"
+                        branch_params.append(key)
+                parts.append(f"""SELECT * FROM ({source['select']}
+                    WHERE {branch_where}
+                    ORDER BY {key_col} {direction}, {source['alias']}.id {direction} LIMIT ?)""")
+                params.extend(branch_params + [page_size + 1])
+
+            order_by = f"{sort_col} {direction}, kind {direction}, id {direction}"
+            cursor.execute(f"""
+                SELECT *,
+                    SUM(amount) OVER w AS running_amount,
+                    SUM(signed_amount) OVER w AS running_balance
+                FROM ({' UNION ALL '.join(parts)})
+                WINDOW w AS (ORDER BY {order_by} ROWS UNBOUNDED PRECEDING)
+                ORDER BY {order_by} LIMIT ?
+            """, params + [page_size + 1])
+            rows = cursor.fetchall()
+
+            for row in rows[:page_size]:
+                d = dict(row)
+                d["running_amount"] += running_amount
+                d["running_balance"] += running_balance
+                data.append(d)
+            has_more = len(rows) > page_size
+
+            if with_totals:
+                parts, params = [], []
+                for kind, (where, branch_params) in branches.items():
+                    parts.append(f"SELECT kind, quantity, amount FROM ({LEDGER_SOURCES[kind]['select']} WHERE {where})")
+                    params.extend(branch_params)
+                cursor.execute(f"""
+                    SELECT kind, COUNT(*) AS count, COALESCE(SUM(quantity), 0) AS quantity,
+                           COALESCE(SUM(amount), 0) AS amount
+                    FROM ({' UNION ALL '.join(parts)}) GROUP BY kind
+                """, params)
+                summary = {kind: {"count": 0, "quantity": 0, "amount": 0} for kind in branches}
+                for row in cursor.fetchall():
+                    summary[row["kind"]] = {"count": row["count"], "quantity": row["quantity"], "amount": row["amount"]}
+        else:
+            has_more = False
+            if with_totals:
+                summary = {}
+
+    if summary is not None:
+        revenue = sum(v["amount"] for k, v in summary.items() if k != "expense")
+        expense = summary.get("expense", {}).get("amount", 0)
+        summary = {
+            "kinds": summary,
+            "count": sum(v["count"] for v in summary.values()),
+            "revenue": revenue,
+            "expense": expense,
+            "balance": revenue - expense,
         }
 
+    next_cursor = None
+    if has_more and data:
+        last = data[-1]
+        next_cursor = encode_ledger_cursor(sort, order, last, last["running_amount"], last["running_balance"])
+
+    return {
+        "data": data,
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+        "summary": summary
+    }
+
+
+# ---------- 정산 API ----------
+
+# level -> (집계 테이블, 정렬)
+SETTLEMENT_LEVELS = {
+    "voyage": ("voyage_settlement", "voyage_id"),
+    "vessel_month": ("vessel_month_settlement", "mmsi, month"),
+    "species": ("species_sales_rollup", "month DESC, fish_species"),
+    "port": ("port_sales_rollup", "month DESC, auction_port"),
+    "month": ("month_settlement", "month DESC"),
+}
+
+
+def settlement_row(row):
+    """집계 행에 총매출/손익 파생 값 추가"""
+    d = dict(row)
+    revenue = d.get('auction_revenue', 0) + d.get('private_revenue', 0)
+    d['total_revenue'] = revenue
+    if 'expense_amount' in d:
+        d['profit'] = revenue - d['expense_amount']
+    return d
+
+
+@app.get("/api/settlement")
+def get_settlement(
+    level: str = Query("voyage", pattern="^(voyage|vessel_month|species|port|month)$"),
+    voyage_id: Optional[str] = None,
+    mmsi: Optional[str] = None,
+    start_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    end_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    fish_species: Optional[str] = None,
+    auction_port: Optional[str] = None
+):
+    """정산 집계 조회 (위판/사매/경비 CRUD가 트리거로 유지하는 집계 테이블)
+
+    level=voyage: 항차별, vessel_month: 어선(MMSI)·월별, species: 어종·월별, port: 위판장·월별, month: 월별
+    """
+    table, order = SETTLEMENT_LEVELS[level]
+    keys, metrics = SALES_ROLLUP_TABLES[table]
+    filters = {
+        'voyage_id': voyage_id, 'mmsi': mmsi, 'fish_species': fish_species, 'auction_port': auction_port
+    }
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+
+        query = f"SELECT * FROM {table} WHERE ({' OR '.join(f'{m} != 0' for m in metrics if m.endswith('_count'))})"
+        params = []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if key not in keys:
+                raise HTTPException(status_code=400, detail=f"{level} 집계에는 {key} 조건을 쓸 수 없습니다")
+            query += f" AND {key} = ?"
+            params.append(value)
+        if start_month or end_month:
+            if 'month' not in keys:
+                raise HTTPException(status_code=400, detail=f"{level} 집계에는 월 조건을 쓸 수 없습니다")
+            if start_month:
+                query += " AND month >= ?"
+                params.append(start_month)
+            if end_month:
+                query += " AND month <= ?"
+                params.append(end_month)
+
+        cursor.execute(f"{query} ORDER BY {order}", params)
+        data = [settlement_row(row) for row in cursor.fetchall()]
+
+    summary = {m: sum(d[m] for d in data) for m in metrics}
+    summary = settlement_row(summary)
+    return {"data": data, "total": len(data), "summary": summary}
+
+
+@app.get("/api/voyages/{voyage_id}/settlement")
+def get_voyage_settlement(voyage_id: str):
+    """항차 정산 (위판·사매 매출, 경비, 손익)"""
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id FROM voyages WHERE id = ?", (voyage_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="항차를 찾을 수 없습니다")
+
+        cursor.execute("SELECT * FROM voyage_settlement WHERE voyage_id = ?", (voyage_id,))
+        row = cursor.fetchone()
+        if row is None:
+            _, metrics = SALES_ROLLUP_TABLES['voyage_settlement']
+            row = {'voyage_id': voyage_id, **{m: 0 for m in metrics}}
+        return {"data": settlement_row(row)}
+
+
+# ---------- 판매 분석 API ----------
+
+ANALYTICS_ROW_LIMIT = 50000
+
+
+@app.get("/api/analytics/sales")
+def get_sales_analytics(
+    group_by: str = "species",
+    bucket: str = Query("month", pattern="^(day|week|month|year|all)$"),
+    kinds: str = "auction,private_sale",
+    start: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}(-\d{2})?$"),
+    end: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}(-\d{2})?$"),
+    fish_species: Optional[str] = None,
+    auction_port: Optional[str] = None,
+    mmsi: Optional[str] = None,
+    group_name: Optional[str] = None,
+    percentiles: str = "50,90",
+    source: Optional[str] = Query(None, pattern="^(cube|raw)$")
+):
+    """위판/사매 판매 분석 (구간·차원별 수량, 매출, 건수, 평균 단가, 단가 백분위수)
+
+    group_by는 species, port, vessel, group 중 0개 이상(쉼표 구분, 빈 값이면 구간별 합계),
+    bucket은 day/week(월요일 시작)/month/year/all. start/end는 YYYY-MM 또는 YYYY-MM-DD(종료 포함).
+    month/year/all 구간이고 기간이 월 단위이면 월별 큐브(sales_analytics 참고)를, 아니면 원본 테이블을 읽으며
+    source로 강제할 수 있다. 백분위수는 수량 가중이고 단가 구간 대표값이라 상대 오차가 약 2.5% 이내다.
+    """
+    dims = [d.strip() for d in group_by.split(",") if d.strip()]
+    if any(d not in sales_analytics.ANALYTICS_DIMENSIONS for d in dims) or len(set(dims)) != len(dims):
+        raise HTTPException(status_code=400, detail="group_by는 species, port, vessel, group 중에서 선택하세요")
+    selected = [k.strip() for k in kinds.split(",") if k.strip()]
+    if not selected or any(k not in sales_analytics.ANALYTICS_KINDS for k in selected):
+        raise HTTPException(status_code=400, detail="kinds는 auction, private_sale 중에서 선택하세요")
+    try:
+        points = [float(p) for p in percentiles.split(",") if p.strip()]
+        if any(not 0 <= p <= 100 for p in points):
+            raise ValueError
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles는 0~100 사이 숫자를 쉼표로 구분해 입력하세요")
+
+    filters = {
+        "fish_species": fish_species, "auction_port": auction_port, "mmsi": mmsi, "group_name": group_name
+    }
+    with get_db(readonly=True) as conn:
+        try:
+            result = sales_analytics.run_analytics(
+                conn.cursor(), dims, bucket, selected, start, end, filters, points,
+                use_cube=None if source is None else source == "cube"
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    data = result["data"]
+    return {
+        "data": data[:ANALYTICS_ROW_LIMIT],
+        "truncated": len(data) > ANALYTICS_ROW_LIMIT,
+        "source": result["source"],
+        "group_by": dims,
+        "bucket": bucket,
+    }
+
+
+# ---------- 통계 API ----------
+
+# 대시보드 통계 스냅샷 최대 수명(초). 집계 테이블은 쓰기와 같은 트랜잭션에서 트리거로 갱신되므로
+# 스냅샷은 이 시간 안에서만 DB보다 늦을 수 있다.
+STATS_MAX_AGE = float(os.environ.get("STATS_MAX_AGE", "5"))
+statistics_cache = QueryCache(ttl=STATS_MAX_AGE)
+
+STATS_SALES_METRICS = ['auction_revenue', 'auction_count', 'private_revenue', 'private_count',
+                       'expense_amount', 'expense_count']
+
+
+def compute_statistics_snapshot():
+    """월별 집계 테이블(voyage_month_stats, month_settlement)에서 통계 스냅샷 계산
+
+    원본 테이블은 읽지 않으며 집계 행 수는 월 수에 비례한다.
+    출항일/판매일이 없는 행은 month = None으로 모인다.
+    """
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+
+        def count_vessels():
+            cursor.execute("SELECT COUNT(*) FROM vessel_registry")
+            return cursor.fetchone()[0]
+
+        total_vessels = registry_cache.get_or_compute(("vessel_registry_count", "1=1", ()), count_vessels)
+
+        months = {}
+        cursor.execute("SELECT month, voyage_count, active_count, catch_amount FROM voyage_month_stats")
+        for row in cursor.fetchall():
+            months.setdefault(row["month"], {}).update(
+                voyage_count=row["voyage_count"],
+                active_voyages=row["active_count"],
+                catch_amount=row["catch_amount"]
+            )
+        cursor.execute(f"SELECT month, {', '.join(STATS_SALES_METRICS)} FROM month_settlement")
+        for row in cursor.fetchall():
+            months.setdefault(row["month"], {}).update({m: row[m] for m in STATS_SALES_METRICS})
+
+    metrics = ['voyage_count', 'active_voyages', 'catch_amount'] + STATS_SALES_METRICS
+    by_month, by_year = [], {}
+    for month in sorted(months):
+        values = {m: months[month].get(m, 0) for m in metrics}
+        # 행이 모두 지워져 0만 남은 월은 제외
+        if not any(values[m] for m in ('voyage_count', 'auction_count', 'private_count', 'expense_count')):
+            continue
+        values["total_revenue"] = values["auction_revenue"] + values["private_revenue"]
+        values["profit"] = values["total_revenue"] - values["expense_amount"]
+        by_month.append({"month": month or None, **values})
+        year = by_year.setdefault(month[:4] or None, {m: 0 for m in values})
+        for m, v in values.items():
+            year[m] += v
+
+    totals = {m: sum(row[m] for row in by_month) for m in metrics + ["total_revenue", "profit"]}
+    return {
+        "total_vessels": total_vessels,
+        "totals": totals,
+        "by_year": [{"year": y, **v} for y, v in by_year.items()],
+        "by_month": by_month,
+        "as_of": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+@app.get("/api/statistics")
+def get_statistics(
+    breakdown: Optional[str] = Query(None, pattern="^(year|month)$"),
+    year: Optional[str] = Query(None, pattern=r"^\d{4}$"),
+    fresh: bool = False
+):
+    """통계 데이터 (트리거로 유지되는 월별 집계의 메모리 스냅샷)
+
+    Args:
+        breakdown: year이면 연도별(by_year), month이면 월별(by_month) 내역 포함
+        year: 월별 내역을 한 해로 제한
+        fresh: True이면 스냅샷을 새로 계산 (최대 STATS_MAX_AGE초 지연 없이)
+    """
+    if fresh:
+        statistics_cache.invalidate()
+    snapshot = statistics_cache.get_or_compute("snapshot", compute_statistics_snapshot)
+    totals = snapshot["totals"]
+    result = {
+        "total_vessels": snapshot["total_vessels"],
+        "total_voyages": totals["voyage_count"],
+        "active_voyages": totals["active_voyages"],
+        "total_catch_amount": totals["catch_amount"],
+        "total_auction_amount": totals["auction_revenue"],
+        "total_private_amount": totals["private_revenue"],
+        "total_expense_amount": totals["expense_amount"],
+        "as_of": snapshot["as_of"],
+    }
+    if breakdown == "year":
+        result["by_year"] = snapshot["by_year"]
+    elif breakdown == "month":
+        result["by_month"] = [
+            row for row in snapshot["by_month"] if year is None or (row["month"] or "").startswith(year)
+        ]
+    return result
+
 
 # ---------- 어선 메모 API ----------
 
 @app.get("/api/vessel-registry/{vessel_id}/memos")
 def get_vessel_memos(vessel_id: int):
     """어선 메모 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT * FROM vessel_memos WHERE vessel_id = ? ORDER BY created_at DESC",
@@ -1314,7 +2280,7 @@ def delete_vessel_memo(vessel_id: int, memo_id: int):
 @app.get("/api/vessel-registry/{vessel_id}/photos")
 def get_vessel_photos(vessel_id: int):
     """어선 사진 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT * FROM vessel_photos WHERE vessel_id = ? ORDER BY is_primary DESC, created_at DESC",
@@ -1325,7 +2291,7 @@ def get_vessel_photos(vessel_id: int):
 
 
 @app.post("/api/vessel-registry/{vessel_id}/photos")
-async def upload_vessel_photo(
+def upload_vessel_photo(
     vessel_id: int,
     file: UploadFile = File(...),
     is_primary: bool = Form(False)
@@ -1432,7 +2398,7 @@ def set_primary_photo(vessel_id: int, photo_id: int):
 @app.get("/api/vessel-registry/{vessel_id}/files")
 def get_vessel_files(vessel_id: int):
     """어선 관련 파일 목록 조회"""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT * FROM vessel_files WHERE vessel_id = ? ORDER BY created_at DESC",
@@ -1443,7 +2409,7 @@ def get_vessel_files(vessel_id: int):
 
 
 @app.post("/api/vessel-registry/{vessel_id}/files")
-async def upload_vessel_file(
+def upload_vessel_file(
     vessel_id: int,
     file: UploadFile = File(...),
     description: str = Form("")
@@ -1479,14 +2445,14 @@ async def upload_vessel_file(
 
 
 @app.get("/api/uploads/files/{filename}")
-async def get_file(filename: str):
+def get_file(filename: str):
     """파일 다운로드"""
     file_path = FILE_DIR / filename
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다")
 
     # 원본 파일명 조회
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT original_name FROM vessel_files WHERE filename = ?", (filename,))
         row = cursor.fetchone()
@@ -1520,52 +2486,166 @@ def delete_vessel_file(vessel_id: int, file_id: int):
         return {"message": "파일이 삭제되었습니다"}
 
 
+# ---------- 항적 수집 API ----------
+
+@app.post("/api/tracks/ingest")
+def ingest_tracks(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson|nmea)$"),
+    compact: bool = True
+):
+    """AIS 항적 파일(CSV/NDJSON/NMEA) 수집 -> track_points
+
+    포인트는 MMSI와 시각으로 월별 항차에 배정되고 (voyage_id, timestamp) 중복은 무시된다.
+
+    Args:
+        file: 항적 파일
+        format: 입력 형식 (없으면 확장자로 추정)
+        compact: 적재 후 변경된 항차의 컬럼형 블록 재생성
+    """
+    fmt = format or track_ingest.detect_format(file.filename)
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    result = track_ingest.ingest_track_lines(lines, fmt, compact=compact)
+    return {
+        "message": f"{result['inserted']}개의 항적 포인트가 등록되었습니다",
+        "data": result
+    }
+
+
+@app.post("/api/tracks/zone-query")
+def query_track_zone(query: ZoneQuery):
+    """구역·기간 안에 항적이 있는 어선/항차와 체류 시간 조회
+
+    track_rtree 공간 색인으로 후보 블록만 읽으므로 track_blocks로 압축된 항적이 대상이다.
+    (track_points만 있는 항차는 /api/voyages/{voyage_id}/track/compact 후 검색된다)
+    """
+    if query.polygon is not None:
+        if len(query.polygon) < 3 or any(len(p) != 2 for p in query.polygon):
+            raise HTTPException(status_code=400, detail="polygon은 [경도, 위도] 3개 이상이어야 합니다")
+        lons = [p[0] for p in query.polygon]
+        lats = [p[1] for p in query.polygon]
+        bbox = (min(lons), min(lats), max(lons), max(lats))
+        if query.bbox is not None:
+            raise HTTPException(status_code=400, detail="bbox와 polygon은 함께 지정할 수 없습니다")
+    elif query.bbox is not None:
+        if len(query.bbox) != 4 or query.bbox[0] > query.bbox[2] or query.bbox[1] > query.bbox[3]:
+            raise HTTPException(status_code=400, detail="bbox는 [최소 경도, 최소 위도, 최대 경도, 최대 위도] 형식이어야 합니다")
+        bbox = tuple(query.bbox)
+    else:
+        raise HTTPException(status_code=400, detail="bbox 또는 polygon을 지정해야 합니다")
+    if query.start > query.end:
+        raise HTTPException(status_code=400, detail="시작 시각이 종료 시각보다 늦습니다")
+
+    start_epoch = calendar.timegm(query.start.utctimetuple())
+    end_epoch = calendar.timegm(query.end.utctimetuple())
+
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        hits = track_store.query_zone(cursor, bbox, start_epoch, end_epoch, query.polygon)
+
+        cursor.execute("""
+            SELECT id, mmsi, vessel_name FROM voyages WHERE id IN (SELECT value FROM json_each(?))
+        """, (json.dumps([h['voyage_id'] for h in hits]),))
+        voyages = {row['id']: dict(row) for row in cursor.fetchall()}
+
+    vessels = {}
+    for hit in hits:
+        voyage = voyages.get(hit['voyage_id'], {})
+        mmsi = voyage.get('mmsi')
+        vessel = vessels.setdefault(mmsi, {
+            "mmsi": mmsi,
+            "vessel_name": voyage.get('vessel_name'),
+            "hours": 0.0,
+            "points": 0,
+            "first_seen": hit['first_seen'],
+            "last_seen": hit['last_seen'],
+            "voyages": [],
+        })
+        vessel['hours'] += hit['seconds'] / 3600
+        vessel['points'] += hit['points']
+        vessel['first_seen'] = min(vessel['first_seen'], hit['first_seen'])
+        vessel['last_seen'] = max(vessel['last_seen'], hit['last_seen'])
+        vessel['voyages'].append({
+            "voyage_id": hit['voyage_id'],
+            "hours": round(hit['seconds'] / 3600, 2),
+            "points": hit['points'],
+            "first_seen": track_store.format_timestamps([hit['first_seen']])[0],
+            "last_seen": track_store.format_timestamps([hit['last_seen']])[0],
+        })
+
+    data = sorted(vessels.values(), key=lambda v: v['hours'], reverse=True)
+    for vessel in data:
+        vessel['hours'] = round(vessel['hours'], 2)
+        vessel['first_seen'], vessel['last_seen'] = track_store.format_timestamps(
+            [vessel['first_seen'], vessel['last_seen']]
+        )
+    return {"data": data, "total": len(data)}
+
+
 # ---------- 항적 HTML 파일 API ----------
 
 @app.get("/api/tracks/list/{mmsi}")
 def get_track_list(mmsi: str):
-    """특정 MMSI의 항적 HTML 파일 목록 조회"""
-    mmsi_dir = TRACK_HTML_DIR / mmsi
+    """특정 MMSI의 항적 HTML 파일 목록 조회 (track_html_files 색인)"""
+    track_html_index.ensure_fresh(TRACK_HTML_DIR, mmsi)
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        # 연도 내림차순, 월 오름차순 정렬
+        cursor.execute("""
+            SELECT filename, year, month, count, size, mtime
+            FROM track_html_files
+            WHERE mmsi = ? AND month IS NOT NULL
+            ORDER BY year DESC, month
+        """, (mmsi,))
+        tracks = [dict(row) for row in cursor.fetchall()]
 
-    if not mmsi_dir.exists():
+    if not tracks:
         return {"data": [], "years": [], "message": "항적 데이터가 없습니다"}
 
-    tracks = []
-    years_set = set()
-
-    for file in mmsi_dir.glob("*.html"):
-        # 파일명 형식: mmsi_year_month_count.html
-        parts = file.stem.split("_")
-        if len(parts) >= 4:
-            try:
-                year = int(parts[1])
-                month = int(parts[2])
-                count = int(parts[3])
-                years_set.add(year)
-                tracks.append({
-                    "filename": file.name,
-                    "year": year,
-                    "month": month,
-                    "count": count
-                })
-            except ValueError:
-                continue
-
-    # 연도 내림차순, 월 오름차순 정렬
-    tracks.sort(key=lambda x: (-x["year"], x["month"]))
-    years = sorted(list(years_set), reverse=True)
-
+    years = sorted({t["year"] for t in tracks}, reverse=True)
     return {"data": tracks, "years": years}
 
 
 @app.get("/api/tracks/html/{mmsi}/{filename}")
-def get_track_html(mmsi: str, filename: str):
-    """항적 HTML 파일 내용 반환"""
+def get_track_html(
+    request: Request,
+    mmsi: str,
+    filename: str,
+    format: str = Query("json", pattern="^(json|raw)$")
+):
+    """항적 HTML 파일 내용 반환
+
+    format=json: {"html": 내용, "filename": 파일명}
+    format=raw: text/html을 그대로 스트리밍 (gzip/brotli 압축, ETag/Last-Modified, 304 지원)
+    """
+    if "/" in filename or "\\" in filename or ".." in filename or "/" in mmsi or ".." in mmsi:
+        raise HTTPException(status_code=400, detail="잘못된 파일 경로입니다")
     file_path = TRACK_HTML_DIR / mmsi / filename
 
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="항적 파일을 찾을 수 없습니다")
 
+    if format == "raw":
+        stat = file_path.stat()
+        version = track_html_cache.file_version(stat)
+        encoding = track_html_cache.negotiate_encoding(request.headers.get("accept-encoding"))
+        headers = track_html_cache.cache_headers(version, stat, encoding)
+
+        if track_html_cache.is_not_modified(request.headers, version, stat):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return FileResponse(file_path, media_type="text/html; charset=utf-8", headers=headers, stat_result=stat)
+
+        cached = track_html_cache.cached_compressed_path(file_path, mmsi, version, encoding)
+        if cached:
+            return FileResponse(cached, media_type="text/html; charset=utf-8", headers=headers)
+        return StreamingResponse(
+            track_html_cache.iter_compressed(file_path, encoding),
+            media_type="text/html; charset=utf-8",
+            headers=headers
+        )
+
     # HTML 파일 내용 반환
     with open(file_path, "r", encoding="utf-8") as f:
         content = f.read()
@@ -1576,49 +2656,39 @@ def get_track_html(mmsi: str, filename: str):
 @app.get("/api/tracks/years/{mmsi}")
 def get_track_years(mmsi: str):
     """특정 MMSI의 사용 가능한 연도 목록"""
-    mmsi_dir = TRACK_HTML_DIR / mmsi
-
-    if not mmsi_dir.exists():
-        return {"years": []}
-
-    years_set = set()
-    for file in mmsi_dir.glob("*.html"):
-        parts = file.stem.split("_")
-        if len(parts) >= 2:
-            try:
-                year = int(parts[1])
-                years_set.add(year)
-            except ValueError:
-                continue
-
-    return {"years": sorted(list(years_set), reverse=True)}
+    track_html_index.ensure_fresh(TRACK_HTML_DIR, mmsi)
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT DISTINCT year FROM track_html_files WHERE mmsi = ? ORDER BY year DESC",
+            (mmsi,)
+        )
+        return {"years": [row["year"] for row in cursor.fetchall()]}
 
 
 @app.get("/api/tracks/months/{mmsi}/{year}")
 def get_track_months(mmsi: str, year: int):
     """특정 MMSI, 연도의 사용 가능한 월 목록"""
-    mmsi_dir = TRACK_HTML_DIR / mmsi
-
-    if not mmsi_dir.exists():
-        return {"months": []}
-
-    months_data = []
-    for file in mmsi_dir.glob(f"{mmsi}_{year}_*.html"):
-        parts = file.stem.split("_")
-        if len(parts) >= 4:
-            try:
-                month = int(parts[2])
-                count = int(parts[3])
-                months_data.append({
-                    "month": month,
-                    "count": count,
-                    "filename": file.name
-                })
-            except ValueError:
-                continue
-
-    months_data.sort(key=lambda x: x["month"])
-    return {"months": months_data}
+    track_html_index.ensure_fresh(TRACK_HTML_DIR, mmsi)
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT month, count, filename
+            FROM track_html_files
+            WHERE mmsi = ? AND year = ? AND month IS NOT NULL AND substr(filename, 1, length(?) + 1) = ? || '_'
+            ORDER BY month
+        """, (mmsi, year, mmsi, mmsi))
+        return {"months": [dict(row) for row in cursor.fetchall()]}
+
+
+@app.post("/api/tracks/index/refresh")
+def refresh_track_index(full: bool = False):
+    """항적 HTML 파일 색인 갱신 (full=true: 폴더 mtime과 관계없이 전체 재검사)"""
+    result = track_html_index.scan(TRACK_HTML_DIR, full=full)
+    return {
+        "message": f"{result['rescanned']}개 폴더를 다시 읽었습니다",
+        "data": result
+    }
 
 
 if __name__ == "__main__":
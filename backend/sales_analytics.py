@@ -0,0 +1,212 @@
+"""위판/사매 판매 분석 (어종/위판장/어선/선단 x 일/주/월/연 구간)
+
+피해 전후 비교처럼 여러 해에 걸친 조회는 트리거로 유지되는 월별 큐브에서, 월 단위로 맞지 않는
+기간이나 일/주 구간은 원본 테이블에서 같은 모양의 행을 만들어 집계한다.
+어선/선단 차원이나 조건이 없으면 어선 키가 없는 sales_cube(전체 선단), 있으면 vessel_sales_cube를 읽는다.
+
+    - 수량, 매출, 건수, 평균 단가(매출/수량)
+    - 단가 백분위수: 수량 가중, 단가 구간(PRICE_BUCKET_BASE) 히스토그램으로 계산하므로
+      상대 오차는 최대 sqrt(PRICE_BUCKET_BASE)-1
+    - 선단(group) 기준 집계에서 여러 선단에 속한 어선은 각 선단에 모두 들어가고, 선단이 없으면 None
+"""
+import calendar
+from datetime import date, timedelta
+
+from database import PRICE_BUCKET_BASE, PRICE_BUCKET_SQL
+
+# 분석 차원 -> (출력 키, 집계 행(c)/선단(g) 기준 식)
+ANALYTICS_DIMENSIONS = {
+    "species": ("fish_species", "c.fish_species"),
+    "port": ("auction_port", "c.auction_port"),
+    "vessel": ("mmsi", "c.mmsi"),
+    "group": ("group_name", "g.group_name"),
+}
+
+# 시간 구간 -> 집계 행의 날짜(c.day: 원본은 YYYY-MM-DD, 큐브는 YYYY-MM)에서 구간 값을 구하는 식
+TIME_BUCKETS = {
+    "day": "c.day",
+    "week": "date(c.day, '-' || ((CAST(strftime('%w', c.day) AS INTEGER) + 6) % 7) || ' days')",
+    "month": "substr(c.day, 1, 7)",
+    "year": "substr(c.day, 1, 4)",
+    "all": "NULL",
+}
+
+# 판매 종류 -> 큐브 컬럼 접두어
+ANALYTICS_KINDS = {"auction": "auction", "private_sale": "private"}
+
+# 원본 테이블에서 큐브와 같은 모양의 행을 만드는 쿼리 -> (쿼리, 날짜 컬럼)
+_RAW_SOURCES = {
+    "auction": ("""
+        SELECT substr(a.auction_date, 1, 10) AS day, COALESCE(v.mmsi, '') AS mmsi,
+               a.fish_species, a.auction_port, {bucket} AS price_bucket,
+               a.total_price AS auction_revenue, a.quantity AS auction_quantity, 1 AS auction_count,
+               0 AS private_revenue, 0 AS private_quantity, 0 AS private_count
+        FROM auctions a LEFT JOIN voyages v ON v.id = a.voyage_id""", "a.auction_date"),
+    "private_sale": ("""
+        SELECT substr(p.sale_date, 1, 10) AS day, COALESCE(v.mmsi, '') AS mmsi,
+               p.fish_species, '' AS auction_port, {bucket} AS price_bucket,
+               0 AS auction_revenue, 0 AS auction_quantity, 0 AS auction_count,
+               p.total_price AS private_revenue, p.quantity AS private_quantity, 1 AS private_count
+        FROM private_sales p LEFT JOIN voyages v ON v.id = p.voyage_id""", "p.sale_date"),
+}
+
+
+def _parse_day(value, end=False):
+    """'YYYY-MM-DD' 또는 'YYYY-MM'(월 첫날/마지막 날) -> date"""
+    try:
+        parts = [int(p) for p in value.split("-")]
+        if len(parts) == 2:
+            year, month = parts
+            return date(year, month, calendar.monthrange(year, month)[1] if end else 1)
+        return date(*parts)
+    except (TypeError, ValueError):
+        raise ValueError(f"잘못된 날짜입니다: {value}")
+
+
+def resolve_period(start=None, end=None):
+    """조회 기간 -> (시작일, 종료일(포함), 큐브 사용 가능 여부)
+
+    시작이 월 첫날, 종료가 월 마지막 날(또는 기간 없음)이면 월별 큐브로 정확히 계산할 수 있다.
+    """
+    start_day = _parse_day(start) if start else None
+    end_day = _parse_day(end, end=True) if end else None
+    month_aligned = (start_day is None or start_day.day == 1) and (
+        end_day is None or end_day.day == calendar.monthrange(end_day.year, end_day.month)[1]
+    )
+    return start_day, end_day, month_aligned
+
+
+def price_percentiles(histogram, percentiles):
+    """{단가 구간: 수량} 히스토그램 -> {"50": 단가, ...} (수량 가중, 구간 대표값)"""
+    total = sum(w for w in histogram.values() if w > 0)
+    if total <= 0:
+        return {f"{p:g}": None for p in percentiles}
+    buckets = sorted((b, w) for b, w in histogram.items() if w > 0)
+    result = {}
+    for p in percentiles:
+        target, cumulative = total * p / 100, 0.0
+        for bucket, weight in buckets:
+            cumulative += weight
+            if cumulative >= target:
+                break
+        result[f"{p:g}"] = round(PRICE_BUCKET_BASE ** (bucket + 0.5), 1)
+    return result
+
+
+def build_analytics_query(group_by, bucket, kinds, use_cube, start_day, end_day, filters):
+    """분석 집계 쿼리 생성 (구간·차원·단가 구간별 합계 행)
+
+    Args:
+        filters: {"fish_species", "auction_port", "mmsi", "group_name"} 중 값이 있는 것
+
+    Returns:
+        tuple: (SQL, 파라미터, 출력 차원 키 목록)
+    """
+    params = []
+    if use_cube:
+        per_vessel = {"vessel", "group"} & set(group_by) or filters.get("mmsi") or filters.get("group_name")
+        table = "vessel_sales_cube" if per_vessel else "sales_cube"
+        source = f"SELECT month AS day, * FROM {table} WHERE month != ''"
+        if start_day:
+            source += " AND month >= ?"
+            params.append(start_day.strftime("%Y-%m"))
+        if end_day:
+            source += " AND month <= ?"
+            params.append(end_day.strftime("%Y-%m"))
+    else:
+        branches = []
+        for kind in kinds:
+            query, date_col = _RAW_SOURCES[kind]
+            branch = query.format(bucket=PRICE_BUCKET_SQL.format(r=date_col.split(".")[0]))
+            where = []
+            if start_day:
+                where.append(f"{date_col} >= ?")
+                params.append(start_day.isoformat())
+            if end_day:
+                # 종료일 포함 (시각이 붙은 값도 들어가도록 다음 날 미만)
+                where.append(f"{date_col} < ?")
+                params.append((end_day + timedelta(days=1)).isoformat())
+            branches.append(branch + (f" WHERE {' AND '.join(where)}" if where else ""))
+        source = " UNION ALL ".join(branches)
+
+    joins, conditions = "", ["1=1"]
+    if "group" in group_by:
+        joins = """
+            LEFT JOIN (
+                SELECT DISTINCT vr.mmsi, vg.group_name
+                FROM vessel_registry vr JOIN vessel_groups vg ON vg.vessel_id = vr.id
+            ) g ON g.mmsi = c.mmsi"""
+    for key in ("fish_species", "auction_port", "mmsi"):
+        if filters.get(key):
+            conditions.append(f"c.{key} = ?")
+            params.append(filters[key])
+    if filters.get("group_name"):
+        conditions.append("""c.mmsi IN (
+            SELECT vr.mmsi FROM vessel_registry vr JOIN vessel_groups vg ON vg.vessel_id = vr.id
+            WHERE vg.group_name = ?)""")
+        params.append(filters["group_name"])
+
+    prefixes = [ANALYTICS_KINDS[k] for k in kinds]
+    metrics = ", ".join(
+        f"SUM({' + '.join(f'c.{p}_{m}' for p in prefixes)}) AS {m}" for m in ("revenue", "quantity", "count")
+    )
+    dim_keys = [ANALYTICS_DIMENSIONS[d][0] for d in group_by]
+    dim_exprs = [f"{ANALYTICS_DIMENSIONS[d][1]} AS {ANALYTICS_DIMENSIONS[d][0]}" for d in group_by]
+    select = ", ".join([f"{TIME_BUCKETS[bucket]} AS bucket"] + dim_exprs + ["c.price_bucket", metrics])
+    group = ", ".join(str(i + 1) for i in range(len(dim_keys) + 2))
+    sql = f"SELECT {select} FROM ({source}) c {joins} WHERE {' AND '.join(conditions)} GROUP BY {group}"
+    return sql, params, dim_keys
+
+
+def run_analytics(cursor, group_by, bucket, kinds, start=None, end=None, filters=None, percentiles=(50, 90),
+                  use_cube=None):
+    """판매 분석 실행
+
+    Args:
+        use_cube: None이면 가능할 때(월/연/전체 구간, 월 단위 기간) 큐브 사용, False이면 항상 원본
+
+    Returns:
+        dict: {"data": [구간·차원별 행], "source": "cube" | "raw"}
+    """
+    start_day, end_day, month_aligned = resolve_period(start, end)
+    cube_ok = month_aligned and bucket in ("month", "year", "all")
+    if use_cube is None:
+        use_cube = cube_ok
+    elif use_cube and not cube_ok:
+        raise ValueError("일/주 구간이나 월 단위가 아닌 기간은 월별 큐브로 계산할 수 없습니다")
+
+    sql, params, dim_keys = build_analytics_query(
+        group_by, bucket, kinds, use_cube, start_day, end_day, filters or {}
+    )
+    cursor.execute(sql, params)
+
+    groups = {}
+    for row in cursor.fetchall():
+        key = tuple(row[k] for k in ["bucket"] + dim_keys)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"revenue": 0.0, "quantity": 0.0, "count": 0, "histogram": {}}
+        group["revenue"] += row["revenue"]
+        group["quantity"] += row["quantity"]
+        group["count"] += row["count"]
+        bucket_no = row["price_bucket"]
+        group["histogram"][bucket_no] = group["histogram"].get(bucket_no, 0) + row["quantity"]
+
+    data = []
+    # None(선단 없음 등)은 뒤로
+    for key in sorted(groups, key=lambda k: [(v is None, v if v is not None else "") for v in k]):
+        group = groups[key]
+        # 전부 삭제되어 0만 남은 큐브 셀
+        if group["count"] <= 0:
+            continue
+        quantity = group["quantity"]
+        data.append({
+            "bucket": key[0],
+            **dict(zip(dim_keys, key[1:])),
+            "quantity": quantity,
+            "revenue": group["revenue"],
+            "count": group["count"],
+            "avg_unit_price": round(group["revenue"] / quantity, 1) if quantity > 0 else None,
+            "percentiles": price_percentiles(group["histogram"], percentiles),
+        })
+    return {"data": data, "source": "cube" if use_cube else "raw"}
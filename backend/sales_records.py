@@ -0,0 +1,190 @@
+"""위판/사매/경비 일괄 등록·수정·삭제
+
+위판 입력 화면의 하루치 시트처럼 여러 건(또는 세 종류가 섞인 변경 묶음)을 요청 한 번으로 처리한다.
+
+    - 항차 ID, 수정/삭제 대상 ID는 json_each 쿼리 한 번씩으로 확인
+    - 등록 ID는 테이블별로 한 번에 연속 발급 (database.next_record_ids)
+    - INSERT / UPDATE / DELETE / 수정이력 INSERT는 executemany
+    - 한 번에 처리한 수정의 이력은 같은 change_set_id로 묶인다
+    - 커밋하지 않으므로 호출한 쪽의 쓰기 트랜잭션 하나로 묶인다
+"""
+import json
+import uuid
+from datetime import datetime
+
+from database import next_record_ids
+
+# 종류 -> 테이블, 입력 컬럼, 금액 계산(수량, 단가, 금액 컬럼), 오류 문구
+SALES_KINDS = {
+    "auction": {
+        "table": "auctions",
+        "fields": ["auction_date", "auction_port", "fish_species", "quantity", "unit_price", "buyer", "note"],
+        "total": ("quantity", "unit_price", "total_price"),
+        "not_found": "위판 정보를 찾을 수 없습니다",
+    },
+    "private_sale": {
+        "table": "private_sales",
+        "fields": ["sale_date", "fish_species", "quantity", "unit_price", "buyer", "note"],
+        "total": ("quantity", "unit_price", "total_price"),
+        "not_found": "사매 정보를 찾을 수 없습니다",
+    },
+    "expense": {
+        "table": "expenses",
+        "fields": ["expense_date", "category", "description", "amount", "note"],
+        "total": None,
+        "not_found": "경비 정보를 찾을 수 없습니다",
+    },
+}
+
+
+def _db_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _existing_ids(cursor, table, ids):
+    """ids 중 table에 있는 것의 {id: 행}"""
+    if not ids:
+        return {}
+    cursor.execute(
+        f"SELECT * FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted(set(ids))),)
+    )
+    return {row["id"]: dict(row) for row in cursor.fetchall()}
+
+
+def _result(kind, op, index, record_id=None, error=None):
+    return {
+        "kind": kind, "op": op, "index": index, "id": record_id,
+        "status": "error" if error else "ok", "detail": error,
+    }
+
+
+def validate_changeset(cursor, changes):
+    """변경 묶음 검사 (쓰기 없음)
+
+    Args:
+        changes: {종류: {"create": [dict], "update": [dict(id 포함)], "delete": [id]}}
+
+    Returns:
+        tuple: (항목별 결과 목록, 종류별 기존 행 {종류: {id: 행}})
+    """
+    voyage_ids = {item["voyage_id"] for ops in changes.values() for item in ops.get("create", [])}
+    known_voyages = set()
+    if voyage_ids:
+        cursor.execute(
+            "SELECT id FROM voyages WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(voyage_ids)),)
+        )
+        known_voyages = {row[0] for row in cursor.fetchall()}
+
+    results, existing = [], {}
+    for kind, ops in changes.items():
+        spec = SALES_KINDS[kind]
+        for i, item in enumerate(ops.get("create", [])):
+            error = None if item["voyage_id"] in known_voyages else "해당 항차를 찾을 수 없습니다"
+            results.append(_result(kind, "create", i, error=error))
+
+        update_ids = [item["id"] for item in ops.get("update", [])]
+        delete_ids = list(ops.get("delete", []))
+        existing[kind] = _existing_ids(cursor, spec["table"], update_ids + delete_ids)
+        for op, ids in (("update", update_ids), ("delete", delete_ids)):
+            seen = set()
+            for i, record_id in enumerate(ids):
+                if record_id not in existing[kind]:
+                    error = spec["not_found"]
+                elif record_id in seen:
+                    error = "같은 ID가 여러 번 포함되었습니다"
+                else:
+                    error = None
+                seen.add(record_id)
+                results.append(_result(kind, op, i, record_id, error))
+    return results, existing
+
+
+def apply_changeset(cursor, changes, atomic=True):
+    """변경 묶음 검사 후 쓰기 (커밋은 호출한 쪽에서)
+
+    atomic=True이면 오류 항목이 하나라도 있을 때 아무것도 쓰지 않고, False이면 오류 항목만 건너뛴다.
+    종류마다 등록 -> 수정 -> 삭제 순서로 처리한다.
+
+    Returns:
+        tuple: (항목별 결과 목록, {"created", "updated", "deleted", "failed", "change_set_id"})
+    """
+    results, existing = validate_changeset(cursor, changes)
+    failed = sum(r["status"] == "error" for r in results)
+    counts = {"created": 0, "updated": 0, "deleted": 0, "failed": failed, "change_set_id": None}
+    if failed and atomic:
+        return results, counts
+
+    by_key = {(r["kind"], r["op"], r["index"]): r for r in results}
+
+    def ok(kind, op, i):
+        return by_key[(kind, op, i)]["status"] == "ok"
+
+    change_set_id = uuid.uuid4().hex
+    history = []
+    for kind, ops in changes.items():
+        spec = SALES_KINDS[kind]
+        table, fields = spec["table"], spec["fields"]
+
+        # 등록
+        creates = [(i, item) for i, item in enumerate(ops.get("create", [])) if ok(kind, "create", i)]
+        if creates:
+            new_ids = next_record_ids(cursor, table, len(creates))
+            columns = ["id", "voyage_id"] + fields + ([spec["total"][2]] if spec["total"] else [])
+            rows = []
+            for new_id, (i, item) in zip(new_ids, creates):
+                values = [new_id, item["voyage_id"]] + [_db_value(item.get(f)) for f in fields]
+                if spec["total"]:
+                    quantity, unit_price, _ = spec["total"]
+                    values.append(item[quantity] * item[unit_price])
+                rows.append(values)
+                by_key[(kind, "create", i)]["id"] = new_id
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+            )
+            counts["created"] += len(rows)
+
+        # 수정 (바뀐 필드만, 같은 필드 조합끼리 묶어 executemany)
+        grouped = {}
+        for i, item in enumerate(ops.get("update", [])):
+            if not ok(kind, "update", i):
+                continue
+            old = existing[kind][item["id"]]
+            changed = {}
+            for field in fields:
+                new_val = item.get(field)
+                if new_val is None:
+                    continue
+                new_val = _db_value(new_val)
+                old_str, new_str = str(old.get(field, '') or ''), str(new_val)
+                if old_str != new_str:
+                    changed[field] = new_val
+                    history.append((kind, item["id"], old["voyage_id"], field, old_str, new_str, change_set_id))
+            if not changed:
+                continue
+            if spec["total"]:
+                quantity, unit_price, total = spec["total"]
+                changed[total] = changed.get(quantity, old[quantity]) * changed.get(unit_price, old[unit_price])
+            grouped.setdefault(tuple(changed), []).append(list(changed.values()) + [item["id"]])
+            counts["updated"] += 1
+        for columns, rows in grouped.items():
+            assignments = ", ".join(f"{c} = ?" for c in columns)
+            cursor.executemany(
+                f"UPDATE {table} SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?", rows
+            )
+
+        # 삭제
+        deletes = [(record_id,) for i, record_id in enumerate(ops.get("delete", [])) if ok(kind, "delete", i)]
+        if deletes:
+            cursor.executemany(f"DELETE FROM {table} WHERE id = ?", deletes)
+            counts["deleted"] += len(deletes)
+
+    if history:
+        cursor.executemany("""
+            INSERT INTO modification_history
+                (record_type, record_id, voyage_id, field_name, old_value, new_value, change_set_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, history)
+        counts["change_set_id"] = change_set_id
+    return results, counts
@@ -0,0 +1,138 @@
+"""항적 HTML 파일 압축 전송
+
+네트워크 드라이브의 수 MB짜리 지도 HTML을 JSON 문자열로 감싸지 않고 그대로 내려보낸다.
+
+    - Accept-Encoding에 따라 brotli(설치된 경우) / gzip 압축
+    - ETag(크기+수정 시각)와 Last-Modified, If-None-Match/If-Modified-Since -> 304
+    - TRACK_HTML_CACHE_DIR에 압축본을 보관해 같은 파일은 다시 압축하지 않음
+      (원본 크기/수정 시각이 캐시 파일명에 들어가므로 원본이 바뀌면 자동으로 새로 만든다)
+"""
+import os
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 압축본 캐시 디렉토리 (빈 문자열이면 캐시 없이 요청마다 스트리밍 압축)
+TRACK_HTML_CACHE_DIR = os.environ.get(
+    "TRACK_HTML_CACHE_DIR", str(Path(__file__).parent / "cache" / "track_html")
+)
+
+CHUNK_SIZE = 256 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def file_version(stat):
+    """원본 파일 버전 문자열 (크기-수정시각ns, 16진수)"""
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def make_etag(version, encoding=None):
+    return f'"{version}-{encoding}"' if encoding else f'"{version}"'
+
+
+def negotiate_encoding(accept_encoding):
+    """Accept-Encoding 헤더에서 사용할 압축 방식 선택 (br > gzip > 없음)"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    if brotli and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def is_not_modified(headers, version, stat):
+    """조건부 요청(If-None-Match / If-Modified-Since)이 현재 버전과 일치하는지"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        for tag in if_none_match.split(","):
+            tag = tag.strip().removeprefix("W/").strip('"')
+            # 압축 방식 접미사(-br, -gzip)와 관계없이 같은 원본 버전이면 일치
+            if tag == version or tag.rsplit("-", 1)[0] == version:
+                return True
+        return False
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cache_headers(version, stat, encoding=None):
+    headers = {
+        "ETag": make_etag(version, encoding),
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def _compressor(encoding):
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return c.compress, c.flush
+
+
+def iter_compressed(path, encoding):
+    """파일을 CHUNK_SIZE씩 읽으며 압축한 바이트 조각 생성"""
+    process, finish = _compressor(encoding)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            out = process(chunk)
+            if out:
+                yield out
+    yield finish()
+
+
+def cached_compressed_path(path, mmsi, version, encoding):
+    """압축본 캐시 파일 경로 (없으면 만들고, 같은 원본의 이전 버전은 삭제)
+
+    캐시가 꺼져 있으면 None.
+    """
+    if not TRACK_HTML_CACHE_DIR:
+        return None
+    cache_dir = Path(TRACK_HTML_CACHE_DIR) / mmsi
+    target = cache_dir / f"{Path(path).name}.{version}{SUFFIXES[encoding]}"
+    if target.exists():
+        return target
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # 동시에 같은 파일을 요청해도 반쯤 쓴 파일이 보이지 않도록 임시 파일 후 교체
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{id(target):x}.tmp")
+    with open(tmp, "wb") as f:
+        for part in iter_compressed(path, encoding):
+            f.write(part)
+    os.replace(tmp, target)
+    # 이전 버전 정리 (다른 요청이 방금 만든 현재 버전은 남긴다)
+    for old in cache_dir.glob(f"{Path(path).name}.*{SUFFIXES[encoding]}"):
+        if old != target:
+            old.unlink(missing_ok=True)
+    return target
@@ -0,0 +1,312 @@
+"""항적 HTML 지도에서 좌표 추출 -> track_points
+
+TRACK_HTML_DIR/{mmsi}/{mmsi}_{year}_{month}_{count}.html 지도에 들어 있는 좌표와 시각을 읽어
+월별 항차({mmsi}-{year}-{month:02d})의 track_points로 적재한다.
+
+지원하는 형식:
+    - folium TimestampedGeoJson: "coordinates": [[lon, lat], ...] 와 "times": [...] 쌍
+    - 포인트별 마커: L.marker([lat, lon]) / L.circleMarker([lat, lon]) 뒤 팝업의
+      'YYYY-MM-DD HH:MM[:SS]' 시각과 속력/침로 값
+시각 없이 선(L.polyline)만 있는 파일은 시각을 만들어 넣지 않고 no_timestamps로 기록한다.
+
+파싱은 프로세스 풀에서 병렬로, DB 쓰기는 메인 프로세스의 쓰기 연결 하나로 한다.
+파일별 결과는 track_html_imports에 남기므로 중단 후 다시 실행하면 완료된 파일
+(크기/수정 시각 동일)은 건너뛰고, 다시 적재하더라도 (voyage_id, timestamp) 유니크
+인덱스 때문에 중복 포인트가 생기지 않는다.
+
+사용법:
+    python track_html_extract.py [--root 경로] [--workers N] [--mmsi MMSI] [--retry-failed] [--force]
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+import track_html_index
+import track_store
+from database import get_db, init_db
+
+# 동시에 파싱 중인 파일 수 상한 (작업자 수의 배수)
+IN_FLIGHT_PER_WORKER = 4
+# 이 포인트 수가 모이면 한 트랜잭션으로 적재
+EXTRACT_BATCH_POINTS = 100_000
+
+_NUM = r"-?\d+(?:\.\d+)?"
+MARKER_RE = re.compile(rf"L\.(?:circleMarker|marker)\(\s*\[\s*({_NUM})\s*,\s*({_NUM})\s*\]")
+DATETIME_RE = re.compile(r"(\d{4})[-./](\d{1,2})[-./](\d{1,2})[ T](\d{1,2}):(\d{2})(?::(\d{2}))?")
+SPEED_RE = re.compile(rf"(?:속력|속도|[Ss]peed|SOG|sog)[^0-9\-<]{{0,20}}(?:<[^>]*>[^0-9\-<]{{0,5}})*({_NUM})")
+COURSE_RE = re.compile(rf"(?:침로|방향|[Cc]ourse|COG|cog)[^0-9\-<]{{0,20}}(?:<[^>]*>[^0-9\-<]{{0,5}})*({_NUM})")
+GEOJSON_COORDS_RE = re.compile(r'"coordinates"\s*:\s*(\[[\[\]\s\d.,\-eE]*\])')
+GEOJSON_TIMES_RE = re.compile(r'"times"\s*:\s*(\[[^\]]*\])')
+POLYLINE_RE = re.compile(r"L\.polyline\(")
+
+
+def _format_datetime(match):
+    year, month, day, hour, minute, second = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d} {int(hour):02d}:{minute}:{int(second or 0):02d}"
+
+
+def _follow_values(positions, limits, pattern, text):
+    """각 구간 [positions[i], limits[i])에서 pattern의 첫 값을 찾아 float 배열로 (없으면 NaN)"""
+    found = [(m.start(), m.group(1)) for m in pattern.finditer(text)]
+    out = np.full(len(positions), np.nan)
+    if not found:
+        return out
+    starts = np.array([f[0] for f in found])
+    idx = np.searchsorted(starts, positions)
+    for i, j in enumerate(idx.tolist()):
+        if j < len(found) and starts[j] < limits[i]:
+            out[i] = float(found[j][1])
+    return out
+
+
+def _parse_geojson(text):
+    coords = [json.loads(m.group(1)) for m in GEOJSON_COORDS_RE.finditer(text)]
+    times = [json.loads(m.group(1)) for m in GEOJSON_TIMES_RE.finditer(text)]
+    if not times or len(coords) != len(times):
+        return None
+    rows = []
+    for coord, time_list in zip(coords, times):
+        # Point 피처는 [lon, lat] 하나
+        if coord and not isinstance(coord[0], list):
+            coord = [coord]
+        if len(coord) != len(time_list):
+            continue
+        for (lon, lat, *_), t in zip(coord, time_list):
+            if isinstance(t, (int, float)):
+                t = track_store.format_timestamps([int(t // 1000 if t > 10_000_000_000 else t)])[0]
+            else:
+                m = DATETIME_RE.search(str(t))
+                if not m:
+                    continue
+                t = _format_datetime(m)
+            rows.append((t, float(lat), float(lon), None, None))
+    return rows
+
+
+def _parse_markers(text):
+    markers = list(MARKER_RE.finditer(text))
+    if not markers:
+        return None
+    positions = np.array([m.end() for m in markers])
+    limits = np.append(np.array([m.start() for m in markers])[1:], len(text))
+
+    stamps = [(m.start(), _format_datetime(m)) for m in DATETIME_RE.finditer(text)]
+    if not stamps:
+        return None
+    stamp_pos = np.array([s[0] for s in stamps])
+    idx = np.searchsorted(stamp_pos, positions)
+    speed = _follow_values(positions, limits, SPEED_RE, text)
+    course = _follow_values(positions, limits, COURSE_RE, text)
+
+    rows = []
+    for i, (m, j) in enumerate(zip(markers, idx.tolist())):
+        if j >= len(stamps) or stamp_pos[j] >= limits[i]:
+            continue
+        rows.append((
+            stamps[j][1], float(m.group(1)), float(m.group(2)),
+            None if np.isnan(speed[i]) else float(speed[i]),
+            None if np.isnan(course[i]) else float(course[i]),
+        ))
+    return rows
+
+
+def parse_track_html(path):
+    """항적 HTML 한 개 파싱 (프로세스 풀 작업 함수)
+
+    Returns:
+        tuple: (rows, status, error) - rows는 (timestamp, lat, lon, speed, course) 목록,
+               status는 'done' / 'no_timestamps' / 'failed'
+    """
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        rows = _parse_geojson(text)
+        if not rows:
+            rows = _parse_markers(text)
+        if rows:
+            rows = [r for r in rows if abs(r[1]) <= 90 and abs(r[2]) <= 180]
+            return rows, "done", None
+        if POLYLINE_RE.search(text):
+            return [], "no_timestamps", "시각 정보 없이 선(polyline)만 있습니다"
+        return [], "failed", "좌표를 찾을 수 없습니다"
+    except Exception as e:
+        return [], "failed", str(e)
+
+
+def pending_files(mmsi=None, retry_failed=False, force=False):
+    """적재할 파일 목록 (track_html_files 색인 기준, 완료되고 바뀌지 않은 파일 제외)"""
+    query = """
+        SELECT f.mmsi, f.filename, f.year, f.month, f.size, f.mtime
+        FROM track_html_files f
+        LEFT JOIN track_html_imports i ON i.mmsi = f.mmsi AND i.filename = f.filename
+        WHERE f.month IS NOT NULL
+    """
+    params = []
+    if not force:
+        statuses = "('done', 'no_timestamps')" if retry_failed else "('done', 'no_timestamps', 'failed')"
+        query += f"""
+          AND NOT (i.status IN {statuses} AND i.size IS f.size AND i.mtime IS f.mtime)
+        """
+    if mmsi:
+        query += " AND f.mmsi = ?"
+        params.append(mmsi)
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(query + " ORDER BY f.mmsi, f.year, f.month", params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def _flush(pending, touched):
+    """파싱 결과 묶음을 한 트랜잭션으로 적재하고 파일별 상태 기록
+
+    Returns:
+        int: 새로 들어간 포인트 수
+    """
+    inserted = 0
+    with get_db() as conn:
+        cursor = conn.cursor()
+        voyage_ids = {item["voyage_id"] for item, rows, _, _ in pending if rows}
+        track_store.ensure_monthly_voyages(cursor, voyage_ids)
+        for item, rows, status, error in pending:
+            before = conn.total_changes
+            cursor.executemany("""
+                INSERT OR IGNORE INTO track_points (voyage_id, timestamp, latitude, longitude, speed, course)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(item["voyage_id"], *row) for row in rows])
+            added = conn.total_changes - before
+            inserted += added
+            cursor.execute("""
+                INSERT INTO track_html_imports (mmsi, filename, voyage_id, size, mtime, status, points, inserted, error, imported_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(mmsi, filename) DO UPDATE SET
+                    voyage_id = excluded.voyage_id, size = excluded.size, mtime = excluded.mtime,
+                    status = excluded.status, points = excluded.points, inserted = excluded.inserted,
+                    error = excluded.error, imported_at = excluded.imported_at
+            """, (item["mmsi"], item["filename"], item["voyage_id"], item["size"], item["mtime"],
+                  status, len(rows), added, error))
+        conn.commit()
+    touched.update(item["voyage_id"] for item, rows, _, _ in pending if rows)
+    return inserted
+
+
+def extract_all(root, workers=None, mmsi=None, retry_failed=False, force=False, compact=True,
+                rescan=True, progress=None):
+    """항적 HTML 일괄 추출
+
+    Args:
+        root: TRACK_HTML_DIR
+        workers: 파싱 프로세스 수 (기본: CPU 수)
+        mmsi: 특정 MMSI만
+        retry_failed: 실패했던 파일도 다시 시도
+        force: 완료 여부와 관계없이 모두 다시 적재 (중복 포인트는 무시됨)
+        compact: 적재 후 변경된 항차의 track_blocks 재생성
+        rescan: 시작 전에 파일 색인(track_html_files) 갱신
+        progress: 파일마다 progress(done, total, points)로 호출되는 콜백
+
+    Returns:
+        dict: {'files', 'done', 'no_timestamps', 'failed', 'points', 'inserted', 'voyages',
+               'elapsed', 'files_per_sec', 'points_per_sec', 'mb_per_sec'}
+    """
+    started = time.perf_counter()
+    if rescan:
+        track_html_index.scan(root)
+    files = pending_files(mmsi=mmsi, retry_failed=retry_failed, force=force)
+    for item in files:
+        item["voyage_id"] = track_store.monthly_voyage_id(item["mmsi"], item["year"], item["month"])
+
+    counts = {"done": 0, "no_timestamps": 0, "failed": 0}
+    points = inserted = total_bytes = 0
+    touched = set()
+    pending = []
+    pending_points = 0
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        queue = iter(files)
+        in_flight = {}
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                path = str(Path(root) / item["mmsi"] / item["filename"])
+                in_flight[executor.submit(parse_track_html, path)] = item
+
+        for _ in range(workers * IN_FLIGHT_PER_WORKER):
+            submit_next()
+
+        finished = 0
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = in_flight.pop(future)
+                rows, status, error = future.result()
+                counts[status] += 1
+                points += len(rows)
+                total_bytes += item["size"] or 0
+                pending.append((item, rows, status, error))
+                pending_points += len(rows)
+                if pending_points >= EXTRACT_BATCH_POINTS:
+                    inserted += _flush(pending, touched)
+                    pending, pending_points = [], 0
+                finished += 1
+                if progress:
+                    progress(finished, len(files), points)
+                submit_next()
+
+    if pending:
+        inserted += _flush(pending, touched)
+
+    if compact and touched:
+        # 항차마다 따로 커밋해 쓰기 연결을 항차 하나 분량만큼만 잡는다 (track_ingest와 같은 방식)
+        for voyage_id in sorted(touched):
+            with get_db() as conn:
+                track_store.rebuild_track_blocks(conn.cursor(), voyage_id)
+                conn.commit()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(files),
+        **counts,
+        "points": points,
+        "inserted": inserted,
+        "voyages": len(touched),
+        "elapsed": round(elapsed, 3),
+        "files_per_sec": round(len(files) / elapsed, 1) if elapsed > 0 else 0.0,
+        "points_per_sec": round(points / elapsed, 1) if elapsed > 0 else 0.0,
+        "mb_per_sec": round(total_bytes / 1e6 / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="항적 HTML 지도에서 좌표 추출")
+    # main.TRACK_HTML_DIR과 같은 기본 경로
+    parser.add_argument("--root", default="K:/어업피해조사_KFW대상선박", help="항적 HTML 루트 폴더")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mmsi")
+    parser.add_argument("--retry-failed", action="store_true", help="실패했던 파일도 다시 시도")
+    parser.add_argument("--force", action="store_true", help="완료된 파일도 다시 적재")
+    parser.add_argument("--no-compact", action="store_true", help="track_blocks 재생성 생략")
+    args = parser.parse_args()
+
+    init_db()
+    result = extract_all(
+        args.root, workers=args.workers, mmsi=args.mmsi, retry_failed=args.retry_failed,
+        force=args.force, compact=not args.no_compact,
+        progress=lambda done, total, points: print(f"\r{done:,}/{total:,} 파일, {points:,} 포인트", end="", flush=True)
+    )
+    print()
+    print(f"파일 {result['files']:,} (완료 {result['done']:,} / 시각 없음 {result['no_timestamps']:,} "
+          f"/ 실패 {result['failed']:,}), 포인트 {result['points']:,} (신규 {result['inserted']:,}), "
+          f"항차 {result['voyages']:,}")
+    print(f"{result['elapsed']:.2f}초 - {result['files_per_sec']:,.1f}파일/초, "
+          f"{result['points_per_sec']:,.0f}포인트/초, {result['mb_per_sec']:.1f}MB/초")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""항적 HTML 파일 목록 색인
+
+TRACK_HTML_DIR(네트워크 드라이브)의 {mmsi}/{mmsi}_{year}_{month}_{count}.html 파일 목록을
+track_html_files 테이블에 보관한다. 목록 API는 이 테이블만 조회하고,
+디렉토리 목록은 스캐너가 디렉토리 mtime이 바뀐 MMSI 폴더만 다시 읽는다.
+
+    - 백그라운드 스캐너: 시작 시 한 번, 이후 TRACK_INDEX_SCAN_INTERVAL마다 전체 폴더 mtime 비교
+    - 요청 시 확인: 마지막 확인 후 TRACK_INDEX_MAX_AGE가 지난 MMSI 폴더는 stat 한 번으로
+      mtime만 확인하고, 바뀌었으면 그 폴더만 다시 읽는다
+    - 네트워크 드라이브는 DB 연결 없이 읽고, 단일 쓰기 연결은 읽어 둔 행을 교체할 때만 잡는다
+
+폴더 mtime은 파일 추가/삭제/이름 변경 시에만 바뀌므로, 같은 이름으로 덮어쓴 파일의
+크기/수정 시각까지 반영하려면 full=True로 전체 재검사한다.
+"""
+import os
+import threading
+import time
+
+from database import get_db, PoolTimeout
+
+# 요청 시 폴더 mtime을 다시 확인하는 주기(초)
+TRACK_INDEX_MAX_AGE = int(os.environ.get("TRACK_INDEX_MAX_AGE", "60"))
+# 백그라운드 전체 검사 주기(초)
+TRACK_INDEX_SCAN_INTERVAL = int(os.environ.get("TRACK_INDEX_SCAN_INTERVAL", "600"))
+# 요청 시 색인 갱신에서 쓰기 연결을 기다리는 최대 시간(초)
+TRACK_INDEX_WRITE_TIMEOUT = float(os.environ.get("TRACK_INDEX_WRITE_TIMEOUT", "1"))
+
+_scan_lock = threading.Lock()
+# 폴더 mtime이 그대로임을 확인한 시각 {mmsi: time} (쓰기 없이 확인 주기를 지키기 위함)
+_checked = {}
+_stop_event = threading.Event()
+_scanner = None
+
+
+def parse_track_filename(name):
+    """'{mmsi}_{year}_{month}_{count}.html' -> (year, month, count), 해석 불가 부분은 None
+
+    연도를 읽을 수 없으면 None을 돌려준다.
+    """
+    parts = name[:-len(".html")].split("_")
+    if len(parts) < 2:
+        return None
+    try:
+        year = int(parts[1])
+    except ValueError:
+        return None
+    try:
+        month, count = int(parts[2]), int(parts[3])
+    except (IndexError, ValueError):
+        month = count = None
+    return year, month, count
+
+
+def _list_dir(root, mmsi):
+    """MMSI 폴더 한 개의 파일 목록 (네트워크 드라이브 접근, DB 연결 없이 호출)
+
+    Returns:
+        list | None: track_html_files 행 목록, 폴더가 없으면 None
+    """
+    rows = []
+    try:
+        with os.scandir(os.path.join(root, mmsi)) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".html") or not entry.is_file():
+                    continue
+                parsed = parse_track_filename(entry.name)
+                if parsed is None:
+                    continue
+                stat = entry.stat()
+                rows.append((mmsi, entry.name, *parsed, stat.st_size, stat.st_mtime))
+    except FileNotFoundError:
+        return None
+    return rows
+
+
+def _replace_dir(cursor, mmsi, dir_mtime, rows):
+    """미리 읽어 둔 MMSI 폴더 목록으로 track_html_files 교체 (rows가 None이면 폴더 삭제로 처리)"""
+    cursor.execute("DELETE FROM track_html_files WHERE mmsi = ?", (mmsi,))
+    if rows is None:
+        cursor.execute("DELETE FROM track_html_dirs WHERE mmsi = ?", (mmsi,))
+        return
+    cursor.executemany("""
+        INSERT INTO track_html_files (mmsi, filename, year, month, count, size, mtime)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    cursor.execute("""
+        INSERT INTO track_html_dirs (mmsi, mtime, file_count, checked_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(mmsi) DO UPDATE SET
+            mtime = excluded.mtime, file_count = excluded.file_count, checked_at = excluded.checked_at
+    """, (mmsi, dir_mtime, len(rows), time.time()))
+
+
+def scan(root, full=False):
+    """루트 폴더 전체 검사 (mtime이 바뀐 MMSI 폴더만 다시 읽음)
+
+    네트워크 드라이브 목록은 DB 연결 없이 먼저 모두 읽고, 쓰기 연결은 모은 행을
+    교체하는 동안만 잡는다 (첫 실행처럼 모든 폴더를 읽는 동안에도 다른 쓰기가 막히지 않음).
+
+    Args:
+        root: TRACK_HTML_DIR
+        full: True이면 mtime과 관계없이 모든 폴더를 다시 읽음
+
+    Returns:
+        dict: {'dirs', 'rescanned', 'removed', 'files', 'elapsed'}
+    """
+    started = time.perf_counter()
+    # 드라이브가 연결되지 않았을 때 색인을 비우지 않도록 그대로 둔다
+    if not os.path.isdir(root):
+        return {"dirs": 0, "rescanned": 0, "removed": 0, "files": 0, "elapsed": 0.0}
+    with os.scandir(root) as entries:
+        current = {e.name: e.stat().st_mtime for e in entries if e.is_dir()}
+
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT mmsi, mtime FROM track_html_dirs")
+        known = {row["mmsi"]: row["mtime"] for row in cursor.fetchall()}
+
+    changed = [m for m, mtime in current.items() if full or known.get(m) != mtime]
+    removed = [m for m in known if m not in current]
+    listings = {mmsi: _list_dir(root, mmsi) for mmsi in changed}
+    files = sum(len(rows) for rows in listings.values() if rows)
+
+    with _scan_lock:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            for mmsi, rows in listings.items():
+                _replace_dir(cursor, mmsi, current[mmsi], rows)
+            for mmsi in removed:
+                _replace_dir(cursor, mmsi, None, None)
+            # 바뀌지 않은 폴더는 확인 시각만 갱신
+            cursor.execute("UPDATE track_html_dirs SET checked_at = ?", (time.time(),))
+            conn.commit()
+    _checked.clear()
+
+    return {
+        "dirs": len(current),
+        "rescanned": len(changed),
+        "removed": len(removed),
+        "files": files,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def ensure_fresh(root, mmsi):
+    """MMSI 폴더 색인이 오래됐으면 mtime을 확인해 필요할 때만 다시 읽음
+
+    폴더가 그대로면 확인 시각을 메모리에만 기록하므로 쓰기 연결이 필요 없다.
+    바뀐 경우에도 목록은 DB 연결 없이 읽고, 쓰기 연결을 TRACK_INDEX_WRITE_TIMEOUT 안에
+    얻지 못하면(대용량 CSV 가져오기 등) 기존 색인을 그대로 쓰고 다음 확인 때 다시 시도한다.
+    """
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT mtime, checked_at FROM track_html_dirs WHERE mmsi = ?", (mmsi,))
+        row = cursor.fetchone()
+    checked_at = max(row["checked_at"] if row else 0, _checked.get(mmsi, 0))
+    if time.time() - checked_at < TRACK_INDEX_MAX_AGE:
+        return
+    if not os.path.isdir(root):
+        return
+
+    try:
+        dir_mtime = os.stat(os.path.join(root, mmsi)).st_mtime
+    except FileNotFoundError:
+        dir_mtime = None
+    if row is None and dir_mtime is None:
+        return
+    if row and dir_mtime == row["mtime"]:
+        _checked[mmsi] = time.time()
+        return
+
+    rows = _list_dir(root, mmsi) if dir_mtime is not None else None
+    try:
+        with _scan_lock:
+            with get_db(timeout=TRACK_INDEX_WRITE_TIMEOUT) as conn:
+                _replace_dir(conn.cursor(), mmsi, dir_mtime, rows)
+                conn.commit()
+    except PoolTimeout:
+        print(f"항적 파일 색인 갱신 보류 ({mmsi}): 쓰기 연결 대기 시간 초과")
+
+
+def _scan_loop(root, interval):
+    while not _stop_event.is_set():
+        try:
+            scan(root)
+        except Exception as e:
+            print(f"항적 파일 색인 실패: {e}")
+        _stop_event.wait(interval)
+
+
+def start_scanner(root, interval=TRACK_INDEX_SCAN_INTERVAL):
+    """백그라운드 스캐너 시작 (이미 실행 중이면 무시)"""
+    global _scanner
+    if _scanner and _scanner.is_alive():
+        return
+    _stop_event.clear()
+    _scanner = threading.Thread(target=_scan_loop, args=(root, interval), name="track-html-index", daemon=True)
+    _scanner.start()
+
+
+def stop_scanner():
+    _stop_event.set()
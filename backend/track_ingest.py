@@ -0,0 +1,437 @@
+"""AIS 항적 대량 수집
+
+CSV / NDJSON / NMEA(AIVDM) 스트림을 읽어 track_points에 적재한다.
+포인트는 MMSI와 시각으로 월별 항차({mmsi}-{year}-{month:02d})에 배정되고,
+(voyage_id, timestamp) 유니크 인덱스로 중복이 제거된다.
+
+사용법:
+    python track_ingest.py 파일 [파일 ...] [--format csv|ndjson|nmea] [--no-compact]
+"""
+import argparse
+import csv
+import itertools
+import json
+import math
+import re
+import time
+import warnings
+
+import numpy as np
+
+import track_store
+from database import get_db, init_db
+
+INGEST_BATCH_SIZE = 100_000
+
+# CSV/NDJSON에서 허용하는 컬럼명
+FIELD_ALIASES = {
+    "mmsi": ("mmsi", "MMSI"),
+    "timestamp": ("timestamp", "time", "datetime", "시각", "일시"),
+    "latitude": ("latitude", "lat", "위도"),
+    "longitude": ("longitude", "lon", "lng", "경도"),
+    "speed": ("speed", "sog", "속력"),
+    "course": ("course", "cog", "침로"),
+}
+
+
+def detect_format(filename):
+    """파일 확장자로 입력 형식 추정"""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith((".nmea", ".ais", ".txt", ".log")):
+        return "nmea"
+    return "csv"
+
+
+def _resolve_fields(keys):
+    """입력 컬럼명 -> 표준 필드명 매핑"""
+    resolved = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in keys:
+                resolved[field] = alias
+                break
+    return resolved
+
+
+def _csv_batches(lines, batch_size):
+    """CSV를 batch_size행씩 읽어 필드별 컬럼 튜플로 (행 단위 파이썬 처리 없이 zip으로 전치)"""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [h.strip() for h in header]
+    fields = _resolve_fields(header)
+    idx = [header.index(fields[f]) if f in fields else None for f in FIELD_ALIASES]
+    width = max((i for i in idx if i is not None), default=-1) + 1
+    while rows := list(itertools.islice(reader, batch_size)):
+        # zip은 가장 짧은 행에 맞춰 자르므로 모자란 행만 채운다
+        if min(map(len, rows)) < width:
+            rows = [row if len(row) >= width else row + [''] * (width - len(row)) for row in rows]
+        columns = list(zip(*rows)) if width else []
+        yield tuple(columns[i] if i is not None else (None,) * len(rows) for i in idx)
+
+
+def _iter_ndjson(lines):
+    fields = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            yield (None,) * len(FIELD_ALIASES)
+            continue
+        if fields is None:
+            fields = _resolve_fields(obj.keys())
+        yield tuple(obj.get(fields[f]) if f in fields else None for f in FIELD_ALIASES)
+
+
+def _payload_bits(payload):
+    bits = 0
+    for ch in payload:
+        v = ord(ch) - 48
+        if v > 40:
+            v -= 8
+        bits = (bits << 6) | v
+    return bits, len(payload) * 6
+
+
+def _field(bits, nbits, start, length, signed=False):
+    value = (bits >> (nbits - start - length)) & ((1 << length) - 1)
+    if signed and value & (1 << (length - 1)):
+        value -= 1 << length
+    return value
+
+
+def decode_aivdm_position(payload):
+    """AIVDM 위치 보고(메시지 1/2/3/18) 페이로드 디코딩
+
+    Returns:
+        tuple | None: (mmsi, lat, lon, speed, course), 위치 보고가 아니면 None
+    """
+    bits, nbits = _payload_bits(payload)
+    if nbits < 168:
+        return None
+    msg_type = _field(bits, nbits, 0, 6)
+    if msg_type in (1, 2, 3):
+        sog, lon, lat, cog = (_field(bits, nbits, 50, 10), _field(bits, nbits, 61, 28, True),
+                              _field(bits, nbits, 89, 27, True), _field(bits, nbits, 116, 12))
+    elif msg_type == 18:
+        sog, lon, lat, cog = (_field(bits, nbits, 46, 10), _field(bits, nbits, 57, 28, True),
+                              _field(bits, nbits, 85, 27, True), _field(bits, nbits, 112, 12))
+    else:
+        return None
+    mmsi = str(_field(bits, nbits, 8, 30))
+    return (
+        mmsi,
+        lat / 600000.0,
+        lon / 600000.0,
+        sog / 10.0 if sog != 1023 else None,
+        cog / 10.0 if cog != 3600 else None,
+    )
+
+
+def _iter_nmea(lines):
+    """NMEA AIVDM/AIVDO 문장 파싱
+
+    시각은 태그 블록(\\c:epoch\\) 또는 문장 앞의 'timestamp,' 접두어에서 읽는다.
+    여러 조각으로 나뉜 문장(정적 정보 등)은 위치 보고가 아니므로 건너뛴다.
+    """
+    for line in lines:
+        line = line.strip()
+        start = line.find("!AIVD")
+        if start < 0:
+            continue
+        prefix, sentence = line[:start], line[start:]
+        timestamp = None
+        if prefix.startswith("\\"):
+            for item in prefix.strip("\\").split("*")[0].split(","):
+                if item.startswith("c:"):
+                    # 잘못된 태그 값은 시각 없음으로 두어 제외 건수에 포함
+                    try:
+                        timestamp = _epoch_from_number(item[2:])
+                    except ValueError:
+                        timestamp = None
+        elif prefix:
+            timestamp = prefix.rstrip(",; \t")
+
+        parts = sentence.split("*")[0].split(",")
+        if len(parts) < 7 or parts[1] != "1":
+            continue
+        try:
+            decoded = decode_aivdm_position(parts[5])
+        except (ValueError, IndexError):
+            decoded = None
+        if decoded is None or timestamp is None:
+            yield (None,) * len(FIELD_ALIASES)
+            continue
+        mmsi, lat, lon, speed, course = decoded
+        yield (mmsi, timestamp, lat, lon, speed, course)
+
+
+def _record_batches(parser):
+    """레코드 단위 파서를 batch_size개씩 컬럼 튜플로 묶는 배치 함수로"""
+    def batches(lines, batch_size):
+        records = parser(lines)
+        while batch := list(itertools.islice(records, batch_size)):
+            yield tuple(zip(*batch))
+    return batches
+
+
+# 형식 -> (줄 iterable, batch_size)를 받아 컬럼 튜플 배치를 내는 함수
+PARSERS = {"csv": _csv_batches, "ndjson": _record_batches(_iter_ndjson), "nmea": _record_batches(_iter_nmea)}
+
+
+def _to_float_array(values):
+    try:
+        # 빈 값이 없는 일반적인 경우는 바로 변환
+        return np.array(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        pass
+    try:
+        return np.array([np.nan if v in (None, '', '-') else v for v in values], dtype=np.float64)
+    except (ValueError, TypeError):
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+# 해석 불가 시각 표시값, 허용 범위 (1970-01-01 ~ 2100-01-01 UTC)
+INVALID_EPOCH = np.iinfo(np.int64).min
+EPOCH_MIN, EPOCH_MAX = 0, 4_102_444_800
+# 이보다 큰 epoch 숫자는 밀리초로 본다 (NMEA 태그 블록과 같은 규칙)
+EPOCH_MS_THRESHOLD = 10_000_000_000
+
+_NUMERIC_RE = re.compile(r"[+-]?\d+(\.\d*)?")
+_TZ_RE = re.compile(r"(\d{4}-\d{2}-\d{2}[ T][\d:.]+)(Z|[+-]\d{2}:?\d{2})")
+
+
+def _epoch_from_number(value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(value)
+    if abs(value) > EPOCH_MS_THRESHOLD:
+        value /= 1000
+    return math.floor(value)
+
+
+def _parse_epoch(value):
+    """시각 하나 -> epoch 초 (규칙은 _to_epoch_array 참고)"""
+    if value is None or isinstance(value, (bool, np.bool_)):
+        raise ValueError(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return _epoch_from_number(value)
+    text = str(value).strip()
+    if _NUMERIC_RE.fullmatch(text):
+        return _epoch_from_number(text)
+    offset = 0
+    match = _TZ_RE.fullmatch(text)
+    if match:
+        text, tz = match.groups()
+        if tz != "Z":
+            digits = tz[1:].replace(":", "")
+            offset = (int(digits[:2]) * 3600 + int(digits[2:]) * 60) * (1 if tz[0] == "+" else -1)
+    return int(np.datetime64(text, "s").astype(np.int64)) - offset
+
+
+def _to_epoch_array(values):
+    """시각 목록을 epoch 초(UTC) int64 배열로, 해석 불가나 범위 밖은 INVALID_EPOCH
+
+    숫자와 숫자 문자열은 epoch 초(EPOCH_MS_THRESHOLD 초과는 밀리초), 시간대가 없는 문자열은
+    UTC로 보고, Z / +09:00 같은 시간대가 붙은 문자열은 UTC로 변환한다.
+    """
+    types = set(map(type, values))
+    out = None
+    if types <= {int, float}:
+        arr = np.array(values, dtype=np.float64)
+        arr = np.where(np.abs(arr) > EPOCH_MS_THRESHOLD, arr / 1000, arr)
+        ok = np.isfinite(arr)
+        out = np.full(len(values), INVALID_EPOCH, dtype=np.int64)
+        out[ok] = np.floor(arr[ok]).astype(np.int64)
+    elif types == {str}:
+        # 일반적인 'YYYY-MM-DD HH:MM:SS'는 numpy로 한 번에 변환하고, 범위를 벗어난 값
+        # (숫자 문자열을 연도로 읽은 경우 등)만 다시 해석한다. 시간대가 붙은 값은 numpy가
+        # 경고(폐지 예정 동작)를 내므로 배치 전체를 하나씩 해석한다.
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            try:
+                out = track_store.parse_timestamps(values)
+            except (ValueError, TypeError, OverflowError, Warning):
+                out = None
+
+    if out is None:
+        out = np.full(len(values), INVALID_EPOCH, dtype=np.int64)
+        retry = range(len(values))
+    else:
+        retry = np.flatnonzero((out < EPOCH_MIN) | (out >= EPOCH_MAX)).tolist()
+    for i in retry:
+        try:
+            out[i] = _parse_epoch(values[i])
+        except (ValueError, TypeError, OverflowError):
+            out[i] = INVALID_EPOCH
+    out[(out < EPOCH_MIN) | (out >= EPOCH_MAX)] = INVALID_EPOCH
+    return out
+
+
+def _prepare_batch(columns):
+    """컬럼 배치를 검증/변환하여 (삽입 행, 항차 id 집합, 제외 수) 반환
+
+    삽입 행은 (항차, 시각) 순으로 정렬해 유니크 인덱스에 차례로 들어가게 한다.
+    """
+    mmsi, ts, lat, lon, speed, course = columns
+    epoch = _to_epoch_array(ts)
+    lat = _to_float_array(lat)
+    lon = _to_float_array(lon)
+    speed = _to_float_array(speed)
+    course = _to_float_array(course)
+    mmsi = np.char.strip(np.array([m if m is not None else "" for m in mmsi], dtype=str))
+
+    valid = (
+        (epoch != INVALID_EPOCH)
+        & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        & (mmsi != "")
+    )
+    rejected = int((~valid).sum())
+    idx = np.flatnonzero(valid)
+    if not len(idx):
+        return [], set(), rejected
+
+    epoch = epoch[idx]
+    months = epoch.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+
+    # (mmsi, 월) -> 월별 항차 id (고유 조합만 문자열로 만든다)
+    mmsi_values, mmsi_codes = np.unique(mmsi[idx], return_inverse=True)
+    keys, voyage_index = np.unique(mmsi_codes.astype(np.int64) * 100_000 + months, return_inverse=True)
+    voyage_list = [
+        track_store.monthly_voyage_id(str(mmsi_values[key // 100_000]), 1970 + key % 100_000 // 12,
+                                      key % 100_000 % 12 + 1)
+        for key in keys.tolist()
+    ]
+    # 항차 id 문자열 순서와 같도록 정렬 키를 매긴다
+    rank = np.empty(len(voyage_list), dtype=np.int64)
+    rank[np.argsort(np.array(voyage_list, dtype=str), kind="stable")] = np.arange(len(voyage_list))
+    order = np.lexsort((epoch, rank[voyage_index]))
+
+    idx, epoch, voyage_index = idx[order], epoch[order], voyage_index[order]
+    voyage_ids = np.array(voyage_list, dtype=object)[voyage_index].tolist()
+    timestamps = track_store.format_timestamps(epoch)
+    rows = list(zip(
+        voyage_ids, timestamps,
+        lat[idx].tolist(), lon[idx].tolist(), speed[idx].tolist(), course[idx].tolist()
+    ))
+    return rows, set(voyage_list), rejected
+
+
+def ingest_track_lines(lines, fmt="csv", compact=True, batch_size=INGEST_BATCH_SIZE, progress=None):
+    """텍스트 줄 스트림을 track_points에 적재
+
+    배치마다 쓰기 연결을 빌려 한 트랜잭션으로 삽입하므로, 긴 수집 중에도
+    다른 쓰기 요청이 배치 사이에 처리된다. 블록 재생성도 항차마다 따로 커밋한다.
+
+    Args:
+        lines: 텍스트 줄 iterable (파일 객체 등)
+        fmt: 'csv', 'ndjson', 'nmea'
+        compact: True이면 적재 후 새 포인트가 들어간 항차의 track_blocks 재생성
+        batch_size: 트랜잭션당 포인트 수
+        progress: 배치마다 progress(parsed, inserted, rejected)로 호출되는 콜백
+
+    Returns:
+        dict: {'parsed', 'inserted', 'duplicates', 'rejected', 'voyages', 'elapsed', 'points_per_sec',
+               'stages': 단계별 초 {'parse', 'prepare', 'insert', 'compact'}}
+    """
+    if fmt not in PARSERS:
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+
+    started = time.perf_counter()
+    parsed = inserted = rejected = 0
+    touched = set()
+    # 단계별 소요 시간 (병목 확인용)
+    stages = {"parse": 0.0, "prepare": 0.0, "insert": 0.0, "compact": 0.0}
+
+    def flush(columns):
+        nonlocal inserted, rejected
+        t0 = time.perf_counter()
+        rows, voyages, bad = _prepare_batch(columns)
+        t1 = time.perf_counter()
+        stages["prepare"] += t1 - t0
+        rejected += bad
+        if not rows:
+            return
+        with get_db() as conn:
+            cursor = conn.cursor()
+            track_store.ensure_monthly_voyages(cursor, voyages)
+            before = conn.total_changes
+            cursor.executemany("""
+                INSERT OR IGNORE INTO track_points (voyage_id, timestamp, latitude, longitude, speed, course)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+            added = conn.total_changes - before
+            conn.commit()
+        stages["insert"] += time.perf_counter() - t1
+        inserted += added
+        # 전부 중복인 배치의 항차는 블록을 다시 만들 필요가 없다
+        if added:
+            touched.update(voyages)
+
+    batches = PARSERS[fmt](lines, batch_size)
+    while True:
+        t0 = time.perf_counter()
+        columns = next(batches, None)
+        stages["parse"] += time.perf_counter() - t0
+        if columns is None:
+            break
+        parsed += len(columns[0])
+        flush(columns)
+        if progress:
+            progress(parsed, inserted, rejected)
+
+    if compact and touched:
+        # 항차마다 따로 커밋해 쓰기 연결을 항차 하나 분량만큼만 잡는다 (읽기와 교체는 같은
+        # 트랜잭션이어야 동시에 적재된 포인트가 빠진 블록으로 덮어쓰지 않는다)
+        t0 = time.perf_counter()
+        for voyage_id in sorted(touched):
+            with get_db() as conn:
+                track_store.rebuild_track_blocks(conn.cursor(), voyage_id)
+                conn.commit()
+        stages["compact"] = time.perf_counter() - t0
+
+    elapsed = time.perf_counter() - started
+    return {
+        "parsed": parsed,
+        "inserted": inserted,
+        "duplicates": parsed - rejected - inserted,
+        "rejected": rejected,
+        "voyages": len(touched),
+        "elapsed": round(elapsed, 3),
+        "points_per_sec": round(parsed / elapsed, 1) if elapsed > 0 else 0.0,
+        "stages": {k: round(v, 3) for k, v in stages.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIS 항적 대량 수집")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--format", choices=sorted(PARSERS), help="입력 형식 (기본: 확장자로 추정)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--no-compact", action="store_true", help="track_blocks 재생성 생략")
+    args = parser.parse_args()
+
+    init_db()
+    for path in args.files:
+        fmt = args.format or detect_format(path)
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            result = ingest_track_lines(f, fmt, compact=not args.no_compact, batch_size=args.batch_size)
+        print(f"{path}: 처리 {result['parsed']:,} / 등록 {result['inserted']:,} / 중복 {result['duplicates']:,} "
+              f"/ 제외 {result['rejected']:,} / 항차 {result['voyages']:,} "
+              f"({result['elapsed']:.2f}초, {result['points_per_sec']:,.0f}포인트/초)")
+
+
+if __name__ == "__main__":
+    main()
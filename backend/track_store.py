@@ -0,0 +1,533 @@
+"""항적 포인트 컬럼형 저장소
+
+track_points(행 단위)를 항차별 블록으로 묶어 track_blocks에 압축 저장한다.
+블록마다 위도/경도(1e-6도 정수), 시각(epoch 초)을 델타 인코딩한 int32 배열과
+속력/침로(0.1 단위 uint16) 배열을 zlib으로 압축해 둔다.
+
+읽기 API는 블록을 그대로 풀어 typed array 형태의 바이너리로 내려주므로
+수만 개 포인트도 JSON 파싱 없이 그릴 수 있다.
+
+블록을 쓸 때 Douglas-Peucker 단순화 단계(LOD)도 track_lod에 함께 저장해
+전체 지도에서는 수백 개 포인트만 읽어 보낼 수 있게 한다.
+
+공간 검색용으로 블록을 SPATIAL_CHUNK 포인트 단위로 나눈 (경도, 위도, 시간) 범위를
+R-tree(track_rtree)에 넣어 두고, 구역 질의는 R-tree로 후보 블록만 골라 푼다.
+"""
+import json
+import struct
+import zlib
+
+import numpy as np
+
+# 블록당 최대 포인트 수
+BLOCK_SIZE = 4096
+
+COORD_SCALE = 1_000_000
+VALUE_SCALE = 10
+MISSING_U16 = 0xFFFF
+
+# R-tree 항목 하나가 덮는 포인트 수 (BLOCK_SIZE의 약수)
+SPATIAL_CHUNK = 512
+
+# 구역 체류 시간 집계에서 수신 공백으로 보는 포인트 간격(초)
+ZONE_MAX_GAP = 2 * 3600
+
+# 미리 저장하는 LOD 단계별 허용 오차(m), 0단계가 가장 거칠다
+LOD_TOLERANCES = (5000.0, 1000.0, 200.0, 50.0)
+
+# 위경도 -> 근사 평면 좌표(m) 환산 계수
+METERS_PER_DEG_LAT = 110_540.0
+METERS_PER_DEG_LON = 111_320.0
+
+# 바이너리 응답 헤더: magic, 포인트 수, 기준 epoch(초)
+BINARY_MAGIC = b"TRK1"
+BINARY_HEADER = struct.Struct("<4sIq")
+
+
+def monthly_voyage_id(mmsi, year, month):
+    """월별 항차 id ({mmsi}-{year}-{month:02d})"""
+    return f"{mmsi}-{year}-{month:02d}"
+
+
+def ensure_monthly_voyages(cursor, voyage_ids):
+    """월별 항차가 없으면 생성 (get_or_create_monthly_voyage와 같은 기본값)"""
+    rows = []
+    for voyage_id in voyage_ids:
+        mmsi, year, month = voyage_id.rsplit("-", 2)
+        rows.append((
+            voyage_id, mmsi, int(year), int(month), mmsi, mmsi,
+            f"{year}-{month}-01T00:00:00", f"{int(year)}년 {int(month)}월"
+        ))
+    cursor.executemany("""
+        INSERT OR IGNORE INTO voyages (id, mmsi, year, voyage_no, vessel_name, departure_port,
+            departure_date, fishing_area, status)
+        VALUES (?, ?, ?, ?,
+            COALESCE((SELECT vessel_name FROM vessel_registry WHERE mmsi = ? LIMIT 1), ?),
+            '-', ?, ?, '조업중')
+    """, rows)
+
+
+def parse_timestamps(values):
+    """'YYYY-MM-DD HH:MM:SS' / ISO 문자열 목록을 epoch 초(int64) 배열로 변환"""
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+
+def format_timestamps(epoch):
+    """epoch 초 배열을 track_points.timestamp 형식 문자열 목록으로 변환"""
+    iso = np.datetime_as_string(np.asarray(epoch, dtype=np.int64).astype("datetime64[s]"), unit="s")
+    return [t[:10] + " " + t[11:] for t in iso.tolist()]
+
+
+def _encode_u16(values):
+    out = np.full(len(values), MISSING_U16, dtype=np.uint16)
+    values = np.asarray(values, dtype=np.float64)
+    ok = ~np.isnan(values)
+    out[ok] = np.clip(np.rint(values[ok] * VALUE_SCALE), 0, MISSING_U16 - 1)
+    return out
+
+
+def _decode_u16(raw):
+    values = raw.astype(np.float64) / VALUE_SCALE
+    values[raw == MISSING_U16] = np.nan
+    return values
+
+
+def _delta(values):
+    return np.diff(values, prepend=np.int64(0)).astype("<i4")
+
+
+def encode_block(lat, lon, epoch, speed, course):
+    """한 블록 분량의 배열을 압축 컬럼 바이트로 인코딩 (epoch 오름차순 가정)"""
+    lat_i = np.rint(np.asarray(lat, dtype=np.float64) * COORD_SCALE).astype(np.int64)
+    lon_i = np.rint(np.asarray(lon, dtype=np.float64) * COORD_SCALE).astype(np.int64)
+    epoch = np.asarray(epoch, dtype=np.int64)
+    return {
+        "lat": zlib.compress(_delta(lat_i).tobytes(), 1),
+        "lon": zlib.compress(_delta(lon_i).tobytes(), 1),
+        "epoch": zlib.compress(np.diff(epoch, prepend=epoch[0]).astype("<i4").tobytes(), 1),
+        "speed": zlib.compress(_encode_u16(speed).astype("<u2").tobytes(), 1),
+        "course": zlib.compress(_encode_u16(course).astype("<u2").tobytes(), 1),
+    }
+
+
+def decode_block(row):
+    """track_blocks 행을 배열 dict로 디코딩 (lat/lon은 1e-6도 정수)"""
+    epoch = np.cumsum(np.frombuffer(zlib.decompress(row["epoch"]), dtype="<i4"), dtype=np.int64)
+    return {
+        "lat_e6": np.cumsum(np.frombuffer(zlib.decompress(row["lat"]), dtype="<i4"), dtype=np.int64),
+        "lon_e6": np.cumsum(np.frombuffer(zlib.decompress(row["lon"]), dtype="<i4"), dtype=np.int64),
+        "epoch": epoch + row["start_time"],
+        "speed": _decode_u16(np.frombuffer(zlib.decompress(row["speed"]), dtype="<u2")),
+        "course": _decode_u16(np.frombuffer(zlib.decompress(row["course"]), dtype="<u2")),
+    }
+
+
+def _empty_arrays():
+    return {
+        "lat_e6": np.empty(0, dtype=np.int64),
+        "lon_e6": np.empty(0, dtype=np.int64),
+        "epoch": np.empty(0, dtype=np.int64),
+        "speed": np.empty(0, dtype=np.float64),
+        "course": np.empty(0, dtype=np.float64),
+    }
+
+
+def _concat(parts):
+    if not parts:
+        return _empty_arrays()
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def read_track_points(cursor, voyage_id):
+    """track_points 행을 시간순 배열 dict로 읽기"""
+    cursor.execute("""
+        SELECT timestamp, latitude, longitude, speed, course
+        FROM track_points WHERE voyage_id = ? ORDER BY timestamp
+    """, (voyage_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        return _empty_arrays()
+    timestamps, lat, lon, speed, course = zip(*rows)
+    return {
+        "lat_e6": np.rint(np.array(lat, dtype=np.float64) * COORD_SCALE).astype(np.int64),
+        "lon_e6": np.rint(np.array(lon, dtype=np.float64) * COORD_SCALE).astype(np.int64),
+        "epoch": parse_timestamps(timestamps),
+        "speed": np.array(speed, dtype=np.float64),
+        "course": np.array(course, dtype=np.float64),
+    }
+
+
+def load_track_arrays(cursor, voyage_id):
+    """항차 항적을 배열 dict로 읽기 (블록이 있으면 블록, 없으면 track_points)"""
+    cursor.execute("""
+        SELECT start_time, lat, lon, epoch, speed, course
+        FROM track_blocks WHERE voyage_id = ? ORDER BY block_no
+    """, (voyage_id,))
+    rows = cursor.fetchall()
+    if rows:
+        return _concat([decode_block(row) for row in rows])
+    return read_track_points(cursor, voyage_id)
+
+
+def write_track_blocks(cursor, voyage_id, arrays):
+    """배열 dict로 항차의 track_blocks, track_lod, 공간 색인을 교체"""
+    cursor.execute("DELETE FROM track_blocks WHERE voyage_id = ?", (voyage_id,))
+    n = len(arrays["epoch"])
+    rows = []
+    for block_no, start in enumerate(range(0, n, BLOCK_SIZE)):
+        sl = slice(start, start + BLOCK_SIZE)
+        lat = arrays["lat_e6"][sl] / COORD_SCALE
+        lon = arrays["lon_e6"][sl] / COORD_SCALE
+        epoch = arrays["epoch"][sl]
+        encoded = encode_block(lat, lon, epoch, arrays["speed"][sl], arrays["course"][sl])
+        rows.append((
+            voyage_id, block_no, int(epoch[0]), int(epoch[-1]), len(epoch),
+            float(lat.min()), float(lat.max()), float(lon.min()), float(lon.max()),
+            encoded["lat"], encoded["lon"], encoded["epoch"], encoded["speed"], encoded["course"],
+        ))
+    cursor.executemany("""
+        INSERT INTO track_blocks (voyage_id, block_no, start_time, end_time, point_count,
+            min_lat, max_lat, min_lon, max_lon, lat, lon, epoch, speed, course)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    write_track_lod(cursor, voyage_id, arrays)
+    write_spatial_index(cursor, voyage_id, arrays)
+    return n
+
+
+def rebuild_track_blocks(cursor, voyage_id):
+    """track_points로부터 항차의 블록을 다시 만든다
+
+    Returns:
+        int: 블록에 담긴 포인트 수
+    """
+    return write_track_blocks(cursor, voyage_id, read_track_points(cursor, voyage_id))
+
+
+def _project(lat_e6, lon_e6):
+    """1e-6도 정수 좌표를 항적 중심 기준 근사 평면 좌표(m)로 변환"""
+    lat = lat_e6 / COORD_SCALE
+    lon = lon_e6 / COORD_SCALE
+    scale = np.cos(np.radians(lat.mean())) if len(lat) else 1.0
+    return lon * METERS_PER_DEG_LON * scale, lat * METERS_PER_DEG_LAT
+
+
+def simplification_ranks(lat_e6, lon_e6):
+    """Douglas-Peucker 중요도 계산
+
+    각 포인트가 살아남는 최대 허용 오차(m)를 돌려준다. 분할 단계마다 열린 구간 전체를
+    한 번에 계산하므로 파이썬 반복 횟수는 포인트 수가 아니라 분할 깊이에 비례한다.
+    자식 포인트의 중요도는 부모 이하로 제한되어, 중요도 >= tolerance 인 포인트가
+    허용 오차 tolerance의 Douglas-Peucker 결과와 같고 상위 N개도 올바른 단순화가 된다.
+
+    Returns:
+        np.ndarray: float64[n], 양 끝점은 inf
+    """
+    n = len(lat_e6)
+    ranks = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return ranks
+    ranks[0] = ranks[-1] = np.inf
+    if n < 3:
+        return ranks
+
+    x, y = _project(lat_e6, lon_e6)
+    kept = np.zeros(n, dtype=bool)
+    kept[0] = kept[-1] = True
+
+    while True:
+        anchors = np.flatnonzero(kept)
+        starts, ends = anchors[:-1], anchors[1:]
+        open_ = ends - starts > 1
+        if not open_.any():
+            break
+        starts, ends = starts[open_], ends[open_]
+
+        # 열린 구간의 내부 포인트 인덱스와 소속 구간 번호
+        lengths = ends - starts - 1
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        seg = np.repeat(np.arange(len(starts)), lengths)
+        idx = np.arange(lengths.sum()) - offsets[seg] + starts[seg] + 1
+
+        # 구간 현(chord)까지의 거리 (현 길이가 0이면 시작점까지의 거리)
+        ax, ay = x[starts][seg], y[starts][seg]
+        dx, dy = x[ends][seg] - ax, y[ends][seg] - ay
+        px, py = x[idx] - ax, y[idx] - ay
+        length2 = dx * dx + dy * dy
+        t = np.clip(np.divide(px * dx + py * dy, length2, out=np.zeros_like(length2), where=length2 > 0), 0, 1)
+        dist = np.hypot(px - t * dx, py - t * dy)
+
+        # 구간별 최대 거리 포인트를 새 분할점으로
+        seg_max = np.maximum.reduceat(dist, offsets)
+        hits = np.flatnonzero(dist == seg_max[seg])
+        _, first = np.unique(seg[hits], return_index=True)
+        chosen = idx[hits[first]]
+
+        parent = np.minimum(ranks[starts], ranks[ends])
+        ranks[chosen] = np.minimum(seg_max, parent)
+        kept[chosen] = True
+
+    return ranks
+
+
+def select_points(ranks, tolerance=None, max_points=None):
+    """중요도로 남길 포인트 인덱스 선택 (시간순)"""
+    n = len(ranks)
+    keep = np.ones(n, dtype=bool)
+    if tolerance is not None:
+        keep &= ranks >= tolerance
+    if max_points is not None and keep.sum() > max_points:
+        order = np.argsort(-ranks, kind="stable")[:max(max_points, 2)]
+        limited = np.zeros(n, dtype=bool)
+        limited[order] = True
+        keep &= limited
+    return np.flatnonzero(keep)
+
+
+def take_points(arrays, indices):
+    return {key: values[indices] for key, values in arrays.items()}
+
+
+def write_track_lod(cursor, voyage_id, arrays):
+    """LOD_TOLERANCES 단계별 단순화 항적을 track_lod에 저장
+
+    원본보다 포인트가 줄지 않는 단계는 저장하지 않는다.
+    """
+    cursor.execute("DELETE FROM track_lod WHERE voyage_id = ?", (voyage_id,))
+    n = len(arrays["epoch"])
+    if n < 3:
+        return
+    ranks = simplification_ranks(arrays["lat_e6"], arrays["lon_e6"])
+    rows = []
+    for level, tolerance in enumerate(LOD_TOLERANCES):
+        indices = select_points(ranks, tolerance=tolerance)
+        if len(indices) >= n:
+            continue
+        part = take_points(arrays, indices)
+        encoded = encode_block(part["lat_e6"] / COORD_SCALE, part["lon_e6"] / COORD_SCALE,
+                               part["epoch"], part["speed"], part["course"])
+        rows.append((
+            voyage_id, level, tolerance, len(indices), int(part["epoch"][0]),
+            encoded["lat"], encoded["lon"], encoded["epoch"], encoded["speed"], encoded["course"],
+        ))
+    cursor.executemany("""
+        INSERT INTO track_lod (voyage_id, level, tolerance, point_count, start_time,
+            lat, lon, epoch, speed, course)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def load_simplified_arrays(cursor, voyage_id, tolerance=None, max_points=None):
+    """단순화된 항적 배열 dict 읽기
+
+    저장된 LOD 단계가 요청을 만족하면(같은 허용 오차, 또는 max_points 이하 중 가장 촘촘한 단계)
+    그 단계만 읽고, 아니면 전체 항적을 읽어 즉석에서 단순화한다.
+
+    Args:
+        tolerance: 허용 오차(m)
+        max_points: 최대 포인트 수
+
+    Returns:
+        tuple: (배열 dict, 원본 포인트 수, 사용한 허용 오차 또는 None)
+    """
+    cursor.execute("SELECT COALESCE(SUM(point_count), 0) FROM track_blocks WHERE voyage_id = ?", (voyage_id,))
+    total = cursor.fetchone()[0]
+
+    if total and (max_points is None or total > max_points):
+        query = "SELECT * FROM track_lod WHERE voyage_id = ?"
+        params = [voyage_id]
+        if tolerance is not None:
+            query += " AND tolerance = ?"
+            params.append(tolerance)
+        if max_points is not None:
+            query += " AND point_count <= ?"
+            params.append(max_points)
+        cursor.execute(query + " ORDER BY point_count DESC LIMIT 1", params)
+        row = cursor.fetchone()
+        if row:
+            return decode_block(row), total, row["tolerance"]
+
+    arrays = load_track_arrays(cursor, voyage_id)
+    total = len(arrays["epoch"])
+    if tolerance is None and (max_points is None or total <= max_points):
+        return arrays, total, None
+    ranks = simplification_ranks(arrays["lat_e6"], arrays["lon_e6"])
+    return take_points(arrays, select_points(ranks, tolerance, max_points)), total, tolerance
+
+
+def to_track_points(arrays):
+    """배열 dict를 get_voyage의 track_points 형식(dict 목록)으로 변환"""
+    columns = to_columnar(arrays)
+    return [
+        {"timestamp": t, "latitude": lat, "longitude": lon, "speed": sp, "course": co}
+        for t, lat, lon, sp, co in zip(columns["timestamp"], columns["latitude"], columns["longitude"],
+                                       columns["speed"], columns["course"])
+    ]
+
+
+def write_spatial_index(cursor, voyage_id, arrays):
+    """항차 항적을 SPATIAL_CHUNK 단위 (경도, 위도, 시간) 범위로 track_rtree에 등록"""
+    cursor.execute("""
+        DELETE FROM track_rtree WHERE id IN (SELECT id FROM track_chunks WHERE voyage_id = ?)
+    """, (voyage_id,))
+    cursor.execute("DELETE FROM track_chunks WHERE voyage_id = ?", (voyage_id,))
+    n = len(arrays["epoch"])
+    if not n:
+        return
+
+    offsets = np.arange(0, n, SPATIAL_CHUNK)
+    lat = arrays["lat_e6"] / COORD_SCALE
+    lon = arrays["lon_e6"] / COORD_SCALE
+    bounds = [np.minimum.reduceat(lon, offsets), np.maximum.reduceat(lon, offsets),
+              np.minimum.reduceat(lat, offsets), np.maximum.reduceat(lat, offsets),
+              np.minimum.reduceat(arrays["epoch"], offsets), np.maximum.reduceat(arrays["epoch"], offsets)]
+
+    # 쓰기 연결은 하나뿐이므로 MAX(id) 이후 번호를 직접 배정해도 겹치지 않는다
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM track_chunks")
+    first_id = cursor.fetchone()[0] + 1
+    ids = list(range(first_id, first_id + len(offsets)))
+
+    cursor.executemany("""
+        INSERT INTO track_chunks (id, voyage_id, block_no, start_index) VALUES (?, ?, ?, ?)
+    """, zip(ids, [voyage_id] * len(ids), (offsets // BLOCK_SIZE).tolist(), (offsets % BLOCK_SIZE).tolist()))
+    cursor.executemany("""
+        INSERT INTO track_rtree (id, min_lon, max_lon, min_lat, max_lat, start_time, end_time)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, zip(ids, *(b.tolist() for b in bounds)))
+
+
+def rebuild_spatial_index(cursor):
+    """track_blocks 전체로부터 공간 색인 재생성 (색인 도입 전 DB 마이그레이션용)
+
+    Returns:
+        int: 색인한 항차 수
+    """
+    cursor.execute("DELETE FROM track_rtree")
+    cursor.execute("DELETE FROM track_chunks")
+    cursor.execute("SELECT DISTINCT voyage_id FROM track_blocks")
+    voyage_ids = [row[0] for row in cursor.fetchall()]
+    for voyage_id in voyage_ids:
+        cursor.execute("""
+            SELECT start_time, lat, lon, epoch, speed, course
+            FROM track_blocks WHERE voyage_id = ? ORDER BY block_no
+        """, (voyage_id,))
+        write_spatial_index(cursor, voyage_id, _concat([decode_block(row) for row in cursor.fetchall()]))
+    return len(voyage_ids)
+
+
+def points_in_polygon(x, y, ring):
+    """ray casting 방식 점-다각형 포함 판정 (ring: [[x, y], ...], 닫힘 여부 무관)"""
+    ring = np.asarray(ring, dtype=np.float64)
+    inside = np.zeros(len(x), dtype=bool)
+    x1, y1 = ring[:, 0], ring[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for ax, ay, bx, by in zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist()):
+            crosses = (ay > y) != (by > y)
+            x_cross = (bx - ax) * (y - ay) / (by - ay) + ax
+            inside ^= crosses & (x < x_cross)
+    return inside
+
+
+def query_zone(cursor, bbox, start_epoch, end_epoch, polygon=None):
+    """구역 체류 항차 검색
+
+    R-tree로 (bbox, 기간)과 겹치는 블록만 골라 디코딩한 뒤 포인트 단위로 구역 포함을 판정한다.
+    체류 시간은 양 끝 포인트가 모두 구역·기간 안에 있는 구간의 시간 합이다.
+
+    Args:
+        bbox: (min_lon, min_lat, max_lon, max_lat)
+        start_epoch, end_epoch: 기간 (epoch 초)
+        polygon: [[lon, lat], ...] 외곽선 (없으면 bbox 자체가 구역)
+
+    Returns:
+        list[dict]: 항차별 {'voyage_id', 'points', 'seconds', 'first_seen', 'last_seen'} (epoch 초)
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    cursor.execute("""
+        SELECT DISTINCT c.voyage_id, c.block_no
+        FROM track_rtree r
+        JOIN track_chunks c ON c.id = r.id
+        WHERE r.max_lon >= ? AND r.min_lon <= ? AND r.max_lat >= ? AND r.min_lat <= ?
+          AND r.end_time >= ? AND r.start_time <= ?
+        ORDER BY c.voyage_id, c.block_no
+    """, (min_lon, max_lon, min_lat, max_lat, start_epoch, end_epoch))
+    candidates = {}
+    for voyage_id, block_no in cursor.fetchall():
+        candidates.setdefault(voyage_id, []).append(block_no)
+
+    results = []
+    for voyage_id, block_nos in candidates.items():
+        cursor.execute("""
+            SELECT block_no, start_time, lat, lon, epoch, speed, course
+            FROM track_blocks
+            WHERE voyage_id = ? AND block_no IN (SELECT value FROM json_each(?))
+            ORDER BY block_no
+        """, (voyage_id, json.dumps(block_nos)))
+        rows = cursor.fetchall()
+        parts = [decode_block(row) for row in rows]
+        block_index = np.repeat([row["block_no"] for row in rows], [len(p["epoch"]) for p in parts])
+        arrays = _concat(parts)
+
+        lon = arrays["lon_e6"] / COORD_SCALE
+        lat = arrays["lat_e6"] / COORD_SCALE
+        epoch = arrays["epoch"]
+        inside = ((lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+                  & (epoch >= start_epoch) & (epoch <= end_epoch))
+        if polygon is not None and inside.any():
+            idx = np.flatnonzero(inside)
+            inside[idx] = points_in_polygon(lon[idx], lat[idx], polygon)
+        if not inside.any():
+            continue
+
+        # 같은 블록이거나 바로 이어지는 블록 사이의 구간만 연속으로 본다
+        dt = np.diff(epoch)
+        linked = (np.diff(block_index) <= 1) & (dt > 0) & (dt <= ZONE_MAX_GAP)
+        in_zone = inside[:-1] & inside[1:] & linked
+        hits = epoch[inside]
+        results.append({
+            "voyage_id": voyage_id,
+            "points": int(inside.sum()),
+            "seconds": int(dt[in_zone].sum()),
+            "first_seen": int(hits[0]),
+            "last_seen": int(hits[-1]),
+        })
+    return results
+
+
+def pack_track_binary(arrays):
+    """배열 dict를 바이너리 응답으로 패킹
+
+    레이아웃 (리틀 엔디언):
+        header  : magic 'TRK1'(4s), count(uint32), base_epoch(int64)
+        lat_e6  : int32[count]   위도 x 1e6
+        lon_e6  : int32[count]   경도 x 1e6
+        dt      : int32[count]   base_epoch 기준 경과 초
+        speed   : uint16[count]  속력(knot) x 10, 0xFFFF = 없음
+        course  : uint16[count]  침로(도) x 10, 0xFFFF = 없음
+    """
+    count = len(arrays["epoch"])
+    base = int(arrays["epoch"][0]) if count else 0
+    return b"".join([
+        BINARY_HEADER.pack(BINARY_MAGIC, count, base),
+        arrays["lat_e6"].astype("<i4").tobytes(),
+        arrays["lon_e6"].astype("<i4").tobytes(),
+        (arrays["epoch"] - base).astype("<i4").tobytes(),
+        _encode_u16(arrays["speed"]).astype("<u2").tobytes(),
+        _encode_u16(arrays["course"]).astype("<u2").tobytes(),
+    ])
+
+
+def to_columnar(arrays):
+    """배열 dict를 JSON 직렬화 가능한 컬럼형 dict로 변환"""
+    def values(a):
+        return [None if np.isnan(v) else v for v in a.tolist()]
+
+    return {
+        "count": len(arrays["epoch"]),
+        "timestamp": format_timestamps(arrays["epoch"]),
+        "latitude": (arrays["lat_e6"] / COORD_SCALE).tolist(),
+        "longitude": (arrays["lon_e6"] / COORD_SCALE).tolist(),
+        "speed": values(arrays["speed"]),
+        "course": values(arrays["course"]),
+    }
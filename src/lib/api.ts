@@ -31,10 +31,12 @@ export interface VesselRegistry {
   fishing_hours?: number
   organization?: string
   owner_name?: string
+  deregistered_at?: string | null
   created_at?: string
   updated_at?: string
   photo_count?: number
   file_count?: number
+  primary_photo_id?: number | null
 }
 
 export interface VesselRegistryUpdate {
@@ -89,6 +91,13 @@ export interface VoyageData {
   arrival_date?: string
   fishing_area: string
   track_points: TrackPoint[]
+  track_point_total?: number  // 단순화 조회 시 원본 포인트 수
+  track_tolerance?: number | null
+  // 항적 조업 활동 분석 결과 (POST /voyages/analyze-activity)
+  fishing_hours?: number | null
+  steaming_hours?: number | null
+  port_hours?: number | null
+  fishing_polygon?: string | null  // GeoJSON Polygon
   catch_amount: number
   fish_species: string
   status: string
@@ -204,6 +213,39 @@ export interface ExpenseUpdate {
   note?: string
 }
 
+export interface SalesBatch<C, U> {
+  create?: C[]
+  update?: (U & { id: string })[]
+  delete?: string[]
+}
+
+export interface SalesChangeset {
+  auctions?: SalesBatch<AuctionCreate, AuctionUpdate>
+  private_sales?: SalesBatch<PrivateSaleCreate, PrivateSaleUpdate>
+  expenses?: SalesBatch<ExpenseCreate, ExpenseUpdate>
+}
+
+export interface SalesBatchItemResult {
+  kind: 'auction' | 'private_sale' | 'expense'
+  op: 'create' | 'update' | 'delete'
+  index: number
+  id: string | null
+  status: 'ok' | 'error'
+  detail: string | null
+}
+
+export interface SalesBatchResponse {
+  message?: string
+  detail?: string
+  data: {
+    results: SalesBatchItemResult[]
+    created: number
+    updated: number
+    deleted: number
+    failed: number
+  }
+}
+
 export interface ModificationHistory {
   id: number
   record_type: string
@@ -212,6 +254,35 @@ export interface ModificationHistory {
   old_value?: string
   new_value?: string
   modified_at: string
+  voyage_id?: string | null
+  change_set_id?: string | null
+}
+
+export interface HistoryQuery {
+  record_ids?: string[]
+  record_type?: 'auction' | 'private_sale' | 'expense'
+  voyage_id?: string
+  mmsi?: string
+  change_set_id?: string
+  start_date?: string
+  end_date?: string
+  limit?: number
+}
+
+export interface StatisticsBreakdownRow {
+  year?: string | null
+  month?: string | null
+  voyage_count: number
+  active_voyages: number
+  catch_amount: number
+  auction_revenue: number
+  auction_count: number
+  private_revenue: number
+  private_count: number
+  expense_amount: number
+  expense_count: number
+  total_revenue: number
+  profit: number
 }
 
 export interface Statistics {
@@ -220,6 +291,100 @@ export interface Statistics {
   active_voyages: number
   total_catch_amount: number
   total_auction_amount: number
+  total_private_amount: number
+  total_expense_amount: number
+  as_of: string
+  by_year?: StatisticsBreakdownRow[]
+  by_month?: StatisticsBreakdownRow[]
+}
+
+export interface SettlementRow {
+  voyage_id?: string
+  mmsi?: string
+  fish_species?: string
+  auction_port?: string
+  month?: string
+  auction_revenue: number
+  auction_quantity: number
+  auction_count: number
+  private_revenue?: number
+  private_quantity?: number
+  private_count?: number
+  expense_amount?: number
+  expense_count?: number
+  total_revenue: number
+  profit?: number
+}
+
+export type SettlementLevel = 'voyage' | 'vessel_month' | 'species' | 'port' | 'month'
+
+export interface SettlementFilter {
+  voyage_id?: string
+  mmsi?: string
+  fish_species?: string
+  auction_port?: string
+  start_month?: string
+  end_month?: string
+}
+
+export type LedgerKind = 'auction' | 'private_sale' | 'expense'
+
+export interface LedgerRow {
+  kind: LedgerKind
+  id: string
+  voyage_id: string
+  mmsi?: string
+  vessel_name?: string
+  entry_date: string
+  fish_species?: string | null
+  auction_port?: string | null
+  category?: string | null
+  description?: string | null
+  quantity?: number | null
+  unit_price?: number | null
+  amount: number
+  signed_amount: number
+  buyer?: string | null
+  note?: string | null
+  created_at?: string
+  updated_at?: string | null
+  running_amount: number
+  running_balance: number
+}
+
+export interface LedgerSummary {
+  kinds: Partial<Record<LedgerKind, { count: number; quantity: number; amount: number }>>
+  count: number
+  revenue: number
+  expense: number
+  balance: number
+}
+
+export interface LedgerQuery {
+  kinds?: LedgerKind[]
+  start_date?: string
+  end_date?: string
+  fish_species?: string
+  auction_port?: string
+  category?: string
+  vessel_name?: string
+  mmsi?: string
+  group_name?: string
+  organization?: string
+  business_type?: string
+  sort?: 'date' | 'amount'
+  order?: 'asc' | 'desc'
+  page_size?: number
+  cursor?: string
+  with_totals?: boolean
+}
+
+export interface LedgerResponse {
+  data: LedgerRow[]
+  page_size: number
+  has_more: boolean
+  next_cursor: string | null
+  summary: LedgerSummary | null
 }
 
 // ==================== API 호출 함수 ====================
@@ -255,11 +420,53 @@ export async function getVoyages(params?: {
   return res.json()
 }
 
-export async function getVoyage(voyageId: string): Promise<{ data: VoyageData }> {
-  const res = await fetch(`${API_BASE_URL}/voyages/${voyageId}`)
+// tolerance(m) 또는 maxPoints를 주면 단순화된 항적(LOD)을 받는다
+export interface TrackSimplifyOptions {
+  tolerance?: number
+  maxPoints?: number
+}
+
+function trackSimplifyQuery(options?: TrackSimplifyOptions): URLSearchParams {
+  const params = new URLSearchParams()
+  if (options?.tolerance) params.append('tolerance', String(options.tolerance))
+  if (options?.maxPoints) params.append('max_points', String(options.maxPoints))
+  return params
+}
+
+export async function getVoyage(voyageId: string, options?: TrackSimplifyOptions): Promise<{ data: VoyageData }> {
+  const query = trackSimplifyQuery(options).toString()
+  const res = await fetch(`${API_BASE_URL}/voyages/${voyageId}${query ? `?${query}` : ''}`)
   return res.json()
 }
 
+// 바이너리 항적 (backend/track_store.py pack_track_binary 레이아웃)
+export interface VoyageTrackArrays {
+  count: number
+  baseEpoch: number
+  latE6: Int32Array
+  lonE6: Int32Array
+  dt: Int32Array
+  speedX10: Uint16Array
+  courseX10: Uint16Array
+}
+
+export async function getVoyageTrack(voyageId: string, options?: TrackSimplifyOptions): Promise<VoyageTrackArrays> {
+  const params = trackSimplifyQuery(options)
+  params.append('format', 'binary')
+  const res = await fetch(`${API_BASE_URL}/voyages/${voyageId}/track?${params}`)
+  const buffer = await res.arrayBuffer()
+  const view = new DataView(buffer)
+  const count = view.getUint32(4, true)
+  const baseEpoch = Number(view.getBigInt64(8, true))
+  let offset = 16
+  const latE6 = new Int32Array(buffer, offset, count); offset += count * 4
+  const lonE6 = new Int32Array(buffer, offset, count); offset += count * 4
+  const dt = new Int32Array(buffer, offset, count); offset += count * 4
+  const speedX10 = new Uint16Array(buffer, offset, count); offset += count * 2
+  const courseX10 = new Uint16Array(buffer, offset, count)
+  return { count, baseEpoch, latE6, lonE6, dt, speedX10, courseX10 }
+}
+
 export async function updateVoyage(voyageId: string, update: VoyageUpdate): Promise<{ message: string; data: VoyageData }> {
   const res = await fetch(`${API_BASE_URL}/voyages/${voyageId}`, {
     method: 'PUT',
@@ -269,6 +476,41 @@ export async function updateVoyage(voyageId: string, update: VoyageUpdate): Prom
   return res.json()
 }
 
+// 구역 체류 검색 (bbox: [최소 경도, 최소 위도, 최대 경도, 최대 위도], polygon: [[경도, 위도], ...])
+export interface ZoneQuery {
+  bbox?: [number, number, number, number]
+  polygon?: [number, number][]
+  start: string
+  end: string
+}
+
+export interface ZoneVoyageHit {
+  voyage_id: string
+  hours: number
+  points: number
+  first_seen: string
+  last_seen: string
+}
+
+export interface ZoneVesselHit {
+  mmsi: string
+  vessel_name: string
+  hours: number
+  points: number
+  first_seen: string
+  last_seen: string
+  voyages: ZoneVoyageHit[]
+}
+
+export async function queryTrackZone(query: ZoneQuery): Promise<{ data: ZoneVesselHit[]; total: number }> {
+  const res = await fetch(`${API_BASE_URL}/tracks/zone-query`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(query)
+  })
+  return res.json()
+}
+
 // ---------- 위판 API ----------
 
 export async function getAuctions(voyageId?: string): Promise<{ data: AuctionData[]; total: number }> {
@@ -293,6 +535,32 @@ export async function deleteAuction(auctionId: string): Promise<{ message: strin
   return res.json()
 }
 
+// 위판/사매/경비 일괄 처리 (atomic=false면 오류 항목만 건너뜀)
+async function postSalesBatch(path: string, body: unknown, atomic: boolean): Promise<SalesBatchResponse> {
+  const res = await fetch(`${API_BASE_URL}/${path}?atomic=${atomic}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  })
+  return res.json()
+}
+
+export function batchAuctions(batch: SalesBatch<AuctionCreate, AuctionUpdate>, atomic = true) {
+  return postSalesBatch('auctions/batch', batch, atomic)
+}
+
+export function batchPrivateSales(batch: SalesBatch<PrivateSaleCreate, PrivateSaleUpdate>, atomic = true) {
+  return postSalesBatch('private-sales/batch', batch, atomic)
+}
+
+export function batchExpenses(batch: SalesBatch<ExpenseCreate, ExpenseUpdate>, atomic = true) {
+  return postSalesBatch('expenses/batch', batch, atomic)
+}
+
+export function applySalesChangeset(changeset: SalesChangeset, atomic = true) {
+  return postSalesBatch('sales/changeset', changeset, atomic)
+}
+
 export async function updateAuction(auctionId: string, update: AuctionUpdate): Promise<{ message: string; data: AuctionData }> {
   const res = await fetch(`${API_BASE_URL}/auctions/${auctionId}`, {
     method: 'PUT',
@@ -307,6 +575,18 @@ export async function getAuctionHistory(auctionId: string): Promise<{ data: Modi
   return res.json()
 }
 
+// 여러 레코드/항차/기간의 수정이력을 한 번에 조회
+export async function queryModificationHistory(
+  query: HistoryQuery
+): Promise<{ data: ModificationHistory[]; total: number; has_more: boolean }> {
+  const res = await fetch(`${API_BASE_URL}/history/query`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(query)
+  })
+  return res.json()
+}
+
 // ---------- 사매 API ----------
 
 export async function getPrivateSales(voyageId?: string): Promise<{ data: PrivateSaleData[]; total: number }> {
@@ -385,8 +665,95 @@ export async function getExpenseHistory(expenseId: string): Promise<{ data: Modi
 
 // ---------- 통계 API ----------
 
-export async function getStatistics(): Promise<Statistics> {
-  const res = await fetch(`${API_BASE_URL}/statistics`)
+export async function getStatistics(
+  options: { breakdown?: 'year' | 'month'; year?: string; fresh?: boolean } = {}
+): Promise<Statistics> {
+  const params = new URLSearchParams()
+  if (options.breakdown) params.append('breakdown', options.breakdown)
+  if (options.year) params.append('year', options.year)
+  if (options.fresh) params.append('fresh', 'true')
+  const res = await fetch(`${API_BASE_URL}/statistics?${params}`)
+  return res.json()
+}
+
+// ---------- 통합 원장 API ----------
+
+export async function getLedger(query: LedgerQuery = {}): Promise<LedgerResponse> {
+  const params = new URLSearchParams()
+  Object.entries(query).forEach(([key, value]) => {
+    if (value === undefined || value === '') return
+    params.append(key, Array.isArray(value) ? value.join(',') : String(value))
+  })
+  const res = await fetch(`${API_BASE_URL}/ledger?${params}`)
+  return res.json()
+}
+
+// ---------- 정산 API ----------
+
+export async function getSettlement(
+  level: SettlementLevel = 'voyage',
+  filter: SettlementFilter = {}
+): Promise<{ data: SettlementRow[]; total: number; summary: SettlementRow }> {
+  const params = new URLSearchParams({ level })
+  Object.entries(filter).forEach(([key, value]) => {
+    if (value) params.append(key, value)
+  })
+  const res = await fetch(`${API_BASE_URL}/settlement?${params}`)
+  return res.json()
+}
+
+export async function getVoyageSettlement(voyageId: string): Promise<{ data: SettlementRow }> {
+  const res = await fetch(`${API_BASE_URL}/voyages/${voyageId}/settlement`)
+  return res.json()
+}
+
+// ---------- 판매 분석 API ----------
+
+export type AnalyticsDimension = 'species' | 'port' | 'vessel' | 'group'
+export type AnalyticsBucket = 'day' | 'week' | 'month' | 'year' | 'all'
+
+export interface SalesAnalyticsQuery {
+  group_by?: AnalyticsDimension[]
+  bucket?: AnalyticsBucket
+  kinds?: ('auction' | 'private_sale')[]
+  start?: string
+  end?: string
+  fish_species?: string
+  auction_port?: string
+  mmsi?: string
+  group_name?: string
+  percentiles?: number[]
+  source?: 'cube' | 'raw'
+}
+
+export interface SalesAnalyticsRow {
+  bucket: string | null
+  fish_species?: string
+  auction_port?: string
+  mmsi?: string
+  group_name?: string | null
+  quantity: number
+  revenue: number
+  count: number
+  avg_unit_price: number | null
+  percentiles: Record<string, number | null>
+}
+
+export interface SalesAnalyticsResponse {
+  data: SalesAnalyticsRow[]
+  truncated: boolean
+  source: 'cube' | 'raw'
+  group_by: AnalyticsDimension[]
+  bucket: AnalyticsBucket
+}
+
+export async function getSalesAnalytics(query: SalesAnalyticsQuery = {}): Promise<SalesAnalyticsResponse> {
+  const params = new URLSearchParams()
+  Object.entries(query).forEach(([key, value]) => {
+    if (value === undefined || value === '') return
+    params.append(key, Array.isArray(value) ? value.join(',') : String(value))
+  })
+  const res = await fetch(`${API_BASE_URL}/analytics/sales?${params}`)
   return res.json()
 }
 
@@ -394,10 +761,12 @@ export async function getStatistics(): Promise<Statistics> {
 
 export interface VesselRegistryListResponse {
   data: VesselRegistry[]
-  total: number
+  total: number | null
   page: number
   page_size: number
-  total_pages: number
+  total_pages: number | null
+  has_more: boolean
+  next_cursor: string | null
 }
 
 export async function getVesselRegistry(params?: {
@@ -408,6 +777,10 @@ export async function getVesselRegistry(params?: {
   organization?: string
   page?: number
   page_size?: number
+  cursor?: string
+  sort?: 'id' | 'vessel_name'
+  order?: 'asc' | 'desc'
+  with_total?: boolean
 }): Promise<VesselRegistryListResponse> {
   const searchParams = new URLSearchParams()
   if (params?.search) searchParams.set('search', params.search)
@@ -417,6 +790,10 @@ export async function getVesselRegistry(params?: {
   if (params?.organization) searchParams.set('organization', params.organization)
   if (params?.page) searchParams.set('page', String(params.page))
   if (params?.page_size) searchParams.set('page_size', String(params.page_size))
+  if (params?.cursor) searchParams.set('cursor', params.cursor)
+  if (params?.sort) searchParams.set('sort', params.sort)
+  if (params?.order) searchParams.set('order', params.order)
+  if (params?.with_total === false) searchParams.set('with_total', 'false')
   const query = searchParams.toString()
   const res = await fetch(`${API_BASE_URL}/vessel-registry${query ? `?${query}` : ''}`)
   return res.json()
@@ -439,6 +816,32 @@ export async function updateVesselRegistry(
   return res.json()
 }
 
+export interface VesselRegistryFacets {
+  total: number
+  ports: { port: string; count: number }[]
+  business_types: { business_type: string; count: number }[]
+  groups: { group_name: string; count: number }[]
+  organizations: { organization: string; count: number }[]
+}
+
+export async function getVesselRegistryFacets(params?: {
+  search?: string
+  port?: string
+  business_type?: string
+  group_name?: string
+  organization?: string
+}): Promise<{ data: VesselRegistryFacets }> {
+  const searchParams = new URLSearchParams()
+  if (params?.search) searchParams.set('search', params.search)
+  if (params?.port) searchParams.set('port', params.port)
+  if (params?.business_type) searchParams.set('business_type', params.business_type)
+  if (params?.group_name) searchParams.set('group_name', params.group_name)
+  if (params?.organization) searchParams.set('organization', params.organization)
+  const query = searchParams.toString()
+  const res = await fetch(`${API_BASE_URL}/vessel-registry/facets${query ? `?${query}` : ''}`)
+  return res.json()
+}
+
 export async function getPorts(): Promise<{ data: { port: string; count: number }[] }> {
   const res = await fetch(`${API_BASE_URL}/vessel-registry/ports/list`)
   return res.json()
@@ -454,6 +857,24 @@ export async function getGroups(): Promise<{ data: { group_name: string; count:
   return res.json()
 }
 
+export async function addVesselsToGroup(vesselIds: number[], groupName: string): Promise<{ message: string; count: number }> {
+  const res = await fetch(`${API_BASE_URL}/vessel-registry/groups/add`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ vessel_ids: vesselIds, group_name: groupName })
+  })
+  return res.json()
+}
+
+export async function removeVesselsFromGroup(vesselIds: number[], groupName: string): Promise<{ message: string; count: number }> {
+  const res = await fetch(`${API_BASE_URL}/vessel-registry/groups/remove`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ vessel_ids: vesselIds, group_name: groupName })
+  })
+  return res.json()
+}
+
 export async function getOrganizations(): Promise<{ data: { organization: string; count: number }[] }> {
   const res = await fetch(`${API_BASE_URL}/vessel-registry/organizations/list`)
   return res.json()
@@ -464,17 +885,77 @@ export async function getVesselRegistryStatus(): Promise<{ count: number; has_da
   return res.json()
 }
 
-export async function uploadVesselCSV(file: File, force: boolean = false): Promise<{ success: boolean; message: string; count: number }> {
+export interface VesselCSVImportResult {
+  success: boolean
+  message: string
+  count: number
+  inserted?: number
+  updated?: number
+  unchanged?: number
+  deregistered?: number
+  rejected?: number
+  elapsed?: number
+  rows_per_sec?: number
+}
+
+export interface VesselCSVImportJob {
+  job_id: string
+  filename: string
+  mode: 'full' | 'incremental'
+  status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled'
+  parsed: number
+  inserted: number
+  rejected: number
+  result: VesselCSVImportResult | null
+  error: string | null
+  created_at: string
+  started_at: string | null
+  finished_at: string | null
+}
+
+export interface VesselCSVImportError {
+  row: number
+  reason: string
+  vessel_name: string | null
+  registration_no: string | null
+}
+
+export async function uploadVesselCSV(
+  file: File,
+  force: boolean = false,
+  options?: { incremental?: boolean; flag_missing?: boolean }
+): Promise<{ message: string; job_id: string; data: VesselCSVImportJob }> {
   const formData = new FormData()
   formData.append('file', file)
 
-  const res = await fetch(`${API_BASE_URL}/vessel-registry/upload-csv?force=${force}`, {
+  const searchParams = new URLSearchParams({ force: String(force) })
+  if (options?.incremental) searchParams.set('incremental', 'true')
+  if (options?.flag_missing) searchParams.set('flag_missing', 'true')
+
+  const res = await fetch(`${API_BASE_URL}/vessel-registry/upload-csv?${searchParams}`, {
     method: 'POST',
     body: formData
   })
   return res.json()
 }
 
+export async function getImportJob(jobId: string): Promise<{ data: VesselCSVImportJob }> {
+  const res = await fetch(`${API_BASE_URL}/vessel-registry/import-jobs/${jobId}`)
+  return res.json()
+}
+
+export async function getImportJobErrors(jobId: string): Promise<{ data: VesselCSVImportError[]; total: number; rejected: number }> {
+  const res = await fetch(`${API_BASE_URL}/vessel-registry/import-jobs/${jobId}/errors`)
+  return res.json()
+}
+
+export async function cancelImportJob(jobId: string): Promise<{ message: string; data: VesselCSVImportJob }> {
+  const res = await fetch(`${API_BASE_URL}/vessel-registry/import-jobs/${jobId}/cancel`, {
+    method: 'POST'
+  })
+  return res.json()
+}
+
 // ---------- 어선 메모 API ----------
 
 export interface VesselMemo {
@@ -634,9 +1115,10 @@ export async function getTrackMonths(mmsi: string, year: number): Promise<{ mont
   return res.json()
 }
 
+// format=raw: 압축 전송 + ETag 재검증이라 같은 파일을 다시 열면 304로 브라우저 캐시를 쓴다
 export async function getTrackHtml(mmsi: string, filename: string): Promise<{ html: string; filename: string }> {
-  const res = await fetch(`${API_BASE_URL}/tracks/html/${mmsi}/${filename}`)
-  return res.json()
+  const res = await fetch(`${API_BASE_URL}/tracks/html/${mmsi}/${encodeURIComponent(filename)}?format=raw`)
+  return { html: await res.text(), filename }
 }
 
 export async function getOrCreateMonthlyVoyage(
@@ -73,98 +73,82 @@ import {
   updateAuction,
   updatePrivateSale,
   updateExpense,
+  getLedger,
+  type LedgerKind,
+  type LedgerQuery,
+  type LedgerRow,
 } from '@/lib/api'
 
-// API 기본 URL
-const API_BASE_URL = '/api'
+// 한 번에 불러오는 원장 행 수
+const LEDGER_PAGE_SIZE = 100
 
-// 전체 위판 목록 조회
-async function getAllAuctions(params?: {
-  start_date?: string
-  end_date?: string
-  fish_species?: string
-  vessel_name?: string
-  mmsi?: string
-}): Promise<{ data: (AuctionData & { vessel_name?: string; mmsi?: string })[] }> {
-  const searchParams = new URLSearchParams()
-  if (params?.start_date) searchParams.set('start_date', params.start_date)
-  if (params?.end_date) searchParams.set('end_date', params.end_date)
-  if (params?.fish_species) searchParams.set('fish_species', params.fish_species)
-  if (params?.vessel_name) searchParams.set('vessel_name', params.vessel_name)
-  if (params?.mmsi) searchParams.set('mmsi', params.mmsi)
-  const query = searchParams.toString()
-  const res = await fetch(`${API_BASE_URL}/auctions/all${query ? `?${query}` : ''}`)
-  return res.json()
-}
+type AuctionRow = AuctionData & { vessel_name?: string; mmsi?: string }
+type PrivateSaleRow = PrivateSaleData & { vessel_name?: string; mmsi?: string }
+type ExpenseRow = ExpenseData & { vessel_name?: string; mmsi?: string }
 
-// 전체 사매 목록 조회
-async function getAllPrivateSales(params?: {
-  start_date?: string
-  end_date?: string
-  fish_species?: string
-  vessel_name?: string
-  mmsi?: string
-}): Promise<{ data: (PrivateSaleData & { vessel_name?: string; mmsi?: string })[] }> {
-  const searchParams = new URLSearchParams()
-  if (params?.start_date) searchParams.set('start_date', params.start_date)
-  if (params?.end_date) searchParams.set('end_date', params.end_date)
-  if (params?.fish_species) searchParams.set('fish_species', params.fish_species)
-  if (params?.vessel_name) searchParams.set('vessel_name', params.vessel_name)
-  if (params?.mmsi) searchParams.set('mmsi', params.mmsi)
-  const query = searchParams.toString()
-  const res = await fetch(`${API_BASE_URL}/private-sales/all${query ? `?${query}` : ''}`)
-  return res.json()
-}
+// 통합 원장 행 -> 탭별 행 형식
+const toAuctionRow = (r: LedgerRow): AuctionRow => ({
+  id: r.id,
+  voyage_id: r.voyage_id,
+  auction_date: r.entry_date,
+  auction_port: r.auction_port ?? '',
+  fish_species: r.fish_species ?? '',
+  quantity: r.quantity ?? 0,
+  unit_price: r.unit_price ?? 0,
+  total_price: r.amount,
+  buyer: r.buyer ?? undefined,
+  note: r.note ?? undefined,
+  created_at: r.created_at,
+  updated_at: r.updated_at ?? undefined,
+  vessel_name: r.vessel_name,
+  mmsi: r.mmsi,
+})
 
-// 전체 경비 목록 조회
-async function getAllExpenses(params?: {
-  start_date?: string
-  end_date?: string
-  category?: string
-  vessel_name?: string
-  mmsi?: string
-}): Promise<{ data: (ExpenseData & { vessel_name?: string; mmsi?: string })[] }> {
-  const searchParams = new URLSearchParams()
-  if (params?.start_date) searchParams.set('start_date', params.start_date)
-  if (params?.end_date) searchParams.set('end_date', params.end_date)
-  if (params?.category) searchParams.set('category', params.category)
-  if (params?.vessel_name) searchParams.set('vessel_name', params.vessel_name)
-  if (params?.mmsi) searchParams.set('mmsi', params.mmsi)
-  const query = searchParams.toString()
-  const res = await fetch(`${API_BASE_URL}/expenses/all${query ? `?${query}` : ''}`)
-  return res.json()
-}
+const toPrivateSaleRow = (r: LedgerRow): PrivateSaleRow => ({
+  id: r.id,
+  voyage_id: r.voyage_id,
+  sale_date: r.entry_date,
+  fish_species: r.fish_species ?? '',
+  quantity: r.quantity ?? 0,
+  unit_price: r.unit_price ?? 0,
+  total_price: r.amount,
+  buyer: r.buyer ?? undefined,
+  note: r.note ?? undefined,
+  created_at: r.created_at,
+  updated_at: r.updated_at ?? undefined,
+  vessel_name: r.vessel_name,
+  mmsi: r.mmsi,
+})
 
-// 어선 목록 조회 (필터 적용)
-async function getFilteredVessels(params: {
-  search?: string
-  group_name?: string
-  organization?: string
-  business_type?: string
-}): Promise<{ data: { mmsi: string; vessel_name: string }[] }> {
-  const searchParams = new URLSearchParams()
-  if (params.search) searchParams.set('search', params.search)
-  if (params.group_name && params.group_name !== 'all') searchParams.set('group_name', params.group_name)
-  if (params.organization && params.organization !== 'all') searchParams.set('organization', params.organization)
-  if (params.business_type && params.business_type !== 'all') searchParams.set('business_type', params.business_type)
-  searchParams.set('page_size', '1000')
-  const query = searchParams.toString()
-  const res = await fetch(`${API_BASE_URL}/vessel-registry?${query}`)
-  const result = await res.json()
-  return {
-    data: result.data
-      .filter((v: { mmsi?: string }) => v.mmsi)
-      .map((v: { mmsi: string; vessel_name: string }) => ({
-        mmsi: v.mmsi,
-        vessel_name: v.vessel_name,
-      })),
-  }
-}
+const toExpenseRow = (r: LedgerRow): ExpenseRow => ({
+  id: r.id,
+  voyage_id: r.voyage_id,
+  expense_date: r.entry_date,
+  category: r.category ?? '',
+  description: r.description ?? undefined,
+  amount: r.amount,
+  note: r.note ?? undefined,
+  created_at: r.created_at,
+  updated_at: r.updated_at ?? undefined,
+  vessel_name: r.vessel_name,
+  mmsi: r.mmsi,
+})
+
+type LedgerTotals = { count: number; quantity: number; amount: number }
+const emptyTotals: LedgerTotals = { count: 0, quantity: 0, amount: 0 }
 
 export default function AuctionList() {
-  const [auctions, setAuctions] = useState<(AuctionData & { vessel_name?: string })[]>([])
-  const [privateSales, setPrivateSales] = useState<(PrivateSaleData & { vessel_name?: string })[]>([])
-  const [expenses, setExpenses] = useState<(ExpenseData & { vessel_name?: string })[]>([])
+  const [auctions, setAuctions] = useState<AuctionRow[]>([])
+  const [privateSales, setPrivateSales] = useState<PrivateSaleRow[]>([])
+  const [expenses, setExpenses] = useState<ExpenseRow[]>([])
+  // 종류별 다음 페이지 커서와 전체 합계 (서버 집계)
+  const [cursors, setCursors] = useState<Record<LedgerKind, string | null>>({
+    auction: null, private_sale: null, expense: null,
+  })
+  const [totals, setTotals] = useState<Record<LedgerKind, LedgerTotals>>({
+    auction: emptyTotals, private_sale: emptyTotals, expense: emptyTotals,
+  })
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(false)
   const [activeTab, setActiveTab] = useState('auction')
 
@@ -222,77 +206,92 @@ export default function AuctionList() {
     )
   }, [])
 
+  // 현재 필터 조건 (그룹/소속/업종은 서버에서 전국어선정보 MMSI로 거름)
+  const ledgerFilter = (kind: LedgerKind): LedgerQuery => ({
+    kinds: [kind],
+    vessel_name: searchKeyword || undefined,
+    group_name: selectedGroup,
+    organization: selectedOrganization,
+    business_type: selectedBusinessType,
+    category: kind === 'expense' ? categoryFilter || undefined : undefined,
+  })
+
+  const setLedgerRows = (kind: LedgerKind, rows: LedgerRow[], append: boolean) => {
+    if (kind === 'auction') {
+      const mapped = rows.map(toAuctionRow)
+      setAuctions((prev) => (append ? [...prev, ...mapped] : mapped))
+    } else if (kind === 'private_sale') {
+      const mapped = rows.map(toPrivateSaleRow)
+      setPrivateSales((prev) => (append ? [...prev, ...mapped] : mapped))
+    } else {
+      const mapped = rows.map(toExpenseRow)
+      setExpenses((prev) => (append ? [...prev, ...mapped] : mapped))
+    }
+  }
+
   const loadData = async () => {
     setLoading(true)
     try {
-      const hasGroupFilter = selectedGroup !== 'all' || selectedOrganization !== 'all' || selectedBusinessType !== 'all'
-
-      // 그룹/소속/업종 필터가 있는 경우에만 vessel-registry에서 MMSI 목록 조회
-      let mmsiList: string[] = []
-      if (hasGroupFilter) {
-        const vesselsRes = await getFilteredVessels({
-          search: searchKeyword || undefined,
-          group_name: selectedGroup,
-          organization: selectedOrganization,
-          business_type: selectedBusinessType,
-        })
-        mmsiList = vesselsRes.data.map((v) => v.mmsi)
-      }
-
-      // 위판/사매/경비 데이터 조회 - vessel_name 파라미터 직접 전달
-      const params = {
-        vessel_name: searchKeyword || undefined,
-      }
-
-      const [auctionsRes, privateSalesRes, expensesRes] = await Promise.all([
-        getAllAuctions(params),
-        getAllPrivateSales(params),
-        getAllExpenses({
-          ...params,
-          category: categoryFilter || undefined,
-        }),
-      ])
-
-      let filteredAuctions = auctionsRes.data || []
-      let filteredPrivateSales = privateSalesRes.data || []
-      let filteredExpenses = expensesRes.data || []
+      // 위판/사매/경비 첫 페이지와 전체 합계만 조회
+      const kinds: LedgerKind[] = ['auction', 'private_sale', 'expense']
+      const results = await Promise.all(
+        kinds.map((kind) => getLedger({ ...ledgerFilter(kind), page_size: LEDGER_PAGE_SIZE }))
+      )
 
-      // 그룹/소속/업종 필터가 있는 경우 MMSI로 추가 필터링
-      if (hasGroupFilter) {
-        if (mmsiList.length > 0) {
-          filteredAuctions = filteredAuctions.filter((a) => {
-            const voyageMmsi = a.voyage_id.split('-')[0]
-            return mmsiList.includes(voyageMmsi)
-          })
-          filteredPrivateSales = filteredPrivateSales.filter((s) => {
-            const voyageMmsi = s.voyage_id.split('-')[0]
-            return mmsiList.includes(voyageMmsi)
-          })
-          filteredExpenses = filteredExpenses.filter((e) => {
-            const voyageMmsi = e.voyage_id.split('-')[0]
-            return mmsiList.includes(voyageMmsi)
-          })
-        } else {
-          // 그룹/소속/업종 필터 조건에 맞는 어선이 없음
-          filteredAuctions = []
-          filteredPrivateSales = []
-          filteredExpenses = []
-        }
-      }
-
-      setAuctions(filteredAuctions)
-      setPrivateSales(filteredPrivateSales)
-      setExpenses(filteredExpenses)
+      const nextCursors = { auction: null, private_sale: null, expense: null } as Record<LedgerKind, string | null>
+      const nextTotals = { auction: emptyTotals, private_sale: emptyTotals, expense: emptyTotals }
+      kinds.forEach((kind, i) => {
+        setLedgerRows(kind, results[i].data || [], false)
+        nextCursors[kind] = results[i].next_cursor
+        nextTotals[kind] = results[i].summary?.kinds[kind] ?? emptyTotals
+      })
+      setCursors(nextCursors)
+      setTotals(nextTotals)
     } catch (error) {
       console.error('데이터 로드 실패:', error)
       setAuctions([])
       setPrivateSales([])
       setExpenses([])
+      setCursors({ auction: null, private_sale: null, expense: null })
+      setTotals({ auction: emptyTotals, private_sale: emptyTotals, expense: emptyTotals })
     } finally {
       setLoading(false)
     }
   }
 
+  // 다음 페이지 이어서 조회
+  const loadMore = async (kind: LedgerKind) => {
+    const cursor = cursors[kind]
+    if (!cursor) return
+    setLoadingMore(true)
+    try {
+      const res = await getLedger({
+        ...ledgerFilter(kind),
+        page_size: LEDGER_PAGE_SIZE,
+        cursor,
+        with_totals: false,
+      })
+      setLedgerRows(kind, res.data || [], true)
+      setCursors((prev) => ({ ...prev, [kind]: res.next_cursor }))
+    } catch (error) {
+      console.error('데이터 로드 실패:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  const loadMoreButton = (kind: LedgerKind, loaded: number) =>
+    cursors[kind] && (
+      <div className="mt-3 flex items-center justify-center gap-3">
+        <span className="text-xs text-muted-foreground">
+          {loaded.toLocaleString()} / {totals[kind].count.toLocaleString()}건 표시
+        </span>
+        <Button variant="outline" size="sm" onClick={() => loadMore(kind)} disabled={loadingMore}>
+          더 보기
+        </Button>
+      </div>
+    )
+
   // 초기 데이터 로드
   useEffect(() => {
     loadData()
@@ -492,20 +491,30 @@ export default function AuctionList() {
   }
 
   // 통계 계산
-  const totalAuctionQuantity = auctions.reduce((sum, a) => sum + a.quantity, 0)
-  const totalAuctionAmount = auctions.reduce((sum, a) => sum + a.total_price, 0)
-  const totalPrivateSalesQuantity = privateSales.reduce((sum, s) => sum + s.quantity, 0)
-  const totalPrivateSalesAmount = privateSales.reduce((sum, s) => sum + s.total_price, 0)
-  const totalExpenseAmount = expenses.reduce((sum, e) => sum + e.amount, 0)
+  const totalAuctionQuantity = totals.auction.quantity
+  const totalAuctionAmount = totals.auction.amount
+  const totalPrivateSalesQuantity = totals.private_sale.quantity
+  const totalPrivateSalesAmount = totals.private_sale.amount
+  const totalExpenseAmount = totals.expense.amount
 
   // CSV 내보내기
-  const exportToCSV = () => {
+  const exportToCSV = async () => {
     let headers: string[] = []
     let rows: (string | number)[][] = []
 
+    // 화면에 불러온 페이지가 아니라 조건에 맞는 전체 행을 내보냄
+    const kind: LedgerKind = activeTab === 'auction' ? 'auction' : activeTab === 'private-sale' ? 'private_sale' : 'expense'
+    const ledgerRows: LedgerRow[] = []
+    let cursor: string | null = null
+    do {
+      const res = await getLedger({ ...ledgerFilter(kind), page_size: 1000, cursor: cursor ?? undefined, with_totals: false })
+      ledgerRows.push(...(res.data || []))
+      cursor = res.next_cursor
+    } while (cursor)
+
     if (activeTab === 'auction') {
       headers = ['위판일시', '선박명', '위판장', '어종', '수량(kg)', '단가', '금액', '구매자', '비고']
-      rows = auctions.map((a) => [
+      rows = ledgerRows.map(toAuctionRow).map((a) => [
         a.auction_date,
         a.vessel_name || '-',
         a.auction_port,
@@ -518,7 +527,7 @@ export default function AuctionList() {
       ])
     } else if (activeTab === 'private-sale') {
       headers = ['판매일시', '선박명', '어종', '수량(kg)', '단가', '금액', '구매자', '비고']
-      rows = privateSales.map((s) => [
+      rows = ledgerRows.map(toPrivateSaleRow).map((s) => [
         s.sale_date,
         s.vessel_name || '-',
         s.fish_species,
@@ -530,7 +539,7 @@ export default function AuctionList() {
       ])
     } else {
       headers = ['지출일시', '선박명', '카테고리', '내용', '금액', '비고']
-      rows = expenses.map((e) => [
+      rows = ledgerRows.map(toExpenseRow).map((e) => [
         e.expense_date,
         e.vessel_name || '-',
         e.category,
@@ -696,15 +705,15 @@ export default function AuctionList() {
             <TabsList className="grid w-full grid-cols-3 mb-4">
               <TabsTrigger value="auction" className="gap-2">
                 <Receipt className="h-4 w-4" />
-                위판 내역 ({auctions.length})
+                위판 내역 ({totals.auction.count})
               </TabsTrigger>
               <TabsTrigger value="private-sale" className="gap-2">
                 <ShoppingCart className="h-4 w-4" />
-                사매 내역 ({privateSales.length})
+                사매 내역 ({totals.private_sale.count})
               </TabsTrigger>
               <TabsTrigger value="expense" className="gap-2">
                 <Wallet className="h-4 w-4" />
-                경비 내역 ({expenses.length})
+                경비 내역 ({totals.expense.count})
               </TabsTrigger>
             </TabsList>
 
@@ -789,12 +798,13 @@ export default function AuctionList() {
                   </Table>
                 </div>
               </div>
+              {loadMoreButton('auction', auctions.length)}
               {auctions.length > 0 && (
                 <div className="mt-4 p-4 bg-gradient-to-r from-primary/5 to-accent/5 rounded-xl border border-primary/10">
                   <div className="flex items-center justify-between">
                     <div className="flex items-center gap-2 text-sm text-muted-foreground">
                       <Calculator className="h-4 w-4" />
-                      합계 ({auctions.length}건)
+                      합계 ({totals.auction.count}건)
                     </div>
                     <div className="flex gap-8">
                       <div className="text-right">
@@ -879,12 +889,13 @@ export default function AuctionList() {
                   </Table>
                 </div>
               </div>
+              {loadMoreButton('private_sale', privateSales.length)}
               {privateSales.length > 0 && (
                 <div className="mt-4 p-4 bg-gradient-to-r from-green-500/5 to-emerald-500/5 rounded-xl border border-green-500/10">
                   <div className="flex items-center justify-between">
                     <div className="flex items-center gap-2 text-sm text-muted-foreground">
                       <Calculator className="h-4 w-4" />
-                      합계 ({privateSales.length}건)
+                      합계 ({totals.private_sale.count}건)
                     </div>
                     <div className="flex gap-8">
                       <div className="text-right">
@@ -959,12 +970,13 @@ export default function AuctionList() {
                   </Table>
                 </div>
               </div>
+              {loadMoreButton('expense', expenses.length)}
               {expenses.length > 0 && (
                 <div className="mt-4 p-4 bg-gradient-to-r from-orange-500/5 to-amber-500/5 rounded-xl border border-orange-500/10">
                   <div className="flex items-center justify-between">
                     <div className="flex items-center gap-2 text-sm text-muted-foreground">
                       <Calculator className="h-4 w-4" />
-                      합계 ({expenses.length}건)
+                      합계 ({totals.expense.count}건)
                     </div>
                     <div className="text-right">
                       <div className="text-xs text-muted-foreground">총 경비</div>
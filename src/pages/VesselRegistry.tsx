@@ -60,10 +60,7 @@ import {
   getVesselRegistry,
   getVesselRegistryDetail,
   updateVesselRegistry,
-  getPorts,
-  getBusinessTypes,
-  getGroups,
-  getOrganizations,
+  getVesselRegistryFacets,
   getVesselMemos,
   createVesselMemo,
   updateVesselMemo,
@@ -125,10 +122,12 @@ export default function VesselRegistryPage() {
   const [uploadingFile, setUploadingFile] = useState(false)
 
   const loadFilterOptions = () => {
-    getPorts().then(res => setPorts(res.data))
-    getBusinessTypes().then(res => setBusinessTypes(res.data))
-    getGroups().then(res => setGroups(res.data))
-    getOrganizations().then(res => setOrganizations(res.data))
+    getVesselRegistryFacets().then(res => {
+      setPorts(res.data.ports)
+      setBusinessTypes(res.data.business_types)
+      setGroups(res.data.groups)
+      setOrganizations(res.data.organizations)
+    })
   }
 
   useEffect(() => {
@@ -151,8 +150,8 @@ export default function VesselRegistryPage() {
         page_size: pageSize,
       })
       setVessels(res.data)
-      setTotalPages(res.total_pages)
-      setTotalCount(res.total)
+      setTotalPages(res.total_pages ?? 0)
+      setTotalCount(res.total ?? 0)
       setCurrentPage(page)
     } catch (error) {
       console.error('조회 실패:', error)